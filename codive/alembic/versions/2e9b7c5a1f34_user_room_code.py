@@ -0,0 +1,48 @@
+"""user.room_code with (room_code, finish) index
+
+Revision ID: 2e9b7c5a1f34
+Revises: 8f3a6b2c4d10
+Create Date: 2026-10-18 10:11:52.640387
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e9b7c5a1f34'
+down_revision: Union[str, None] = '8f3a6b2c4d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('room_code', sa.Text(), nullable=True))
+        batch_op.create_foreign_key('fk_user_room_code_room', 'room', ['room_code'], ['codeID'])
+        batch_op.create_index('ix_user_room_code', ['room_code'], unique=False)
+        batch_op.create_index('ix_user_room_code_finish', ['room_code', 'finish'], unique=False)
+
+    # 유저 id 는 "{방코드}-{번호}" 이므로 마지막 '-' 앞부분이 방 코드다
+    bind = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.String()), sa.column('room_code', sa.Text()))
+    rows = [
+        {'user_id': row.id, 'code': row.id.rsplit('-', 1)[0]}
+        for row in bind.execute(sa.select(user.c.id))
+        if '-' in row.id
+    ]
+    if rows:
+        bind.execute(
+            user.update().where(user.c.id == sa.bindparam('user_id')).values(room_code=sa.bindparam('code')),
+            rows
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_index('ix_user_room_code_finish')
+        batch_op.drop_index('ix_user_room_code')
+        batch_op.drop_constraint('fk_user_room_code_room', type_='foreignkey')
+        batch_op.drop_column('room_code')
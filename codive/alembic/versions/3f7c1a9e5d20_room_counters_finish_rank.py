@@ -0,0 +1,76 @@
+"""room.user_count/finished_count and user.finish_rank
+
+Revision ID: 3f7c1a9e5d20
+Revises: 9b6e3d2a7c48
+Create Date: 2026-10-18 14:48:30.551907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7c1a9e5d20'
+down_revision: Union[str, None] = '9b6e3d2a7c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.add_column(sa.Column('user_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('finished_count', sa.Integer(), server_default='0', nullable=False))
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('finish_rank', sa.Integer(), nullable=True))
+
+    # 지금까지의 유저로 카운터를 채운다. 예전 종료 순서는 남아 있지 않으므로 가입 순서로 등수를 매긴다
+    bind = op.get_bind()
+    user = sa.table(
+        'user',
+        sa.column('id', sa.String()),
+        sa.column('room_code', sa.Text()),
+        sa.column('finish', sa.Boolean()),
+        sa.column('created_at', sa.DateTime()),
+        sa.column('finish_rank', sa.Integer()),
+    )
+    room = sa.table(
+        'room',
+        sa.column('codeID', sa.Text()),
+        sa.column('user_count', sa.Integer()),
+        sa.column('finished_count', sa.Integer()),
+    )
+    counts = {}
+    ranks = []
+    rows = bind.execute(
+        sa.select(user.c.id, user.c.room_code, user.c.finish)
+        .where(user.c.room_code.isnot(None))
+        .order_by(user.c.room_code, user.c.created_at, user.c.id)
+    )
+    for row in rows:
+        total, finished = counts.get(row.room_code, (0, 0))
+        if row.finish:
+            finished += 1
+            ranks.append({'user_id': row.id, 'rank': finished})
+        counts[row.room_code] = (total + 1, finished)
+    if counts:
+        bind.execute(
+            room.update().where(room.c.codeID == sa.bindparam('code')).values(
+                user_count=sa.bindparam('total'), finished_count=sa.bindparam('finished')
+            ),
+            [{'code': code, 'total': total, 'finished': finished} for code, (total, finished) in counts.items()]
+        )
+    if ranks:
+        bind.execute(
+            user.update().where(user.c.id == sa.bindparam('user_id')).values(finish_rank=sa.bindparam('rank')),
+            ranks
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('finish_rank')
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.drop_column('finished_count')
+        batch_op.drop_column('user_count')
@@ -0,0 +1,66 @@
+"""baseline schema
+
+Revision ID: 5c1d0e7a9b21
+Revises: 
+Create Date: 2026-10-18 10:02:11.413208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d0e7a9b21'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 마이그레이션 도입 전에는 create_all 로 테이블을 만들었으므로, 이미 있는 테이블은 건너뛴다
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'question' not in existing:
+        op.create_table(
+            'question',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+    if 'room' not in existing:
+        op.create_table(
+            'room',
+            sa.Column('codeID', sa.Text(), nullable=False),
+            sa.Column('pw', sa.Text(), nullable=False),
+            sa.PrimaryKeyConstraint('codeID')
+        )
+    if 'user' not in existing:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.String(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.Column('is_guest', sa.Boolean(), nullable=True),
+            sa.Column('finish', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_user_id', 'user', ['id'], unique=False)
+    if 'answer' not in existing:
+        op.create_table(
+            'answer',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('question_id', sa.Integer(), nullable=True),
+            sa.Column('user_id', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['question_id'], ['question.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('answer')
+    op.drop_index('ix_user_id', table_name='user')
+    op.drop_table('user')
+    op.drop_table('room')
+    op.drop_table('question')
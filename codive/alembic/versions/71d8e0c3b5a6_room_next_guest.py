@@ -0,0 +1,43 @@
+"""room.next_guest sequence for guest ids
+
+Revision ID: 71d8e0c3b5a6
+Revises: 2e9b7c5a1f34
+Create Date: 2026-10-18 11:26:04.118730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71d8e0c3b5a6'
+down_revision: Union[str, None] = '2e9b7c5a1f34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.add_column(sa.Column('next_guest', sa.Integer(), server_default='1', nullable=False))
+
+    # 이미 발급된 번호 중 가장 큰 값부터 이어서 발급한다
+    bind = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.String()), sa.column('room_code', sa.Text()))
+    room = sa.table('room', sa.column('codeID', sa.Text()), sa.column('next_guest', sa.Integer()))
+    last_numbers = {}
+    for row in bind.execute(sa.select(user.c.id, user.c.room_code).where(user.c.room_code.isnot(None))):
+        suffix = row.id.rsplit('-', 1)[-1]
+        if suffix.isdigit():
+            last_numbers[row.room_code] = max(last_numbers.get(row.room_code, 1), int(suffix))
+    if last_numbers:
+        bind.execute(
+            room.update().where(room.c.codeID == sa.bindparam('code')).values(next_guest=sa.bindparam('number')),
+            [{'code': code, 'number': number} for code, number in last_numbers.items()]
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.drop_column('next_guest')
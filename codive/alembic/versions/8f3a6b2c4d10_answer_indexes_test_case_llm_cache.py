@@ -0,0 +1,58 @@
+"""answer indexes, test_case and llm_cache tables
+
+Revision ID: 8f3a6b2c4d10
+Revises: 5c1d0e7a9b21
+Create Date: 2026-10-18 10:04:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6b2c4d10'
+down_revision: Union[str, None] = '5c1d0e7a9b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    answer_indexes = {index['name'] for index in inspector.get_indexes('answer')}
+    if 'ix_answer_question_id' not in answer_indexes:
+        op.create_index('ix_answer_question_id', 'answer', ['question_id'], unique=False)
+    if 'ix_answer_user_id' not in answer_indexes:
+        op.create_index('ix_answer_user_id', 'answer', ['user_id'], unique=False)
+    if 'test_case' not in existing:
+        op.create_table(
+            'test_case',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('question_id', sa.Integer(), nullable=False),
+            sa.Column('input_data', sa.Text(), nullable=False),
+            sa.Column('expected_output', sa.Text(), nullable=False),
+            sa.ForeignKeyConstraint(['question_id'], ['question.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_test_case_question_id', 'test_case', ['question_id'], unique=False)
+    if 'llm_cache' not in existing:
+        op.create_table(
+            'llm_cache',
+            sa.Column('key', sa.String(length=64), nullable=False),
+            sa.Column('value', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.Float(), nullable=False),
+            sa.Column('last_used', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('key')
+        )
+        op.create_index('ix_llm_cache_last_used', 'llm_cache', ['last_used'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_llm_cache_last_used', table_name='llm_cache')
+    op.drop_table('llm_cache')
+    op.drop_index('ix_test_case_question_id', table_name='test_case')
+    op.drop_table('test_case')
+    op.drop_index('ix_answer_user_id', table_name='answer')
+    op.drop_index('ix_answer_question_id', table_name='answer')
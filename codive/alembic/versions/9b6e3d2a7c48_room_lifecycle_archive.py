@@ -0,0 +1,68 @@
+"""room.created_at/last_active and room_archive, user_archive for the room reaper
+
+Revision ID: 9b6e3d2a7c48
+Revises: d4a9f2e61c07
+Create Date: 2026-10-18 14:02:51.608214
+
+"""
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b6e3d2a7c48'
+down_revision: Union[str, None] = 'd4a9f2e61c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_active', sa.Float(), server_default='0', nullable=False))
+        batch_op.create_index('ix_room_last_active', ['last_active'], unique=False)
+
+    # 기존 방은 지금 만들어진 것으로 본다. 0 으로 두면 첫 정리 때 한꺼번에 지워진다
+    now = time.time()
+    room = sa.table('room', sa.column('created_at', sa.Float()), sa.column('last_active', sa.Float()))
+    op.get_bind().execute(room.update().values(created_at=now, last_active=now))
+
+    op.create_table(
+        'room_archive',
+        sa.Column('room_code', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.Column('last_active', sa.Float(), nullable=False),
+        sa.Column('archived_at', sa.Float(), nullable=False),
+        sa.Column('started', sa.Boolean(), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False),
+        sa.Column('finished_users', sa.Integer(), nullable=False),
+        sa.Column('answers', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('room_code')
+    )
+    op.create_index('ix_room_archive_archived_at', 'room_archive', ['archived_at'], unique=False)
+    op.create_table(
+        'user_archive',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('room_code', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_guest', sa.Boolean(), nullable=False),
+        sa.Column('finish', sa.Boolean(), nullable=False),
+        sa.Column('answers', sa.Integer(), nullable=False),
+        sa.Column('questions', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_archive_room_code', 'user_archive', ['room_code'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_archive_room_code', table_name='user_archive')
+    op.drop_table('user_archive')
+    op.drop_index('ix_room_archive_archived_at', table_name='room_archive')
+    op.drop_table('room_archive')
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.drop_index('ix_room_last_active')
+        batch_op.drop_column('last_active')
+        batch_op.drop_column('created_at')
@@ -0,0 +1,45 @@
+"""room_event.id AUTOINCREMENT so event seq never goes backwards
+
+Revision ID: c2e8f4b71a93
+Revises: 3f7c1a9e5d20
+Create Date: 2026-10-18 15:21:07.342865
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8f4b71a93'
+down_revision: Union[str, None] = '3f7c1a9e5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def create_room_event(**kwargs) -> None:
+    op.create_table(
+        'room_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Text(), nullable=False),
+        sa.Column('worker_id', sa.String(length=32), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        **kwargs
+    )
+    op.create_index('ix_room_event_created_at', 'room_event', ['created_at'], unique=False)
+
+
+def upgrade() -> None:
+    # 이벤트는 길어야 몇십 초 보관하는 전달용 행이고 예전 문자열 메시지라서 옮기지 않고 새로 만든다
+    op.drop_index('ix_room_event_created_at', table_name='room_event')
+    op.drop_table('room_event')
+    create_room_event(sqlite_autoincrement=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_room_event_created_at', table_name='room_event')
+    op.drop_table('room_event')
+    create_room_event()
@@ -0,0 +1,49 @@
+"""room.started, room_event and room_presence for the shared room broker
+
+Revision ID: d4a9f2e61c07
+Revises: 71d8e0c3b5a6
+Create Date: 2026-10-18 12:40:18.275913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9f2e61c07'
+down_revision: Union[str, None] = '71d8e0c3b5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.add_column(sa.Column('started', sa.Boolean(), server_default='0', nullable=False))
+    op.create_table(
+        'room_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Text(), nullable=False),
+        sa.Column('worker_id', sa.String(length=32), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_room_event_created_at', 'room_event', ['created_at'], unique=False)
+    op.create_table(
+        'room_presence',
+        sa.Column('room_id', sa.Text(), nullable=False),
+        sa.Column('worker_id', sa.String(length=32), nullable=False),
+        sa.Column('connections', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('room_id', 'worker_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('room_presence')
+    op.drop_index('ix_room_event_created_at', table_name='room_event')
+    op.drop_table('room_event')
+    with op.batch_alter_table('room') as batch_op:
+        batch_op.drop_column('started')
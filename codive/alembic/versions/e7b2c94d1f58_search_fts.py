@@ -0,0 +1,55 @@
+"""question_fts / answer_fts full text search with sync triggers
+
+Revision ID: e7b2c94d1f58
+Revises: c2e8f4b71a93
+Create Date: 2026-10-18 16:05:42.518307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c94d1f58'
+down_revision: Union[str, None] = 'c2e8f4b71a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('question', 'answer')
+
+
+def upgrade() -> None:
+    # FTS5 는 SQLite 에만 있다. 다른 DB 에서는 색인 없이 search.py 가 LIKE 로 찾는다
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        op.execute(
+            f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+            f"content, content='{table}', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_update AFTER UPDATE OF content ON {table} BEGIN "
+            f"INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+            f"INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content); END"
+        )
+        op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        for suffix in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {table}_fts")
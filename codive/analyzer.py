@@ -0,0 +1,466 @@
+import ast
+import asyncio
+import io
+import tokenize
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import config
+from normalizer import digest
+
+# 보고서의 code_style 과 time_complexity 를 LLM 없이 AST 로 정한다.
+#   스타일: pycodestyle 과 같은 코드(E231, E501 ...)로 지적하고, 고칠 방법을 짧게 적는다.
+#   복잡도: 반복문 중첩, 정렬 같은 내장 호출, 재귀 호출 모양으로 O(...) 를 어림한다.
+# 정할 수 없는 항목은 None 으로 돌려주고, 그 항목만 LLM 에 맡긴다.
+# 분석은 워커 프로세스 풀에서 하고, 결과는 정규화한 코드의 해시로 기억한다.
+
+SYNTAX_ERROR = "x"
+NO_FINDINGS = "고칠 스타일 문제 없음"
+
+# 복잡도는 (지수 여부, n 의 차수, log n 의 차수) 로 나타낸다. 튜플 비교가 곧 크기 비교다
+Cost = Tuple[int, int, int]
+O1: Cost = (0, 0, 0)
+LOG: Cost = (0, 0, 1)
+N: Cost = (0, 1, 0)
+NLOGN: Cost = (0, 1, 1)
+EXP: Cost = (1, 0, 0)
+
+# 인자 하나로 부르면 그 길이만큼 도는 내장 함수
+LINEAR_BUILTINS = {"sum", "max", "min", "list", "set", "tuple", "dict", "frozenset", "any", "all", "sorted"}
+LINEAR_METHODS = {"join", "count", "index", "split", "copy", "reverse", "insert", "remove", "extend", "replace", "find"}
+SORTS = {"sorted", "sort"}
+CACHE_DECORATORS = {"cache", "lru_cache"}
+# mid = (lo + hi) // 2 처럼 나눈 값을 담아 재귀 인자로 넘기는 이름
+HALF_NAMES = {"mid", "middle", "half"}
+
+MESSAGES = {
+    "E111": "들여쓰기를 4칸 단위로 맞추세요",
+    "E201": "여는 괄호 바로 뒤의 공백을 지우세요",
+    "E202": "닫는 괄호 바로 앞의 공백을 지우세요",
+    "E225": "대입/비교 연산자 양쪽에 공백을 넣으세요",
+    "E231": "쉼표 뒤에 공백을 넣으세요",
+    "E501": f"{config.STYLE_MAX_LINE_LENGTH}자를 넘는 줄을 나누세요",
+    "E701": "콜론 뒤의 문장은 다음 줄로 내리세요",
+    "E702": "세미콜론으로 이은 문장을 줄마다 나누세요",
+    "E711": "None 과는 == 대신 is 로 비교하세요",
+    "E712": "True/False 와 비교하지 말고 값 자체를 조건으로 쓰세요",
+    "E722": "except 에 잡을 예외 종류를 적으세요",
+    "E731": "lambda 를 변수에 넣지 말고 def 로 정의하세요",
+    "E741": "l, O, I 처럼 헷갈리는 이름 대신 뜻이 드러나는 이름을 쓰세요",
+    "F401": "쓰지 않는 import 를 지우세요",
+    "N801": "클래스 이름은 CapWords 로 쓰세요",
+    "N802": "함수 이름은 소문자와 _ 로 쓰세요",
+    "W191": "들여쓰기에 탭 대신 공백을 쓰세요",
+}
+
+ASSIGN_OPERATORS = {"=", "+=", "-=", "*=", "/=", "//=", "%=", "**=", "==", "!=", "<=", ">=", "<", ">"}
+AMBIGUOUS_NAMES = {"l", "O", "I"}
+
+
+def analysis_key(code: str) -> str:
+    # 스타일은 줄 길이(E501), 공백, 주석 위치까지 원문에서 보므로 원문 그대로의 해시를 쓴다
+    return digest(code)
+
+
+############# 스타일 #############
+
+def style_findings(code: str, tree: ast.AST) -> Dict[str, List[int]]:
+    findings: Dict[str, List[int]] = {}
+
+    def add(code_name: str, line: int):
+        lines = findings.setdefault(code_name, [])
+        if line not in lines:
+            lines.append(line)
+
+    for row, line in enumerate(code.splitlines(), start=1):
+        if len(line) > config.STYLE_MAX_LINE_LENGTH:
+            add("E501", row)
+        indent = line[:len(line) - len(line.lstrip())]
+        if "\t" in indent:
+            add("W191", row)
+        elif indent and len(indent) % 4:
+            add("E111", row)
+
+    check_tokens(code, add)
+    check_tree(tree, add)
+    return findings
+
+
+def check_tokens(code: str, add):
+    tokens = [tok for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+              if tok.type not in (tokenize.COMMENT, tokenize.NL)]
+    depth = 0
+    # 인자 목록을 아직 닫지 않은 lambda 들의 괄호 깊이. 그 안의 = 는 기본값이라 붙여 쓰는 것이 맞다
+    lambdas: List[int] = []
+    for i, tok in enumerate(tokens):
+        if tok.type == tokenize.NAME and tok.string == "lambda":
+            lambdas.append(depth)
+        if tok.type != tokenize.OP:
+            continue
+        previous = tokens[i - 1] if i else None
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if tok.string in "([{":
+            depth += 1
+            if following is not None and following.start[0] == tok.end[0] and following.start[1] > tok.end[1] \
+                    and following.string not in ")]}":
+                add("E201", tok.start[0])
+        elif tok.string in ")]}":
+            depth -= 1
+            if previous is not None and previous.end[0] == tok.start[0] and previous.end[1] < tok.start[1] \
+                    and previous.string not in ",([{":
+                add("E202", tok.start[0])
+        elif tok.string == ",":
+            if following is not None and following.start == tok.end and following.string not in ")]}":
+                add("E231", tok.start[0])
+        elif tok.string == ";":
+            add("E702", tok.start[0])
+        elif tok.string == ":" and lambdas and lambdas[-1] == depth:
+            lambdas.pop()
+        elif tok.string in ASSIGN_OPERATORS:
+            # 괄호 안의 = 는 키워드 인자라서 붙여 쓰는 것이 맞다
+            if tok.string == "=" and (depth or (lambdas and lambdas[-1] == depth)):
+                continue
+            if (previous is not None and previous.end == tok.start) or (following is not None and following.start == tok.end):
+                add("E225", tok.start[0])
+
+
+def check_tree(tree: ast.AST, add):
+    imported: Dict[str, int] = {}
+    used = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.For, ast.While, ast.If, ast.With, ast.FunctionDef, ast.ClassDef, ast.Try)):
+            if node.body and node.body[0].lineno == node.lineno:
+                add("E701", node.lineno)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name != node.name.lower():
+                add("N802", node.lineno)
+            for arg in node.args.args:
+                if arg.arg in AMBIGUOUS_NAMES:
+                    add("E741", node.lineno)
+        elif isinstance(node, ast.ClassDef):
+            if not node.name[:1].isupper() or "_" in node.name.strip("_"):
+                add("N801", node.lineno)
+        elif isinstance(node, ast.Compare):
+            for op, right in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(right, ast.Constant):
+                    if right.value is None:
+                        add("E711", node.lineno)
+                    elif isinstance(right.value, bool):
+                        add("E712", node.lineno)
+        elif isinstance(node, ast.ExceptHandler):
+            if node.type is None:
+                add("E722", node.lineno)
+        elif isinstance(node, ast.Assign):
+            if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) and isinstance(node.value, ast.Lambda):
+                add("E731", node.lineno)
+        elif isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Store) and node.id in AMBIGUOUS_NAMES:
+                add("E741", node.lineno)
+            elif isinstance(node.ctx, ast.Load):
+                used.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                name = (alias.asname or alias.name).split(".")[0]
+                if name != "*":
+                    imported.setdefault(name, node.lineno)
+    for name, line in imported.items():
+        if name not in used:
+            add("F401", line)
+
+
+def describe_style(findings: Dict[str, List[int]]) -> str:
+    if not findings:
+        return NO_FINDINGS
+    ordered = sorted(findings.items(), key=lambda item: item[1][0])[:config.STYLE_MAX_FINDINGS]
+    return "; ".join(f"{name} {MESSAGES[name]} ({', '.join(map(str, lines[:3]))}행)" for name, lines in ordered)
+
+
+############# 복잡도 #############
+
+def times(a: Optional[Cost], b: Optional[Cost]) -> Optional[Cost]:
+    if a is None or b is None:
+        return None
+    return max(a[0], b[0]), a[1] + b[1], a[2] + b[2]
+
+
+def largest(*costs: Optional[Cost]) -> Optional[Cost]:
+    if any(cost is None for cost in costs):
+        return None
+    return max(costs, default=O1)
+
+
+def describe_cost(cost: Cost) -> str:
+    exponential, degree, logs = cost
+    parts = []
+    if degree:
+        parts.append("n" if degree == 1 else f"n^{degree}")
+    if logs:
+        parts.append("log n" if logs == 1 else f"log^{logs} n")
+    if exponential:
+        parts.append("2^n")
+    return f"O({' '.join(parts) or '1'})"
+
+
+def is_constant(node: ast.AST) -> bool:
+    # 상수와 그 연산, 상수만 담은 리터럴 컨테이너. [1, 2, 3] 의 ast.Load 같은 문맥 노드도 지나간다
+    return all(isinstance(child, (ast.Constant, ast.UnaryOp, ast.BinOp, ast.unaryop, ast.operator,
+                                  ast.List, ast.Tuple, ast.Set, ast.Dict, ast.expr_context))
+               for child in ast.walk(node))
+
+
+def called_name(node: ast.Call) -> Optional[str]:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def halves(node: ast.AST) -> bool:
+    for child in ast.walk(node):
+        if isinstance(child, ast.BinOp) and isinstance(child.op, (ast.FloorDiv, ast.Div, ast.RShift)):
+            return True
+    return False
+
+
+class Complexity:
+    def __init__(self, tree: ast.Module):
+        self.tree = tree
+        self.functions: Dict[str, ast.AST] = {
+            node.name: node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        }
+        self.memo: Dict[str, Optional[Cost]] = {}
+        self.active: List[str] = []
+
+    def estimate(self) -> Optional[Cost]:
+        # 호출되지 않는 함수(클래스 메서드 형태의 풀이 등)도 풀이로 보고 함께 잰다
+        return largest(self.block(self.tree.body), *(self.function(name) for name in self.functions))
+
+    def block(self, body: List[ast.stmt]) -> Optional[Cost]:
+        return largest(*(self.visit(node) for node in body))
+
+    def visit(self, node: ast.AST) -> Optional[Cost]:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            # 정의만으로는 돌지 않는다. 호출될 때 function() 으로 잰다
+            return O1
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            body = largest(self.block(node.body), self.visit(node.target))
+            return largest(times(self.iterations(node.iter), body), self.visit(node.iter), self.block(node.orelse))
+        if isinstance(node, ast.While):
+            body = largest(self.block(node.body), self.visit(node.test))
+            return largest(times(self.loops(node), body), self.block(node.orelse))
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            cost = largest(*(self.visit(child) for child in ([node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt])))
+            for generator in node.generators:
+                cost = times(cost, self.iterations(generator.iter))
+                cost = largest(cost, self.visit(generator.iter), *(self.visit(test) for test in generator.ifs))
+            return cost
+        cost = largest(*(self.visit(child) for child in ast.iter_child_nodes(node)))
+        if isinstance(node, ast.Call):
+            cost = largest(cost, self.call(node))
+        return cost
+
+    def call(self, node: ast.Call) -> Optional[Cost]:
+        name = called_name(node)
+        if name in self.functions and (isinstance(node.func, ast.Name) or
+                                       (isinstance(node.func.value, ast.Name) and node.func.value.id == "self")):
+            return self.function(name)
+        if isinstance(node.func, ast.Name) and name in LINEAR_BUILTINS:
+            if len(node.args) != 1 or is_constant(node.args[0]):
+                return O1
+            return NLOGN if name in SORTS else N
+        if isinstance(node.func, ast.Attribute):
+            if name in SORTS:
+                return NLOGN
+            if name in LINEAR_METHODS:
+                return N
+            if name == "pop" and node.args and isinstance(node.args[0], ast.Constant) and node.args[0].value == 0:
+                return N
+        return O1
+
+    def iterations(self, node: ast.AST) -> Optional[Cost]:
+        if is_constant(node):
+            return O1
+        if isinstance(node, ast.Call):
+            name = called_name(node)
+            if name == "range" and all(map(is_constant, node.args)):
+                return O1
+            if name in ("enumerate", "reversed", "sorted", "zip") and node.args:
+                return self.iterations(node.args[0])
+        return N
+
+    def loops(self, node: ast.While) -> Optional[Cost]:
+        # 조건에 쓰인 변수가 절반씩 줄면 log n, 상수만큼 움직이면 n, 컬렉션을 비워 가는 while queue: 도 n
+        if isinstance(node.test, ast.Name):
+            return N
+        names = {child.id for child in ast.walk(node.test) if isinstance(child, ast.Name)}
+        if not names:
+            return None
+        halving = set()
+        stepping = False
+        for child in ast.walk(node):
+            if isinstance(child, ast.AugAssign) and isinstance(child.target, ast.Name):
+                if isinstance(child.op, (ast.FloorDiv, ast.Div, ast.RShift, ast.Mult, ast.LShift)):
+                    halving.add(child.target.id)
+                elif isinstance(child.op, (ast.Add, ast.Sub)) and child.target.id in names:
+                    stepping = True
+            elif isinstance(child, ast.Assign):
+                targets = {target.id for target in child.targets if isinstance(target, ast.Name)}
+                sources = {source.id for source in ast.walk(child.value) if isinstance(source, ast.Name)}
+                if halves(child.value) or sources & halving:
+                    halving |= targets
+                elif targets & names and isinstance(child.value, ast.BinOp) and is_constant(child.value.right):
+                    stepping = True
+        if halving & names:
+            return LOG
+        return N if stepping else None
+
+    def function(self, name: str) -> Optional[Cost]:
+        if name in self.memo:
+            return self.memo[name]
+        if name in self.active:
+            # 재귀 호출 자체는 아래 recursion() 에서 따로 센다. 서로 부르는 재귀는 정하지 않는다
+            return O1 if self.active[-1] == name else None
+        node = self.functions[name]
+        self.active.append(name)
+        try:
+            body = self.block(node.body)
+            cost = self.recursion(node, body)
+        finally:
+            self.active.pop()
+        self.memo[name] = cost
+        return cost
+
+    def recursion(self, node: ast.AST, body: Optional[Cost]) -> Optional[Cost]:
+        calls = [child for child in ast.walk(node) if isinstance(child, ast.Call) and called_name(child) == node.name]
+        if not calls or body is None:
+            return body
+        for loop in ast.walk(node):
+            # 반복문 안의 재귀(백트래킹, DFS)는 호출 모양만으로는 알 수 없다
+            if isinstance(loop, (ast.For, ast.While, ast.ListComp, ast.GeneratorExp)) and \
+                    any(child in calls for child in ast.walk(loop)):
+                return None
+        kinds = {shrink(call) for call in calls}
+        memoized = any(decorator_name(decorator) in CACHE_DECORATORS for decorator in node.decorator_list)
+        if kinds == {"dec"}:
+            return times(N, body) if len(calls) == 1 or memoized else EXP
+        if kinds == {"half"}:
+            if len(calls) == 1:
+                return LOG if body == O1 else body
+            # T(n) = 2T(n/2) + f(n)
+            if body == O1:
+                return N
+            if body == N:
+                return NLOGN
+        return None
+
+
+def shrink(call: ast.Call) -> Optional[str]:
+    # 재귀 호출 인자가 문제 크기를 어떻게 줄이는지. 1씩 줄이면 dec, 반으로 나누면 half
+    for arg in call.args:
+        if isinstance(arg, ast.BinOp) and isinstance(arg.op, (ast.FloorDiv, ast.Div, ast.RShift)):
+            return "half"
+        if isinstance(arg, ast.BinOp) and isinstance(arg.op, ast.Sub) and is_constant(arg.right):
+            return "dec"
+        if isinstance(arg, ast.Subscript) and isinstance(arg.slice, ast.Slice):
+            bound = arg.slice.lower or arg.slice.upper
+            if bound is not None and is_constant(bound):
+                return "dec"
+            return "half"
+    if any(isinstance(arg, ast.Name) and arg.id in HALF_NAMES for arg in call.args):
+        return "half"
+    return None
+
+
+def decorator_name(node: ast.AST) -> Optional[str]:
+    # @cache, @functools.lru_cache, @lru_cache(maxsize=None)
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+############# 분석 #############
+
+def analyze_code(code: str) -> dict:
+    # 워커 프로세스에서 실행된다
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return {
+            "code_style": f"문법 오류 ({e.lineno}행): {e.msg}",
+            "time_complexity": SYNTAX_ERROR,
+            "findings": [],
+        }
+    findings = style_findings(code, tree)
+    try:
+        cost = Complexity(tree).estimate()
+    except RecursionError:
+        cost = None
+    return {
+        "code_style": describe_style(findings),
+        "time_complexity": describe_cost(cost) if cost is not None else None,
+        "findings": [{"code": name, "message": MESSAGES[name], "lines": lines} for name, lines in sorted(findings.items())],
+    }
+
+
+class Analyzer:
+    def __init__(self, workers: int = config.ANALYZER_WORKERS, cache_size: int = config.ANALYZER_CACHE_SIZE):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, dict]" = OrderedDict()
+        # 같은 코드가 동시에 여러 번 들어오면 한 번만 분석한다
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    async def analyze(self, code: str) -> dict:
+        key = analysis_key(code)
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return result
+        pending = self.pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = self.pending[key] = loop.run_in_executor(self.get_pool(), analyze_code, code)
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            self.pending.pop(key, None)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.cache),
+        }
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+analyzer = Analyzer()
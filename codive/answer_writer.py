@@ -0,0 +1,142 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+
+import config
+import models
+from database import AsyncSessionLocal
+
+# 답안 제출을 메모리에 모았다가 한 트랜잭션으로 저장한다 (group commit).
+# 라운드가 끝나는 순간 모두가 한꺼번에 제출하면 답안마다 커밋하느라 SQLite 쓰기 락 앞에 줄이 선다.
+# submit() 은 자기 행이 들어간 배치가 커밋된 뒤에야 돌아오므로, 응답을 받은 답안은 이미 디스크에 있다.
+
+
+class AnswerWriter:
+    def __init__(
+        self,
+        flush_interval_ms: float = config.ANSWER_FLUSH_INTERVAL_MS,
+        max_rows: int = config.ANSWER_FLUSH_MAX_ROWS,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.pending: List[Tuple[dict, asyncio.Future]] = []
+        self.wakeup: Optional[asyncio.Event] = None
+        self.full: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stopping = False
+        self.flushes = 0
+        self.rows = 0
+        self.fallbacks = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.task is not None and not self.task.done() and self.loop is loop:
+            return
+        self.loop = loop
+        self.stopping = False
+        self.pending = []
+        self.wakeup = asyncio.Event()
+        self.full = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        # 쓰는 도중에 취소하면 그 배치의 행이 사라지고 future 가 영영 풀리지 않는다.
+        # 멈추라고 알린 뒤 run() 이 남은 제출을 마지막으로 한 번 쓰고 끝나기를 기다린다
+        self.stopping = True
+        self.wakeup.set()
+        self.full.set()
+        try:
+            await self.task
+        finally:
+            self.task = None
+            self.stopping = False
+            # 마지막 flush 가 시작된 뒤에 들어온 제출은 저장하지 못했다고 알린다
+            leftover, self.pending = self.pending, []
+            for _, future in leftover:
+                if not future.done():
+                    future.set_exception(RuntimeError("answer writer stopped"))
+
+    async def submit(self, rows: List[dict]) -> List[dict]:
+        # rows 는 Answer 컬럼 dict. 저장된 id 를 채운 dict 를 같은 순서로 돌려준다
+        await self.start()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for row in rows:
+            future = loop.create_future()
+            self.pending.append((row, future))
+            futures.append(future)
+        if len(self.pending) >= self.max_rows:
+            self.full.set()
+        self.wakeup.set()
+        return list(await asyncio.gather(*futures))
+
+    async def run(self):
+        while not self.stopping:
+            await self.wakeup.wait()
+            # 첫 행이 들어온 뒤 flush_interval 동안 더 모은다. max_rows 가 차면 바로 쓴다
+            try:
+                await asyncio.wait_for(self.full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.drain()
+        # 종료 직전에 들어온 제출도 버리지 않고 저장한다
+        await self.drain()
+
+    async def drain(self):
+        self.wakeup.clear()
+        self.full.clear()
+        batch, self.pending = self.pending, []
+        for start in range(0, len(batch), self.max_rows):
+            await self.flush(batch[start:start + self.max_rows])
+
+    async def flush(self, batch: List[Tuple[dict, asyncio.Future]]):
+        rows = [row for row, _ in batch]
+        try:
+            ids = await self.insert(rows)
+        except Exception:
+            # 배치 안의 한 행 때문에 나머지 제출까지 실패하지 않도록 한 행씩 다시 쓴다
+            self.fallbacks += 1
+            for row, future in batch:
+                try:
+                    (answer_id,) = await self.insert([row])
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+                    continue
+                self.resolve(future, row, answer_id)
+            return
+        for (row, future), answer_id in zip(batch, ids):
+            self.resolve(future, row, answer_id)
+
+    async def insert(self, rows: List[dict]) -> List[int]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                insert(models.Answer).returning(models.Answer.id, sort_by_parameter_order=True),
+                rows
+            )
+            ids = list(result.scalars())
+            await db.commit()
+        self.flushes += 1
+        self.rows += len(rows)
+        return ids
+
+    def resolve(self, future: asyncio.Future, row: dict, answer_id: int):
+        # 요청이 먼저 끊겼으면 future 가 취소되어 있다. 저장은 이미 끝났으므로 무시한다
+        if not future.done():
+            future.set_result({**row, "id": answer_id})
+
+    def stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "rows": self.rows,
+            "rows_per_flush": round(self.rows / self.flushes, 2) if self.flushes else 0.0,
+            "fallbacks": self.fallbacks,
+            "pending": len(self.pending),
+        }
+
+
+answer_writer = AnswerWriter()
@@ -0,0 +1,393 @@
+"""수업 한 번을 흉내 내는 부하 테스트.
+
+방 N 개 x 게스트 M 명이 방 생성 -> 동시 입장 -> 웹소켓 접속과 시작 -> 답안 제출 -> 종료 -> 보고서 조회를
+끝까지 진행한다. 서버는 임시 DB 와 가짜 LLM 으로 따로 띄우고(--url 을 주면 이미 떠 있는 서버를 쓴다),
+단계별 처리량과 p50/p95/p99 지연, 웹소켓 브로드캐스트 지연을 출력하고 JSON 으로 남긴다.
+codive/ 에서 실행:
+
+    python bench/bench_classroom.py --rooms 10 --guests 30 --questions 5 --out before.json
+    python bench/bench_classroom.py --rooms 10 --guests 30 --questions 5 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ANSWERS = [
+    "a, b = map(int, input().split())\nprint(a + b)\n",
+    "a,b=map(int,input().split())\nprint(a+b)\n",
+    "n = int(input())\ntotal = 0\nfor i in range(1, n + 1):\n    total += i\nprint(total)\n",
+    "n = int(input())\nprint(n * (n + 1) // 2)\n",
+    "s = input().strip()\nprint(len(s))\n",
+    "nums = list(map(int, input().split()))\nprint(max(nums))\n",
+]
+
+REPORT = ("{'test_pass': '통과', 'time_complexity': 'O(n)', 'code_style': '가짜 LLM 응답', "
+          "'execution_time': '1ms', 'memory_usage': '1kb'}")
+
+STEPS = ["create_room", "enter_room", "ws_join", "answer", "finish", "report_first", "report"]
+# report_first 는 보고서의 첫 줄까지, ws_join 은 hello 를 받을 때까지. 둘은 요청 수에 넣지 않는다
+EXTRA_STEPS = ("report_first", "ws_join")
+DELAYS = ["start", "answer_event"]
+
+
+############# 서버 #############
+
+def stub_llm(latency: float):
+    # 업스트림 OpenAI 대신 latency 초 뒤에 고정 응답을 준다. stream=True 면 조각으로 나눠 보낸다
+    import openai
+    from openai.openai_object import OpenAIObject
+
+    async def create(**kwargs):
+        await asyncio.sleep(latency)
+        if kwargs.get("stream"):
+            async def chunks():
+                for word in "가짜 힌트 입니다".split():
+                    await asyncio.sleep(latency / 10)
+                    yield OpenAIObject.construct_from({"choices": [{"delta": {"content": word + " "}}]})
+            return chunks()
+        return OpenAIObject.construct_from({
+            "choices": [{"message": {"role": "assistant", "content": REPORT}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 40},
+        })
+
+    openai.ChatCompletion.acreate = create
+
+
+def serve(port: int, llm_latency: float):
+    import uvicorn
+
+    stub_llm(llm_latency)
+    import codive
+    uvicorn.run(codive.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir: str):
+    port = free_port()
+    env = dict(os.environ)
+    env["CODIVE_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    env["CODIVE_ASYNC_DATABASE_URL"] = ""
+    # 부하 테스트는 스케줄러가 아니라 앱 경로를 재는 것이므로 방 예산은 넉넉히 준다
+    env.setdefault("CODIVE_LLM_ROOM_BURST", "100000")
+    env.setdefault("CODIVE_LLM_USER_BURST", "100000")
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port), "--llm-latency-ms", str(args.llm_latency_ms)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client, url: str, process, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("서버가 시작하자마자 종료되었습니다.")
+        try:
+            if (await client.get(f"{url}/api/llm/stats")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("서버가 준비되지 않았습니다.")
+
+
+############# 측정 #############
+
+class Recorder:
+    def __init__(self):
+        self.samples = {step: [] for step in STEPS}
+        self.windows = {}
+        self.errors = {step: 0 for step in STEPS}
+        self.delays = {kind: [] for kind in DELAYS}
+
+    def add(self, step: str, started: float, ended: float):
+        self.samples[step].append(ended - started)
+        first, last = self.windows.get(step, (started, ended))
+        self.windows[step] = (min(first, started), max(last, ended))
+
+    async def timed(self, step: str, coroutine):
+        started = time.perf_counter()
+        try:
+            result = await coroutine
+        except Exception:
+            self.errors[step] += 1
+            raise
+        self.add(step, started, time.perf_counter())
+        return result
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(values) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(max(values, default=0.0) * 1000, 3),
+    }
+
+
+############# 시나리오 #############
+
+class Socket:
+    # 방 이벤트 소켓 하나. start 와 answer 이벤트를 받은 시각을 남긴다
+    def __init__(self, connection):
+        self.connection = connection
+        self.started = asyncio.get_running_loop().create_future()
+        # (user, question_id) -> 받은 시각. 단건 제출 응답에는 id 가 없어서 이 둘로 맞춘다
+        self.answers = {}
+        self.reader = asyncio.ensure_future(self.read())
+
+    async def read(self):
+        try:
+            async for message in self.connection:
+                event = json.loads(message)
+                now = time.perf_counter()
+                if event["type"] == "start" and not self.started.done():
+                    self.started.set_result(now)
+                elif event["type"] == "answer":
+                    self.answers.setdefault((event["data"]["user"], event["data"]["question_id"]), now)
+        except Exception:
+            pass
+        if not self.started.done():
+            self.started.cancel()
+
+    async def close(self):
+        await self.connection.close()
+        self.reader.cancel()
+
+
+async def open_socket(ws_url: str, room: str, user: str) -> Socket:
+    import websockets
+
+    connection = await websockets.connect(f"{ws_url}/ws/{room}?v=1&user={user}", max_queue=None, close_timeout=1)
+    hello = json.loads(await connection.recv())
+    assert hello["type"] == "hello", hello
+    return Socket(connection)
+
+
+async def join_guest(client, url, ws_url, recorder, room, pw):
+    response = await recorder.timed("enter_room", client.post(f"{url}/api/room/enter", json={"codeID": room, "pw": pw}))
+    response.raise_for_status()
+    user = response.json()["guest_id"]
+    return user, await recorder.timed("ws_join", open_socket(ws_url, room, user))
+
+
+async def run_guest(client, url, recorder, user, sock, questions, rng, think, submitted) -> float:
+    # start 를 받은 시각을 돌려준다
+    try:
+        started = await sock.started
+        for question in range(1, questions + 1):
+            if think:
+                await asyncio.sleep(rng.uniform(0, think))
+            submitted[(user, question)] = time.perf_counter()
+            response = await recorder.timed("answer", client.post(f"{url}/api/answers", json={
+                "user_id": user, "question_id": question, "content": rng.choice(ANSWERS)
+            }))
+            response.raise_for_status()
+        response = await recorder.timed("finish", client.patch(f"{url}/api/user/finish/{user}"))
+        response.raise_for_status()
+        return started
+    finally:
+        await sock.close()
+
+
+async def fetch_report(client, url, recorder, room):
+    started = time.perf_counter()
+    first = True
+    async with client.stream("POST", f"{url}/api/room/{room}/report", json={"max_tokens": 150}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line and first:
+                first = False
+                recorder.add("report_first", started, time.perf_counter())
+
+
+async def run_room(client, url, ws_url, recorder, index, args, run_id) -> tuple:
+    # 실패 목록과 방장 소켓. 방장 소켓은 측정이 끝난 뒤에 한꺼번에 닫는다
+    rng = random.Random(args.seed * 1000 + index)
+    room = f"bench{run_id}r{index}"
+    response = await recorder.timed("create_room", client.post(f"{url}/api/room_create", json={"codeID": room, "pw": "pw"}))
+    response.raise_for_status()
+    host = await recorder.timed("ws_join", open_socket(ws_url, room, f"{room}-1"))
+
+    # 게스트가 모두 접속한 뒤에 시작해야 start 지연을 모든 소켓에서 잴 수 있다
+    joined = await asyncio.gather(*(join_guest(client, url, ws_url, recorder, room, "pw") for _ in range(args.guests)),
+                                  return_exceptions=True)
+    failures = [result for result in joined if isinstance(result, Exception)]
+    guests = [result for result in joined if not isinstance(result, Exception)]
+    submitted = {}
+    sent = time.perf_counter()
+    await host.connection.send('{"type":"start"}')
+    results = await asyncio.gather(*(
+        run_guest(client, url, recorder, user, sock, args.questions, random.Random(rng.random()), args.think_ms / 1000, submitted)
+        for user, sock in guests
+    ), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            failures.append(result)
+        else:
+            recorder.delays["start"].append(result - sent)
+
+    # 마지막 답안 이벤트가 방장 소켓에 닿을 때까지 잠깐 기다린다
+    await asyncio.sleep(0.5)
+    for key, at in submitted.items():
+        received = host.answers.get(key)
+        if received is not None:
+            recorder.delays["answer_event"].append(received - at)
+
+    try:
+        await recorder.timed("report", fetch_report(client, url, recorder, room))
+    except Exception as e:
+        failures.append(e)
+    return failures, host
+
+
+async def drive(args, url: str, process) -> dict:
+    import httpx
+
+    ws_url = url.replace("http", "ws", 1)
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        await wait_ready(client, url, process)
+        started = time.perf_counter()
+        rooms = await asyncio.gather(*(run_room(client, url, ws_url, recorder, index, args, run_id)
+                                       for index in range(args.rooms)), return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*(room[1].close() for room in rooms if not isinstance(room, Exception)),
+                             return_exceptions=True)
+        server = {}
+        for name, path in (("answer_writer", "/api/answers/writer/stats"), ("llm", "/api/llm/stats"),
+                           ("analyzer", "/api/analyzer/stats")):
+            try:
+                server[name] = (await client.get(f"{url}{path}")).json()
+            except Exception:
+                pass
+
+    failures = [repr(room) for room in rooms if isinstance(room, Exception)]
+    failures += [repr(failure) for room in rooms if not isinstance(room, Exception) for failure in room[0]]
+    requests = sum(len(recorder.samples[step]) for step in STEPS if step not in EXTRA_STEPS)
+    steps = {}
+    for step in STEPS:
+        values = recorder.samples[step]
+        first, last = recorder.windows.get(step, (0.0, 0.0))
+        window = last - first
+        steps[step] = dict(summarize(values), errors=recorder.errors[step],
+                           throughput_per_s=round(len(values) / window, 2) if window > 0 else 0.0)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests,
+        "throughput_per_s": round(requests / elapsed, 2) if elapsed else 0.0,
+        "steps": steps,
+        "broadcast_delay": {kind: summarize(values) for kind, values in recorder.delays.items()},
+        "failures": failures[:20],
+        "server": server,
+    }
+
+
+############# 출력 #############
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return ""
+
+
+def print_table(result: dict, baseline: dict = None):
+    print(f"elapsed {result['elapsed_s']}s, {result['requests']} requests, {result['throughput_per_s']} req/s")
+    header = f"{'step':>14} {'count':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header + ("  p95 vs baseline" if baseline else ""))
+    rows = [(step, result["steps"][step]) for step in STEPS]
+    rows += [(f"ws:{kind}", dict(stats, errors=0, throughput_per_s=0.0)) for kind, stats in result["broadcast_delay"].items()]
+    for name, stats in rows:
+        line = (f"{name:>14} {stats['count']:>7} {stats['errors']:>5} {stats['throughput_per_s']:>9} "
+                f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+        if baseline:
+            section, key = ("broadcast_delay", name[3:]) if name.startswith("ws:") else ("steps", name)
+            before = baseline["result"][section].get(key, {}).get("p95_ms")
+            if before:
+                line += f"  {(stats['p95_ms'] - before) / before * 100:+.1f}%"
+        print(line)
+    if result["failures"]:
+        print(f"failures: {len(result['failures'])}, first: {result['failures'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--guests", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="답안 사이 최대 대기 시간(균등 분포)")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--url", help="이미 떠 있는 서버. 주지 않으면 임시 DB 로 새로 띄운다")
+    parser.add_argument("--out", help="결과 JSON 경로. 기본값은 classroom-<시각>.json")
+    parser.add_argument("--compare", help="p95 를 비교할 이전 결과 JSON")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.llm_latency_ms / 1000)
+        return
+
+    process = None
+    with tempfile.TemporaryDirectory(prefix="codive-bench-") as workdir:
+        url = args.url
+        if url is None:
+            process, url = start_server(args, workdir)
+        try:
+            result = asyncio.run(drive(args, url.rstrip("/"), process))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "args": {key: value for key, value in vars(args).items() if key not in ("serve", "out", "compare")},
+        "result": result,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_table(result, baseline)
+    out = args.out or f"classroom-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main()
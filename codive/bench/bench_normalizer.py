@@ -0,0 +1,87 @@
+"""clean_code 마이크로 벤치마크.
+
+예전 정규식 5단계 clean_code 와 tokenize 기반 normalizer 의 처리량을 큰 제출 코드로 비교한다.
+codive/ 에서 실행:
+
+    python bench/bench_normalizer.py --lines 2000 --repeat 20
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalizer import Normalizer  # noqa: E402
+
+
+def legacy_clean_code(code: str) -> str:
+    code = re.sub(r'#.*', '', code)
+    code = re.sub(r'"""(.*?)"""', '', code, flags=re.DOTALL)
+    code = code.replace('\t', '\\t')
+    code = code.replace('\n', '\\n')
+    code = re.sub(r'\s+', ' ', code)
+    return code.strip()
+
+
+def make_submission(lines: int) -> str:
+    block = [
+        "def solve(n):  # 합 구하기",
+        '    """1부터 n까지의 합"""',
+        "    total = 0",
+        "    for i in range(1, n + 1):",
+        "        if i % 2 == 0:",
+        '            label = "even # not a comment"',
+        "        else:",
+        "            label = 'odd'",
+        "        total += i",
+        "",
+        "    return total",
+        "",
+    ]
+    out = []
+    while len(out) < lines:
+        out.extend(line.replace("solve", f"solve{len(out)}") for line in block)
+    return "\n".join(out[:lines]) + "\nprint(solve0(10))\n"
+
+
+def measure(fn, code: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(code)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    code = make_submission(args.lines)
+    size_mb = len(code.encode("utf-8")) / (1024 * 1024)
+
+    legacy = measure(legacy_clean_code, code, args.repeat)
+    # 메모를 끈 상태(매번 새로 계산)와 같은 제출이 반복되는 경우를 따로 잰다
+    cold = measure(lambda c: Normalizer(memo_size=0)(c), code, args.repeat)
+    warm_normalizer = Normalizer()
+    warm_normalizer(code)
+    warm = measure(warm_normalizer, code, args.repeat)
+
+    print(f"submission: {args.lines} lines, {size_mb:.3f} MB")
+    for name, seconds in (("legacy regex", legacy), ("tokenize (cold)", cold), ("tokenize (memoized)", warm)):
+        print(f"{name:>20}: {seconds * 1000:9.3f} ms/call  {size_mb / seconds:9.1f} MB/s")
+
+    # 예전 함수가 만든 결과는 실행할 수 없고, 새 결과는 그대로 실행된다
+    for name, text in (("legacy regex", legacy_clean_code(code)), ("tokenize", warm_normalizer(code).canonical)):
+        try:
+            compile(text, "<bench>", "exec")
+            runnable = "yes"
+        except SyntaxError:
+            runnable = "no"
+        print(f"{name:>20}: runnable={runnable}")
+
+
+if __name__ == "__main__":
+    main()
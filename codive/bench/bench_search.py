@@ -0,0 +1,95 @@
+"""코드 검색 벤치마크.
+
+임시 SQLite DB 에 방 여러 개의 합성 답안을 넣으면서 트리거로 색인이 함께 쓰이는 비용을 재고,
+흔한 조각과 드문 조각, 방 필터 유무에 따라 검색 한 번의 지연을 잰다. 수업처럼 --concurrent 개의 방이
+동시에 열려 있는 동안의 답안이 id 순서대로 섞여 들어간다. codive/ 에서 실행:
+
+    python bench/bench_search.py --answers 300000 --rooms 300
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import models  # noqa: E402
+from bench_similarity import EXTRA, TEMPLATES, fill  # noqa: E402
+from database import upgrade_schema  # noqa: E402
+from search import parse_terms, search_answers  # noqa: E402
+
+QUERIES = ["print", "range(", "[::-1]", "sorted map", "helper_", "'big'", "DEBUG = 42"]
+
+
+def populate(engine, answers: int, rooms: int, concurrent: int, seed: int, batch: int = 2000) -> float:
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        connection.execute(insert(models.Question), [{"id": index + 1, "content": f"문제 {index + 1}"} for index in range(len(TEMPLATES))])
+        connection.execute(insert(models.Room), [{"codeID": f"r{room}", "pw": "pw"} for room in range(rooms)])
+        connection.execute(insert(models.User), [
+            {"id": f"r{room}-{user}", "room_code": f"r{room}", "is_guest": user > 1}
+            for room in range(rooms) for user in range(1, max(2, answers // rooms // len(TEMPLATES)) + 1)
+        ])
+    users_per_room = max(2, answers // rooms // len(TEMPLATES))
+    started = time.perf_counter()
+    rows = []
+    for index in range(answers):
+        question = index % len(TEMPLATES)
+        active = min(rooms - concurrent, index * rooms // answers // concurrent * concurrent)
+        extras = [fill(extra, rng) for extra in rng.sample(EXTRA, rng.randint(1, 3))]
+        rows.append({
+            "content": "".join(extras) + fill(rng.choice(TEMPLATES[question]), rng),
+            "question_id": question + 1,
+            "user_id": f"r{active + rng.randrange(concurrent)}-{rng.randint(1, users_per_room)}",
+        })
+        if len(rows) >= batch:
+            with engine.begin() as connection:
+                connection.execute(insert(models.Answer), rows)
+            rows = []
+    if rows:
+        with engine.begin() as connection:
+            connection.execute(insert(models.Answer), rows)
+    return time.perf_counter() - started
+
+
+def timed(db: Session, terms, repeat: int, **filters):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = search_answers(db, terms, 21, 0, **filters)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000, max(times) * 1000, len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=300000)
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--concurrent", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        upgrade_schema(engine)
+        elapsed = populate(engine, args.answers, args.rooms, args.concurrent, args.seed)
+        print(f"insert with index: {args.answers} answers in {elapsed:.1f}s ({elapsed * 1e6 / args.answers:.1f} us/answer)")
+        with Session(engine) as db:
+            for query in QUERIES:
+                terms = parse_terms(query)
+                median, worst, count = timed(db, terms, args.repeat)
+                room_median, room_worst, room_count = timed(db, terms, args.repeat, room="r1")
+                print(f"{query!r:>14}: all rooms {median:7.1f} ms (max {worst:7.1f}, {count} hits)  "
+                      f"room r1 {room_median:7.1f} ms (max {room_worst:7.1f}, {room_count} hits)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
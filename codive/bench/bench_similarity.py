@@ -0,0 +1,161 @@
+"""유사 답안 색인 벤치마크.
+
+문제 몇 개에 대한 합성 제출을 만들고, 그중 일부는 다른 유저 답안을 변수 이름만 바꾸거나
+줄을 조금 더해 베낀 것으로 심는다. 색인에 한 건씩 넣는 비용, 조회 시간, 심어 둔 쌍을 찾은 비율을
+모든 쌍을 비교하는 방식과 나란히 잰다. codive/ 에서 실행:
+
+    python bench/bench_similarity.py --submissions 3000 --questions 4 --copies 0.05
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from similarity import RoomIndex, make_entry  # noqa: E402
+
+NAMES = ["n", "m", "k", "total", "acc", "result", "res", "answer", "ans", "s", "cnt", "count", "x", "y", "value",
+         "arr", "nums", "data", "items", "lst", "i", "j", "idx", "best", "cur", "tmp", "left", "right", "mid"]
+
+# 문제마다 풀이 방식 몇 가지. {a} {b} {c} 는 변수 이름, {k} 는 상수 자리
+TEMPLATES = [
+    [
+        "n = int(input())\n{a} = 0\nfor {b} in range(1, n + 1):\n    {a} += {b}\nprint({a})\n",
+        "n = int(input())\nprint(n * (n + 1) // 2)\n",
+        "n = int(input())\n{a} = sum(range(n + 1))\nprint({a})\n",
+        "n = int(input())\n{a} = 0\n{b} = 1\nwhile {b} <= n:\n    {a} = {a} + {b}\n    {b} += 1\nprint({a})\n",
+    ],
+    [
+        "{a} = list(map(int, input().split()))\n{b} = {a}[0]\nfor {c} in {a}:\n    if {c} > {b}:\n        {b} = {c}\nprint({b})\n",
+        "{a} = list(map(int, input().split()))\nprint(max({a}))\n",
+        "{a} = sorted(map(int, input().split()))\nprint({a}[-1])\n",
+    ],
+    [
+        "{a} = input().strip()\nprint({a}[::-1])\n",
+        "{a} = input().strip()\n{b} = ''\nfor {c} in {a}:\n    {b} = {c} + {b}\nprint({b})\n",
+        "{a} = list(input().strip())\n{a}.reverse()\nprint(''.join({a}))\n",
+    ],
+    [
+        "def {a}({b}):\n    if {b} < 2:\n        return {b}\n    return {a}({b} - 1) + {a}({b} - 2)\nprint({a}(int(input())))\n",
+        "{a}, {b} = 0, 1\nfor _ in range(int(input())):\n    {a}, {b} = {b}, {a} + {b}\nprint({a})\n",
+        "{c} = [0, 1]\nfor {a} in range(2, int(input()) + 1):\n    {c}.append({c}[-1] + {c}[-2])\nprint({c}[-1])\n",
+    ],
+]
+
+# 풀이와 상관없이 붙는 줄. 답안마다 섞어서 서로 조금씩 다르게 만든다
+EXTRA = [
+    "import sys\n",
+    "input = sys.stdin.readline\n",
+    "DEBUG = {k}\n",
+    "def helper_{a}({b}):\n    return {b} * {k}\n",
+    "{a}_cache = {{}}\n",
+    "for {a} in range({k}):\n    pass\n",
+    "if {k} > 100:\n    print('big')\n",
+    "{a} = [{k}] * {k}\n",
+    "while False:\n    {a} = {k}\n",
+    "class Node:\n    def __init__(self, {a}):\n        self.{a} = {a}\n",
+]
+
+
+def fill(template: str, rng: random.Random) -> str:
+    a, b, c = rng.sample(NAMES, 3)
+    return template.format(a=a, b=b, c=c, k=rng.randint(1, 999))
+
+
+def make_room(submissions: int, questions: int, copies: float, seed: int):
+    # (answer_id, user_id, question_id, content) 목록과 심어 둔 복사 쌍
+    rng = random.Random(seed)
+    rows = []
+    planted = set()
+    users = max(1, submissions // questions)
+    answer_id = 0
+    for question_id in range(questions):
+        templates = TEMPLATES[question_id % len(TEMPLATES)]
+        for user in range(users):
+            answer_id += 1
+            user_id = f"bench-{user}"
+            if rows and rng.random() < copies:
+                # 같은 문제의 다른 유저 답안을 골라 이름을 바꾸고 줄을 하나 더한다
+                source = rng.choice([row for row in rows[-users:] if row[2] == question_id and row[1] != user_id] or rows[-1:])
+                if source[2] == question_id and source[1] != user_id:
+                    code = source[3]
+                    used = [name for name in NAMES if re.search(rf"\b{name}\b", code)]
+                    for old in rng.sample(used, min(2, len(used))):
+                        code = re.sub(rf"\b{old}\b", old + "_", code)
+                    code = code + fill(rng.choice(EXTRA), rng)
+                    rows.append((answer_id, user_id, question_id, code))
+                    planted.add((source[0], answer_id))
+                    continue
+            extras = [fill(extra, rng) for extra in rng.sample(EXTRA, rng.randint(2, 5))]
+            body = fill(rng.choice(templates), rng)
+            position = rng.randint(0, len(extras))
+            rows.append((answer_id, user_id, question_id, "".join(extras[:position]) + body + "".join(extras[position:])))
+    return rows, planted
+
+
+def all_pairs(entries, threshold: float):
+    # 비교 기준: 같은 문제 안의 모든 쌍을 지문 집합 Jaccard 로 직접 비교한다
+    found = set()
+    by_question = {}
+    for entry in entries:
+        by_question.setdefault(entry.question_id, []).append(entry)
+    for group in by_question.values():
+        for i, a in enumerate(group):
+            for b in group[i + 1:]:
+                if a.user_id == b.user_id:
+                    continue
+                union = len(a.fingerprints | b.fingerprints)
+                if union and len(a.fingerprints & b.fingerprints) / union >= threshold:
+                    found.add((a.answer_id, b.answer_id))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=3000)
+    parser.add_argument("--questions", type=int, default=4)
+    parser.add_argument("--copies", type=float, default=0.05)
+    parser.add_argument("--threshold", type=float, default=config.SIMILARITY_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    rows, planted = make_room(args.submissions, args.questions, args.copies, args.seed)
+
+    started = time.perf_counter()
+    entries = [make_entry(*row) for row in rows]
+    fingerprinting = time.perf_counter() - started
+
+    index = RoomIndex(config.SIMILARITY_MAX_BUCKET)
+    started = time.perf_counter()
+    for entry in entries:
+        index.add([entry])
+    indexing = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pairs = index.pairs(args.threshold, limit=len(rows) * 10)
+    query = time.perf_counter() - started
+    found = {(pair["a"]["answer_id"], pair["b"]["answer_id"]) for pair in pairs}
+    recall = len(planted & found) / len(planted) if planted else 1.0
+
+    print(f"room: {len(rows)} submissions, {args.questions} questions, {len(planted)} planted copies")
+    print(f"{'fingerprint':>14}: {fingerprinting * 1e6 / len(rows):9.1f} us/submission")
+    print(f"{'index add':>14}: {indexing * 1e6 / len(rows):9.1f} us/submission  (scored pairs kept: "
+          f"{sum(len(q.scores) for q in index.questions.values())})")
+    print(f"{'query':>14}: {query * 1000:9.1f} ms  pairs >= {args.threshold}: {len(found)}  planted recall: {recall:.3f}")
+
+    if not args.skip_naive:
+        started = time.perf_counter()
+        naive = all_pairs(entries, args.threshold)
+        naive_time = time.perf_counter() - started
+        naive_recall = len(planted & naive) / len(planted) if planted else 1.0
+        print(f"{'all pairs':>14}: {naive_time * 1000:9.1f} ms  pairs >= {args.threshold}: {len(naive)}  "
+              f"planted recall: {naive_recall:.3f}  agreement: {len(found & naive) / len(naive) if naive else 1.0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,44 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect,Response
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect,Response, Query, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
 import models
 import schemas
-from database import SessionLocal, engine
-from typing import Dict, List
-from fastapi.responses import RedirectResponse
+from database import SessionLocal, AsyncSessionLocal, upgrade_schema
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from fastapi.responses import RedirectResponse, StreamingResponse
+import metrics
 import openai
+import json
+import asyncio
+import anyio
+import csv
+import io
+import zlib
+import config
+from judge import judge, restore_code
+from analyzer import analyzer
+from llm_cache import llm_cache, cache_key
+from llm import llm_client, LLMTimeout
+from llm_scheduler import llm_scheduler, RateLimited, INTERACTIVE, BATCH
+import math
+from connection_manager import ConnectionManager
+from answer_writer import answer_writer
+from room_reaper import RoomReaper
+from similarity import similarity_index, make_entries
+from search import parse_terms, search_answers, search_questions
+import time
+from question_cache import question_cache, question_adapter, question_list_adapter, ALL
 
 app = FastAPI()
 
-models.Base.metadata.create_all(bind=engine)
+upgrade_schema()
 
-room_users = {}
+@app.on_event("shutdown")
+def shutdown_judge():
+    judge.shutdown()
+    analyzer.shutdown()
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,6 +47,7 @@ app.add_middleware(
     allow_methods=["*"],  
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 def get_db():
     db = SessionLocal()
@@ -29,75 +56,120 @@ def get_db():
     finally:
         db.close()
 
-class ConnectionManager:
-    def __init__(self):
-        self.rooms: Dict[str, List[WebSocket]] = {}
-        self.started_rooms: set = set()
-
-    async def connect(self, room_id: str, websocket: WebSocket):
-        await websocket.accept()
-        if room_id not in self.rooms:
-            self.rooms[room_id] = []
-        self.rooms[room_id].append(websocket)
-        await self.broadcast_count(room_id)
-
-    async def disconnect(self, room_id: str, websocket: WebSocket):
-        self.rooms[room_id].remove(websocket)
-        if not self.rooms[room_id]:
-            del self.rooms[room_id]
-        else:
-            await self.broadcast_count(room_id)
-
-    async def broadcast(self, room_id: str, message: str):
-        if room_id in self.rooms:
-            for connection in self.rooms[room_id]:
-                await connection.send_text(message)
-
-    async def broadcast_count(self, room_id: str):
-        if room_id in self.rooms:
-            count_message = f"count:{len(self.rooms[room_id])}"
-            await self.broadcast(room_id, count_message)
-
-    def start_room(self, room_id: str):
-        self.started_rooms.add(room_id)
-
-    def is_room_started(self, room_id: str) -> bool:
-        return room_id in self.started_rooms
+# async 핸들러용. 쿼리가 이벤트 루프를 막지 않도록 aiosqlite 세션을 쓴다
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
 manager = ConnectionManager()
+metrics.watch_connections(manager)
+reaper = RoomReaper(manager, similarity_index)
+
+@app.on_event("startup")
+async def start_manager():
+    await manager.start()
+
+@app.on_event("shutdown")
+async def stop_manager():
+    await manager.stop()
+
+@app.on_event("startup")
+async def start_reaper():
+    await reaper.start()
+
+@app.on_event("shutdown")
+async def stop_reaper():
+    await reaper.stop()
+
+@app.on_event("startup")
+async def start_answer_writer():
+    await answer_writer.start()
+
+@app.on_event("shutdown")
+async def stop_answer_writer():
+    await answer_writer.stop()
+
+@app.get("/metrics")
+def read_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def touch_room(room_id: str):
+    db = SessionLocal()
+    try:
+        db.execute(update(models.Room).where(models.Room.codeID == room_id).values(last_active=time.time()))
+        db.commit()
+    finally:
+        db.close()
 
+def is_start_message(data: str) -> bool:
+    # 예전 클라이언트는 "start" 문자열을, v=1 클라이언트는 {"type": "start"} 를 보낸다. 공백이나 키 순서는 상관없다
+    if data.strip() == "start":
+        return True
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("type") == "start"
+
+# v=1 이면 room_events 의 JSON 이벤트를 받는다. since/epoch 를 주면 놓친 이벤트부터 이어 받는다.
+# hb=1 이면 서버가 보내는 ping 에 pong 으로 답하겠다는 뜻이고, 오래 아무것도 보내지 않으면 끊긴다
 @app.websocket("/ws/{room_id}")
-async def websocket_endpoint(websocket: WebSocket, room_id: str):
-    await manager.connect(room_id, websocket)
+async def websocket_endpoint(websocket: WebSocket, room_id: str, v: int = 0, user: Optional[str] = None,
+                             since: Optional[int] = None, epoch: Optional[str] = None, hb: int = 0):
+    connection = await manager.connect(room_id, websocket, version=v, user=user, since=since, epoch=epoch,
+                                       heartbeat=bool(hb))
+    if connection is None:
+        return
     try:
-        while True:
+        # 퇴출이나 방 삭제로 서버가 먼저 닫았으면 더 읽지 않는다
+        while not connection.closing:
             data = await websocket.receive_text()
-            if data == "start":
-                manager.start_room(room_id)
-                await manager.broadcast(room_id, f"Room {room_id} has started!")
+            manager.seen(room_id, connection)
+            if is_start_message(data):
+                await asyncio.to_thread(touch_room, room_id)
+                await manager.start_room(room_id)
+                await manager.publish(room_id, "start", {})
     except WebSocketDisconnect:
-         await manager.disconnect(room_id, websocket)
+        pass
+    finally:
+        # 어떤 이유로 끝나든 등록과 인원수를 정리한다. 서버가 먼저 내보낸 연결이면 아무것도 하지 않는다
+        await manager.disconnect(room_id, websocket)
+
+def room_counts_event(total: int, finished: int) -> dict:
+    return {"total_users": total, "active_users": total - finished, "finished_users": finished}
+
+async def publish_events(room_id: str, events: list):
+    for kind, data in events:
+        await manager.publish(room_id, kind, data)
 
 ################# 질문 관련 api ####################
 @app.post("/api/questions")
-async def create_question(question: schemas.QuestionCreate, db: Session = Depends(get_db)):
+async def create_question(question: schemas.QuestionCreate, db: AsyncSession = Depends(get_async_db)):
     db_question = models.Question(content=clean_code(question.content))
     db.add(db_question)
-    db.commit()
-    db.refresh(db_question)
+    await db.commit()
+    await db.refresh(db_question)
+    question_cache.invalidate()
     return db_question
 
+# 조회 응답은 question_cache 의 직렬화된 바이트를 그대로 보내고, If-None-Match 가 맞으면 304 로 답한다
 @app.get("/api/questions/{question_id}", response_model=schemas.QuestionCreate)
-def read_question(question_id: int, db: Session = Depends(get_db)):
-    question = db.query(models.Question).filter(models.Question.id == question_id).first()
-    if question is None:
+def read_question(question_id: int, request: Request, db: Session = Depends(get_db)):
+    def load():
+        question = db.query(models.Question).filter(models.Question.id == question_id).first()
+        return None if question is None else question_adapter.dump_json(question)
+
+    cached = question_cache.get(question_id, load)
+    if cached is None:
         raise HTTPException(status_code=404, detail="Question not found")
-    return question
+    return question_cache.respond(request, cached)
 
 @app.get("/api/questions/all/", response_model=List[schemas.QuestionCreate])
-def read_all_question(db: Session = Depends(get_db)):
-    questions = db.query(models.Question).all()
-    return questions
+def read_all_question(request: Request, db: Session = Depends(get_db)):
+    def load():
+        return question_list_adapter.dump_json(db.query(models.Question).all())
+
+    return question_cache.respond(request, question_cache.get(ALL, load))
 
 @app.delete("/api/questions/{question_id}", response_model=schemas.QuestionCreate)
 def delete_question(question_id: int, db: Session = Depends(get_db)):
@@ -106,110 +178,163 @@ def delete_question(question_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Question not found")
     db.delete(question)
     db.commit()
+    question_cache.invalidate()
     return {"detail": "Question deleted successfully"}
 
+@app.post("/api/questions/{question_id}/testcases", response_model=schemas.TestCase)
+def create_test_case(question_id: int, test_case: schemas.TestCaseCreate, db: Session = Depends(get_db)):
+    question = db.query(models.Question).filter(models.Question.id == question_id).first()
+    if question is None:
+        raise HTTPException(status_code=404, detail="Question not found")
+    db_test_case = models.TestCase(
+        question_id=question_id,
+        input_data=test_case.input_data,
+        expected_output=test_case.expected_output
+    )
+    db.add(db_test_case)
+    db.commit()
+    db.refresh(db_test_case)
+    judge.invalidate(question_id)
+    return db_test_case
+
+@app.get("/api/questions/{question_id}/testcases", response_model=List[schemas.TestCase])
+def read_test_cases(question_id: int, db: Session = Depends(get_db)):
+    return db.query(models.TestCase).filter(models.TestCase.question_id == question_id).all()
+
 ################ 입장시 게스트 생성 #####################
 
 @app.get("/api/user/{user_id}")
-async def read_user(user_id: str, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def read_user(user_id: str, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return {"created_at": user.created_at}
 
 @app.post("/api/room/enter")
-def enter_room(response: Response,room_data: schemas.RoomEnter, db: Session = Depends(get_db)):
+def enter_room(response: Response,room_data: schemas.RoomEnter, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    # 스레드풀에서 도는 동기 엔드포인트라서 브로커 코루틴은 이벤트 루프에 맡겨 기다린다.
+    # sqlite 브로커는 이때 DB 연결을 따로 하나 쓰므로, 이 요청의 세션이 연결을 잡기 전에 먼저 묻는다.
+    # 순서가 반대면 입장이 몰릴 때 요청마다 연결 둘을 겹쳐 잡아 커넥션 풀이 바닥난다
+    started = anyio.from_thread.run(manager.is_room_started, room_data.codeID)
     room = db.query(models.Room).filter(models.Room.codeID == room_data.codeID).first()
     if not room:
         raise HTTPException(status_code=404, detail="올바르지 않은 초대코드입니다.")
-    if manager.is_room_started(room_data.codeID):
+    if started:
         raise HTTPException(status_code=400, detail="이미 시작된 방입니다.")
     if room.pw != room_data.pw:
         raise HTTPException(status_code=403, detail="비밀번호가 일치하지 않습니다.")
 
-    existing_users = db.query(models.User).filter(models.User.id.like(f"{room_data.codeID}-%")).count()
-    guest_id = f"{room_data.codeID}-{existing_users+1 }"
+    # UPDATE ... RETURNING 한 번으로 번호를 올리고 가져온다. 쓰기 잠금 안에서 일어나므로 동시에 들어와도 겹치지 않는다
+    guest_number, total, finished = db.execute(
+        update(models.Room)
+        .where(models.Room.codeID == room_data.codeID)
+        .values(next_guest=models.Room.next_guest + 1, user_count=models.Room.user_count + 1, last_active=time.time())
+        .returning(models.Room.next_guest, models.Room.user_count, models.Room.finished_count)
+    ).one()
+    guest_id = f"{room_data.codeID}-{guest_number}"
 
-    new_user = models.User(id=guest_id, is_guest=True,finish = False)
+    new_user = models.User(id=guest_id, is_guest=True,finish = False, room_code=room_data.codeID)
     db.add(new_user)
     db.commit()
-    if room_data.codeID not in room_users:
-        room_users[room_data.codeID] = []
-    room_users[room_data.codeID].append(guest_id)
+    background_tasks.add_task(publish_events, room_data.codeID, [
+        ("join", {"user": guest_id, "is_guest": True}),
+        ("rank", room_counts_event(total, finished)),
+    ])
     response.set_cookie(key="guest_id", value=guest_id) 
     return {"guest_id": guest_id, "message": "성공적으로 방에 입장했습니다."}
 @app.get("/api/room/{roomCode}/rank/{guest_id}")
 def get_user_rank(roomCode: str, guest_id: str, db: Session = Depends(get_db)):
-    try:
-        current_users = db.query(models.User).filter(
-            models.User.id.like(f"{roomCode}-%"), 
-            models.User.finish == False
-        ).order_by(models.User.id).all()
-        user_ids = [user.id for user in current_users]
-        print("Current Users IDs:", user_ids) 
-        print("Guest ID:", guest_id)  
-     
-        
-        rank = user_ids.index(guest_id) + 1
-        
-        return {"rank": rank, "total_users": len(current_users)}
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # 종료할 때 매겨 둔 등수와 방 카운터만 기본키로 읽는다. 아직 끝내지 않았으면 rank 는 null
+    row = db.execute(
+        select(models.User.finish_rank, models.Room.user_count)
+        .join(models.Room, models.Room.codeID == models.User.room_code)
+        .where(models.User.id == guest_id, models.User.room_code == roomCode)
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
+    return {"rank": row.finish_rank, "total_users": row.user_count}
 
 
 
 
 @app.get("/api/room/{codeID}/guests", response_model=List[schemas.UserCreate])
 def read_all_guests_in_room(codeID: str, db: Session = Depends(get_db)):
-    guests = db.query(models.User).filter(models.User.id.like(f"{codeID}-%")).all()
+    guests = db.query(models.User).filter(models.User.room_code == codeID).all()
     return guests
 
 @app.get("/api/room/{codeID}/guestcount")
 def get_guest_count(codeID: str, db: Session = Depends(get_db)):
-    guest_count = db.query(models.User).filter(models.User.id.like(f"{codeID}-%")).count()
-    return {"guest_count": guest_count}
+    guest_count = db.query(models.Room.user_count).filter(models.Room.codeID == codeID).scalar()
+    return {"guest_count": guest_count or 0}
 ################# 방 생성 api ####################
 @app.post("/api/room_create", response_model=schemas.RoomCreate)
-def create_room(response: Response,room: schemas.RoomCreate, db: Session = Depends(get_db)):
+def create_room(response: Response,room: schemas.RoomCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # 방 코드 중복 검사
     existing_room = db.query(models.Room).filter(models.Room.codeID == room.codeID).first()
     if existing_room:
         raise HTTPException(status_code=400, detail="중복된 코드입니다")  # 중복된 방 코드 처리
 
-    db_room = models.Room(codeID=room.codeID, pw=room.pw)
+    # 방장까지 한 트랜잭션으로 넣으므로 인원은 1명에서 시작한다
+    db_room = models.Room(codeID=room.codeID, pw=room.pw, user_count=1)
     db.add(db_room)
-    db.commit()
-    db.refresh(db_room)
     
     host_id = f"{room.codeID}-1" 
-    new_host = models.User(id=host_id, is_guest=False) 
+    new_host = models.User(id=host_id, is_guest=False, room_code=room.codeID) 
     db.add(new_host)
     db.commit()
-    if room.codeID not in room_users:
-        room_users[room.codeID] = []
+    db.refresh(db_room)
+    background_tasks.add_task(publish_events, room.codeID, [
+        ("join", {"user": host_id, "is_guest": False}),
+        ("rank", room_counts_event(1, 0)),
+    ])
     response.set_cookie(key="guest_id", value=host_id) 
     response.set_cookie(key="inRoom", value=True) 
 
     return db_room
 @app.patch("/api/user/finish/{user_id}")
-def finish_user_session(user_id: str, db: Session = Depends(get_db)):
+def finish_user_session(user_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    user.finish = True
+    if user.finish:
+        return {"message": "User session finished", "rank": user.finish_rank}
+
+    # 조건부 UPDATE 로 처음 끝내는 요청만 카운터를 올린다. 같은 유저가 두 번 보내도 등수는 하나다
+    finished = db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.finish == False)
+        .values(finish=True)
+    ).rowcount
+    if finished:
+        counts = db.execute(
+            update(models.Room)
+            .where(models.Room.codeID == user.room_code)
+            .values(finished_count=models.Room.finished_count + 1, last_active=time.time())
+            .returning(models.Room.finished_count, models.Room.user_count)
+        ).first()
+        rank = counts.finished_count if counts is not None else None
+        db.execute(update(models.User).where(models.User.id == user_id).values(finish_rank=rank))
+        if counts is not None:
+            background_tasks.add_task(publish_events, user.room_code, [
+                ("finish", {"user": user_id, "rank": rank}),
+                ("rank", room_counts_event(counts.user_count, counts.finished_count)),
+            ])
+    else:
+        # 동시에 들어온 같은 유저의 다른 요청이 먼저 끝냈다. 그쪽이 매긴 등수를 돌려준다
+        rank = db.scalar(select(models.User.finish_rank).where(models.User.id == user_id))
     db.commit()
-    return {"message": "User session finished"}
+    return {"message": "User session finished", "rank": rank}
 
 @app.get("/api/room/{roomCode}/user_stats")
 def get_user_stats(roomCode: str, db: Session = Depends(get_db)):
-    all_users = db.query(models.User).filter(models.User.id.like(f"{roomCode}-%")).all()
-    active_users = [user for user in all_users if not user.finish]
+    # enter_room / finish_user_session 이 올려 둔 카운터를 방 행 하나에서 읽는다
+    counts = db.query(models.Room.user_count, models.Room.finished_count).filter(models.Room.codeID == roomCode).first()
+    total, finished = counts if counts is not None else (0, 0)
     
     return {
-        "total_users": len(all_users),
-        "active_users": len(active_users)
+        "total_users": total,
+        "active_users": total - finished,
+        "finished_users": finished
     }
 
 
@@ -219,33 +344,63 @@ def read_all_room(db: Session = Depends(get_db)):
     return db_rooms
 
 @app.delete("/api/room/{codeID}")
-async def delete_room(codeID: str, db: Session = Depends(get_db)):
-    room = db.query(models.Room).filter(models.Room.codeID == codeID).first()
+async def delete_room(codeID: str, db: AsyncSession = Depends(get_async_db)):
+    room = await db.get(models.Room, codeID)
     if not room:
         raise HTTPException(status_code=404, detail="방을 찾을 수 없습니다.")
-    db.delete(room)
-    db.commit()
+    await db.delete(room)
+    await db.commit()
 
-    if codeID in manager.rooms:
-        for websocket in manager.rooms[codeID]:
-            await websocket.close()
-        del manager.rooms[codeID]
+    await manager.close_room(codeID)
+    similarity_index.forget(codeID)
 
     return {"message": "방이 삭제되었습니다."}
 
 ################## 질문 답 api######################
+def answer_row(answer: schemas.AnswerCreate) -> dict:
+    return {
+        "content": clean_code(answer.content),
+        "question_id": answer.question_id,
+        "user_id": answer.user_id,
+    }
+
+# 제출은 answer_writer 가 모아서 한 번에 커밋한다. 커밋이 끝난 뒤에 응답한다
+async def answers_saved(saved: List[dict]):
+    # 저장이 끝난 답안을 방별로 묶어 유사도 색인에 넣고 answer 이벤트를 보낸다. 이벤트에 내용은 싣지 않는다
+    async with AsyncSessionLocal() as db:
+        rooms = dict((await db.execute(
+            select(models.User.id, models.User.room_code)
+            .where(models.User.id.in_({row["user_id"] for row in saved}))
+        )).all())
+    by_room: Dict[str, List[dict]] = {}
+    for row in saved:
+        room_id = rooms.get(row["user_id"])
+        if room_id is not None:
+            by_room.setdefault(room_id, []).append(row)
+    for room_id, rows in by_room.items():
+        similarity_index.add(room_id, rows)
+        for row in rows:
+            await manager.publish(room_id, "answer", {
+                "user": row["user_id"], "question_id": row["question_id"], "answer_id": row["id"]
+            })
+
 @app.post("/api/answers", response_model=schemas.AnswerCreate)
-def create_answer(answer: schemas.AnswerCreate, db: Session = Depends(get_db)):
-    answerContent = clean_code(answer.content)
-    db_answer = models.Answer(
-        content=answerContent,
-        question_id=answer.question_id,
-        user_id=answer.user_id
-    )
-    db.add(db_answer)
-    db.commit()
-    db.refresh(db_answer)
-    return db_answer
+async def create_answer(answer: schemas.AnswerCreate, background_tasks: BackgroundTasks):
+    saved = await answer_writer.submit([answer_row(answer)])
+    background_tasks.add_task(answers_saved, saved)
+    return saved[0]
+
+@app.post("/api/answers/batch", response_model=List[schemas.Answer])
+async def create_answers(answers: List[schemas.AnswerCreate], background_tasks: BackgroundTasks):
+    if not answers:
+        return []
+    saved = await answer_writer.submit([answer_row(answer) for answer in answers])
+    background_tasks.add_task(answers_saved, saved)
+    return saved
+
+@app.get("/api/answers/writer/stats")
+def read_answer_writer_stats():
+    return answer_writer.stats()
 
 @app.delete("/api/answers/{answer_id}", response_model=schemas.AnswerCreate)
 def delete_answer(answer_id: int, db: Session = Depends(get_db)):
@@ -261,39 +416,253 @@ def read_all_answers(db: Session = Depends(get_db)):
     answers = db.query(models.Answer).all()
     return answers
 
-@app.get("/api/questions/{question_id}/answers", response_model=List[schemas.AnswerCreate])
-def read_answers_for_question(question_id: int, db: Session = Depends(get_db)):
-    answers = db.query(models.Answer).filter(models.Answer.question_id == question_id).all()
-    return answers
+@app.get("/api/answers/{answer_id}/judge")
+async def judge_answer(answer_id: int, db: AsyncSession = Depends(get_async_db)):
+    # 보고서의 test_pass / execution_time / memory_usage 를 실제 실행 결과로 채운다
+    answer = await db.get(models.Answer, answer_id)
+    if answer is None:
+        raise HTTPException(status_code=404, detail="Answer not found")
+    cases = [
+        (case.input_data, case.expected_output)
+        for case in await db.scalars(
+            select(models.TestCase).where(models.TestCase.question_id == answer.question_id).order_by(models.TestCase.id)
+        )
+    ]
+    if not cases:
+        raise HTTPException(status_code=404, detail="테스트케이스가 없는 문제입니다.")
+    return await judge.judge(answer.question_id, restore_code(answer.content), cases)
+
+@app.get("/api/answers/{answer_id}/analysis")
+async def analyze_stored_answer(answer_id: int, db: AsyncSession = Depends(get_async_db)):
+    # 보고서의 code_style / time_complexity 를 정적 분석으로 채운다. time_complexity 가 null 이면 정하지 못한 것
+    answer = await db.get(models.Answer, answer_id)
+    if answer is None:
+        raise HTTPException(status_code=404, detail="Answer not found")
+    return await analyzer.analyze(restore_code(answer.content))
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-@app.get("/api/room/{roomCode}/rank/{guest_id}")
-def get_user_rank(roomCode: str, guest_id: str, db: Session = Depends(get_db)):
+@app.get("/api/analyzer/stats")
+def read_analyzer_stats():
+    return analyzer.stats()
+
+# 답안 조회는 방/유저/문제 단위로 인덱스를 타고, id 기준 keyset 커서로 페이지를 나눈다.
+# 응답은 {"items": [...], "next_cursor": id | null} 형태이며 행을 읽는 대로 흘려보낸다.
+# /api/questions/{id}/answers 만은 예전 호출자를 위해 커서 없이 부르면 배열로 답한다.
+ANSWER_PAGE_SIZE = 100
+ANSWER_PAGE_MAX = 1000
+ANSWER_STREAM_CHUNK = 64
+
+def stream_answer_page(filter_clause, after: int, limit: int):
+    db = SessionLocal()
     try:
-        current_users = db.query(models.User).filter(
-            and_(
-                models.User.room_code == roomCode,
-                models.User.finish == False
+        rows = (
+            db.query(models.Answer.id, models.Answer.content, models.Answer.question_id, models.Answer.user_id)
+            .filter(filter_clause, models.Answer.id > after)
+            .order_by(models.Answer.id)
+            .limit(limit + 1)
+            .yield_per(ANSWER_STREAM_CHUNK)
+        )
+        yield '{"items":['
+        chunk = []
+        count = 0
+        last_id = None
+        next_cursor = None
+        for row in rows:
+            # limit + 1 번째 행이 있으면 다음 페이지가 남아 있다
+            if count == limit:
+                next_cursor = last_id
+                break
+            item = json.dumps(
+                {"id": row.id, "content": row.content, "question_id": row.question_id, "user_id": row.user_id},
+                ensure_ascii=False,
             )
-        ).all()
-        guest = db.query(models.User).filter(models.User.id == guest_id).first()
-        if not guest:
-            raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
-        
-        rank = current_users.index(guest) + 1 if guest in current_users else None
-        
-        if rank is None:
-            raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다.")
-        
-        return {"rank": rank}
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            chunk.append(item if count == 0 else "," + item)
+            count += 1
+            last_id = row.id
+            if len(chunk) >= ANSWER_STREAM_CHUNK:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+        yield '],"next_cursor":' + json.dumps(next_cursor) + "}"
+    finally:
+        db.close()
+
+# 커서 없이 부르던 예전 호출용. 페이지를 나누지 않고 예전 응답 모양(id 없는 답안 객체 배열)으로 전부 흘려보낸다
+def stream_answer_list(filter_clause):
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(models.Answer.content, models.Answer.question_id, models.Answer.user_id)
+            .filter(filter_clause)
+            .order_by(models.Answer.id)
+            .yield_per(ANSWER_STREAM_CHUNK)
+        )
+        yield "["
+        chunk = []
+        for count, row in enumerate(rows):
+            item = json.dumps(
+                {"content": row.content, "question_id": row.question_id, "user_id": row.user_id},
+                ensure_ascii=False,
+            )
+            chunk.append(item if count == 0 else "," + item)
+            if len(chunk) >= ANSWER_STREAM_CHUNK:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+        yield "]"
+    finally:
+        db.close()
+
+def answer_page_response(filter_clause, after: int, limit: int):
+    return StreamingResponse(stream_answer_page(filter_clause, after, limit), media_type="application/json")
+
+def room_answer_filter(codeID: str):
+    # user.room_code 인덱스로 방 유저를 찾고 answer.user_id 인덱스로 답안을 찾는다
+    room_user_ids = select(models.User.id).where(models.User.room_code == codeID)
+    return models.Answer.user_id.in_(room_user_ids)
+
+@app.get("/api/room/{codeID}/answers")
+def read_answers_in_room(codeID: str, after: int = 0, limit: int = Query(ANSWER_PAGE_SIZE, ge=1, le=ANSWER_PAGE_MAX)):
+    return answer_page_response(room_answer_filter(codeID), after, limit)
+
+# 방 결과 내보내기. 유저 - 답안 - 문제를 한 번에 조인해 서버 쪽 커서로 EXPORT_CHUNK_ROWS 행씩 읽고 바로 흘려보낸다.
+# 답안이 없는 유저도 답안 칸을 비운 한 줄로 나온다. gzip=true 면 조각마다 sync flush 해서 첫 바이트가 늦지 않게 한다
+EXPORT_CHUNK_ROWS = 500
+EXPORT_COLUMNS = ["room", "user_id", "is_guest", "finish", "finish_rank", "answer_id", "question_id", "question", "answer"]
+
+def export_rows(room_codes: List[str]):
+    db = SessionLocal()
+    try:
+        query = (
+            select(
+                models.User.room_code, models.User.id, models.User.is_guest, models.User.finish, models.User.finish_rank,
+                models.Answer.id, models.Answer.question_id, models.Question.content, models.Answer.content,
+            )
+            .outerjoin(models.Answer, models.Answer.user_id == models.User.id)
+            .outerjoin(models.Question, models.Question.id == models.Answer.question_id)
+            .where(models.User.room_code.in_(room_codes))
+            .order_by(models.User.room_code, models.User.id, models.Answer.id)
+            .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+        )
+        for partition in db.execute(query).partitions():
+            yield partition
+    finally:
+        db.close()
+
+def encode_csv(partitions):
+    # 엑셀에서 한글이 깨지지 않도록 BOM 을 붙인다
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+def encode_ndjson(partitions):
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows
+        ).encode("utf-8")
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def export_response(room_codes: List[str], name: str, format: str, gzip: bool) -> StreamingResponse:
+    encode = encode_csv if format == "csv" else encode_ndjson
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    filename = f"{name}.{format}"
+    chunks = encode(export_rows(room_codes))
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/api/room/{codeID}/export")
+def export_room(codeID: str, format: str = Query("csv", pattern="^(csv|ndjson)$"), gzip: bool = False,
+                db: Session = Depends(get_db)):
+    if db.query(models.Room.codeID).filter(models.Room.codeID == codeID).first() is None:
+        raise HTTPException(status_code=404, detail="방을 찾을 수 없습니다.")
+    return export_response([codeID], f"room-{codeID}", format, gzip)
+
+# 여러 방을 한 파일로. ?room=a&room=b 처럼 방 코드를 여러 번 준다
+@app.get("/api/rooms/export")
+def export_rooms(room: List[str] = Query(..., min_length=1), format: str = Query("csv", pattern="^(csv|ndjson)$"),
+                 gzip: bool = False):
+    return export_response(room, "rooms", format, gzip)
+
+# 문제/답안 본문 검색. 공백으로 나눈 조각(따옴표로 묶으면 한 조각)이 모두 들어 있는 것을 잘 맞는 순서로 준다.
+# room, question_id 는 답안 검색에만 쓴다
+@app.get("/api/search")
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: str = Query("answer", pattern="^(answer|question)$"),
+    room: Optional[str] = None,
+    question_id: Optional[int] = None,
+    limit: int = Query(config.SEARCH_PAGE_SIZE, ge=1, le=config.SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0, le=config.SEARCH_MAX_OFFSET),
+    db: Session = Depends(get_db),
+):
+    try:
+        terms = parse_terms(q)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    # 한 행 더 읽어서 다음 페이지가 있는지 본다
+    if kind == "answer":
+        items = search_answers(db, terms, limit + 1, offset, room=room, question_id=question_id)
+    else:
+        items = search_questions(db, terms, limit + 1, offset)
+    next_offset = offset + limit if len(items) > limit else None
+    return {"items": items[:limit], "next_offset": next_offset}
+
+# 거의 같은 답안 쌍. 색인이 없거나 다른 워커에서 저장된 답안이 있으면 빠진 것만 DB 에서 읽어 채운다
+@app.get("/api/room/{codeID}/similarity")
+async def read_room_similarity(
+    codeID: str,
+    threshold: float = Query(config.SIMILARITY_THRESHOLD, ge=config.SIMILARITY_MIN_SCORE, le=1.0),
+    limit: int = Query(ANSWER_PAGE_SIZE, ge=1, le=ANSWER_PAGE_MAX),
+    question_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    index = similarity_index.room(codeID)
+    async with index.lock:
+        stored = set((await db.execute(select(models.Answer.id).where(room_answer_filter(codeID)))).scalars())
+        if index.answer_ids - stored:
+            # 지워진 답안이 있으면 처음부터 다시 만든다
+            index.reset()
+        missing = stored - index.answer_ids
+        if missing:
+            columns = select(models.Answer.id, models.Answer.user_id, models.Answer.question_id, models.Answer.content)
+            query = columns.where(room_answer_filter(codeID)) if not index.answer_ids else columns.where(models.Answer.id.in_(missing))
+            rows = (await db.execute(query)).all()
+            index.add(await asyncio.to_thread(make_entries, rows))
+    return {"answers": len(index.answer_ids), "pairs": index.pairs(threshold, limit, question_id)}
+
+@app.get("/api/user/{user_id}/answers")
+def read_answers_for_user(user_id: str, after: int = 0, limit: int = Query(ANSWER_PAGE_SIZE, ge=1, le=ANSWER_PAGE_MAX)):
+    return answer_page_response(models.Answer.user_id == user_id, after, limit)
+
+# 예전부터 쓰던 경로라서 after 도 limit 도 없으면 예전처럼 답안 배열을 그대로 준다.
+# 둘 중 하나라도 주면 다른 답안 조회처럼 {"items", "next_cursor"} 페이지로 답한다
+@app.get("/api/questions/{question_id}/answers")
+def read_answers_for_question(question_id: int, after: Optional[int] = None,
+                              limit: Optional[int] = Query(None, ge=1, le=ANSWER_PAGE_MAX)):
+    filter_clause = models.Answer.question_id == question_id
+    if after is None and limit is None:
+        return StreamingResponse(stream_answer_list(filter_clause), media_type="application/json")
+    return answer_page_response(filter_clause, after or 0, limit or ANSWER_PAGE_SIZE)
+
 ############ report관련 도구 ############
 
 from pydantic import BaseModel
-import re
 
 class CodeRequest(BaseModel):
     code: str
@@ -302,13 +671,8 @@ class AnswerCreate:
     def __init__(self, content):
         self.content = content
 
-def clean_code(code: str) -> str:
-    code = re.sub(r'#.*', '', code)
-    code = re.sub(r'"""(.*?)"""', '', code, flags=re.DOTALL)
-    code = code.replace('\t', '\\t')
-    code = code.replace('\n', '\\n')
-    code = re.sub(r'\s+', ' ', code)
-    return code.strip()
+# clean_code 는 저장용(실행 가능한 형태), compact_code 는 캐시 키 등 비교용이다
+from normalizer import clean_code, compact_code
 
 
 import os
@@ -321,28 +685,57 @@ class GPTRequest(BaseModel):
     problem: str
     answer : str
     max_tokens: int = 300 
+    # 방/유저 예산을 나누는 기준. 없으면 접속 주소 단위로 센다
+    user_id: Optional[str] = None
+    room_id: Optional[str] = None
+
+async def llm_ticket(request: Request, user_id: Optional[str], room_id: Optional[str]) -> tuple:
+    # 방 버킷의 크기를 방 인원에 맞추도록 인원 수도 같이 넘긴다
+    room_size = 0
+    if user_id or room_id:
+        async with AsyncSessionLocal() as db:
+            if user_id and not room_id:
+                room_id = await db.scalar(select(models.User.room_code).where(models.User.id == user_id))
+            if room_id:
+                room_size = await db.scalar(select(models.Room.user_count).where(models.Room.codeID == room_id)) or 0
+    if not user_id:
+        user_id = f"ip:{request.client.host}" if request.client else None
+    return room_id, user_id, room_size
+
+def too_many_requests(e: RateLimited) -> HTTPException:
+    return HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+def report_messages(problem: str, answer: str) -> list:
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": (
+f'{problem}에 대한 답으로 작성한 코드는 다음과 같습니다: {answer}. 이 코드를 실행했을 때 얻은 결과를 딕셔너리 형식으로 반환해 주세요. 다른 설명이나 주석은 필요 없습니다. 형식 예시: {{"test_pass": "통과", "time_complexity": "O(1)", "code_style": "PEP8 준수", "execution_time": "0.5ms", "memory_usage": "100kb"}}.만약 실행되지 않거나 틀린 코드라면, {{"test_pass": "통과x", "time_complexity": "x", "code_style": "x", "execution_time": "x", "memory_usage": "x"}} 만약 코드 제출이 없다면 {{"test_pass": "통과x", "time_complexity": "코드제출 x", "code_style": "코드제출 x", "execution_time": "코드제출x", "memory_usage": "코드제출 x"}}.형식으로만 응답하세요.'
+'                코드스타일 설명할 때 딱 pep8준수 , 잘함, 우수함 이따구로 적지말고어떻게 고치면 더 좋은 코드가 될지 간결하게 말해달란거였어'
+'제발 실행이 가능한 코드는 실행하고 문제에 맞게 출력물이 나오는지 확인하고 안나오면 테스트케이스 통과 x , 나오면 통과로 적어줘. 그리고 메모리사용량이나 실행시간은 데이터에 따라 다름이러지말고 높은 값 하나만 보내줘. '
+        )}
+    ]
+
+def report_key(problem: str, answer: str, max_tokens: int) -> str:
+    return cache_key("gpt-3.5-turbo", "report", [compact_code(problem), compact_code(answer)], max_tokens)
 
 @app.post("/generate-text/")
-async def generate_text(request: GPTRequest):
+async def generate_text(request: GPTRequest, http_request: Request):
+    key = report_key(request.problem, request.answer, request.max_tokens)
     try:
-        response = openai.ChatCompletion.create(
+        message = await llm_client.chat(
+            key,
             model="gpt-3.5-turbo",  
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": (
-f'{request.problem}에 대한 답으로 작성한 코드는 다음과 같습니다: {request.answer}. 이 코드를 실행했을 때 얻은 결과를 딕셔너리 형식으로 반환해 주세요. 다른 설명이나 주석은 필요 없습니다. 형식 예시: {{"test_pass": "통과", "time_complexity": "O(1)", "code_style": "PEP8 준수", "execution_time": "0.5ms", "memory_usage": "100kb"}}.만약 실행되지 않거나 틀린 코드라면, {{"test_pass": "통과x", "time_complexity": "x", "code_style": "x", "execution_time": "x", "memory_usage": "x"}} 만약 코드 제출이 없다면 {{"test_pass": "통과x", "time_complexity": "코드제출 x", "code_style": "코드제출 x", "execution_time": "코드제출x", "memory_usage": "코드제출 x"}}.형식으로만 응답하세요.'
-'                코드스타일 설명할 때 딱 pep8준수 , 잘함, 우수함 이따구로 적지말고어떻게 고치면 더 좋은 코드가 될지 간결하게 말해달란거였어'
-'제발 실행이 가능한 코드는 실행하고 문제에 맞게 출력물이 나오는지 확인하고 안나오면 테스트케이스 통과 x , 나오면 통과로 적어줘. 그리고 메모리사용량이나 실행시간은 데이터에 따라 다름이러지말고 높은 값 하나만 보내줘. '
-  )}
-            ],
-            max_tokens=request.max_tokens
+            messages=report_messages(request.problem, request.answer),
+            max_tokens=request.max_tokens,
+            priority=BATCH,
+            ticket=await llm_ticket(http_request, request.user_id, request.room_id)
         )
-        
-        if response.choices and response.choices[0].message:
-            return {"generated_text": response.choices[0].message['content'].strip()}
-        else:
-            raise HTTPException(status_code=500, detail="No valid response from API")
+        return {"generated_text": message['content'].strip()}
 
+    except RateLimited as e:
+        raise too_many_requests(e)
+    except LLMTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
     
@@ -352,20 +745,191 @@ class GPTRequest(BaseModel):
     user_code: str 
     max_tokens: int = 200  
     problem_statement: str  
+    # true 면 토큰을 받는 대로 text/event-stream 으로 보낸다
+    stream: bool = False
+    user_id: Optional[str] = None
+    room_id: Optional[str] = None
+
+def hint_messages(request: GPTRequest) -> list:
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": (
+            f"문제 설명: {request.problem_statement}\n\n"
+            f"다음 코드를 작성했어:\n\n{request.user_code}\n\n"
+            "이 코드와 문제 설명을 참고하여, 추가로 더하면 좋을 내용이나 어떻게 "
+            "진행되면 좋을지 힌트를 짧고 간결하게 한글로 설명해줘. 핵심만 간단히 100자 이내로 말해줘. 그리고 직접적인 코드 설명은 하지마."
+        )}
+    ]
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 힌트 스트림. token 이벤트마다 {"content": 조각}, 끝나면 done {"content": 전체}, 실패하면 error {"detail"}.
+# 클라이언트가 끊으면 StreamingResponse 가 이 제너레이터를 취소하고, 그 취소가 업스트림 요청까지 닫는다
+async def stream_hint(key: str, request: GPTRequest):
+    parts = []
+    try:
+        async for delta in llm_client.stream(key, model="gpt-4", messages=hint_messages(request), max_tokens=request.max_tokens,
+                                             priority=INTERACTIVE):
+            parts.append(delta)
+            yield sse("token", {"content": delta})
+    except LLMTimeout as e:
+        yield sse("error", {"detail": str(e)})
+        return
+    except Exception as e:
+        yield sse("error", {"detail": f"An error occurred: {e}"})
+        return
+    yield sse("done", {"content": "".join(parts)})
 
 @app.post("/generate-hint/")
-async def generate_hint(request: GPTRequest):
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": (
-                f"문제 설명: {request.problem_statement}\n\n"
-                f"다음 코드를 작성했어:\n\n{request.user_code}\n\n"
-                "이 코드와 문제 설명을 참고하여, 추가로 더하면 좋을 내용이나 어떻게 "
-                "진행되면 좋을지 힌트를 짧고 간결하게 한글로 설명해줘. 핵심만 간단히 100자 이내로 말해줘. 그리고 직접적인 코드 설명은 하지마."
-            )}
-        ],
-            max_tokens=request.max_tokens
-        )
-        return response.choices[0].message
\ No newline at end of file
+async def generate_hint(request: GPTRequest, http_request: Request):
+        key = cache_key("gpt-4", "hint", [compact_code(request.problem_statement), compact_code(request.user_code)], request.max_tokens)
+        ticket = await llm_ticket(http_request, request.user_id, request.room_id)
+        if request.stream:
+            # 예산 초과는 스트림을 열기 전에 429 로 알려야 한다
+            try:
+                await llm_client.admit(key, ticket)
+            except RateLimited as e:
+                raise too_many_requests(e)
+            return StreamingResponse(
+                stream_hint(key, request),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        try:
+            return await llm_client.chat(
+                key,
+                model="gpt-4",
+                messages=hint_messages(request),
+                max_tokens=request.max_tokens,
+                priority=INTERACTIVE,
+                ticket=ticket
+            )
+        except RateLimited as e:
+            raise too_many_requests(e)
+        except LLMTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+
+@app.get("/api/llm/cache/stats")
+def read_llm_cache_stats():
+    return llm_cache.stats()
+
+@app.get("/api/questions/cache/stats")
+def read_question_cache_stats():
+    return question_cache.stats()
+
+@app.get("/api/room/reaper/stats")
+def read_reaper_stats():
+    return reaper.stats()
+
+@app.get("/api/llm/stats")
+def read_llm_stats():
+    return llm_client.stats()
+############ 방 단위 일괄 보고서 ############
+
+EMPTY_REPORT = {
+    "test_pass": "통과x",
+    "time_complexity": "코드제출 x",
+    "code_style": "코드제출 x",
+    "execution_time": "코드제출x",
+    "memory_usage": "코드제출 x"
+}
+
+class RoomReportRequest(BaseModel):
+    user_id: Optional[str] = None
+    max_tokens: int = 150
+    # 문제 번호별 설명을 직접 넘기면 DB 의 문제 내용 대신 사용한다
+    problems: Dict[int, str] = {}
+
+# 정적 분석과 채점기가 정하는 항목. 둘 다 채워지면 LLM 을 부르지 않는다
+ANALYZED_FIELDS = ("time_complexity", "code_style")
+JUDGED_FIELDS = ("test_pass", "execution_time", "memory_usage")
+
+async def report_chat(problem: str, answer: models.Answer, max_tokens: int, ticket: tuple) -> dict:
+    # 방 예산은 캐시에 없어 실제로 LLM 을 부를 때만 쓴다. 보고서는 이미 스트림을 열었으므로
+    # 예산에 막히면 429 대신 retry_after 만큼 기다렸다가 다시 시도한다
+    for attempt in range(config.REPORT_RATE_LIMIT_RETRIES + 1):
+        try:
+            return await llm_client.chat(
+                report_key(problem, answer.content, max_tokens),
+                model="gpt-3.5-turbo",
+                messages=report_messages(problem, answer.content),
+                max_tokens=max_tokens,
+                priority=BATCH,
+                ticket=ticket
+            )
+        except RateLimited as e:
+            if attempt == config.REPORT_RATE_LIMIT_RETRIES:
+                raise
+            await asyncio.sleep(min(e.retry_after, config.LLM_TIMEOUT_SECONDS))
+
+async def analyze_answer(problem: str, answer: models.Answer, max_tokens: int, cases: list, ticket: tuple) -> dict:
+    code = restore_code(answer.content)
+    if not code.strip():
+        return dict(EMPTY_REPORT)
+    analysis = await analyzer.analyze(code)
+    decided = {field: analysis[field] for field in ANALYZED_FIELDS if analysis[field] is not None}
+    result = {}
+    if len(decided) < len(ANALYZED_FIELDS) or not cases:
+        try:
+            message = await report_chat(problem, answer, max_tokens, ticket)
+            result = json.loads(message['content'].strip().replace("'", '"'))
+        except Exception:
+            result = dict(EMPTY_REPORT)
+    result.update(decided)
+    if cases:
+        verdict = await judge.judge(answer.question_id, code, cases)
+        result["test_pass"] = verdict["test_pass"]
+        result["execution_time"] = verdict["execution_time"]
+        result["memory_usage"] = verdict["memory_usage"]
+    return result
+
+async def stream_room_report(jobs: list, max_tokens: int, ticket: tuple):
+    semaphore = asyncio.Semaphore(config.REPORT_CONCURRENCY)
+
+    async def run(answer, problem, cases):
+        # 답안 하나가 실패해도 스트림은 끊지 않고 그 답안 줄에 error 를 담아 보낸다
+        async with semaphore:
+            try:
+                return answer, {"result": await analyze_answer(problem, answer, max_tokens, cases, ticket)}
+            except Exception as e:
+                return answer, {"error": f"An error occurred: {e}"}
+
+    tasks = [asyncio.ensure_future(run(*job)) for job in jobs]
+    try:
+        # 끝나는 순서대로 한 줄씩 내보내서 첫 결과가 바로 그려지도록 한다
+        for next_done in asyncio.as_completed(tasks):
+            answer, outcome = await next_done
+            yield json.dumps({
+                "answer_id": answer.id,
+                "user_id": answer.user_id,
+                "question_id": answer.question_id,
+                **outcome
+            }, ensure_ascii=False) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/api/room/{codeID}/report")
+def create_room_report(codeID: str, request: RoomReportRequest, db: Session = Depends(get_db)):
+    # 안의 LLM 호출은 BATCH 우선순위로 힌트 뒤에 줄을 서고, 캐시에 없어 실제로 나갈 때만 방 버킷을 쓴다
+    room_size = db.query(models.Room.user_count).filter(models.Room.codeID == codeID).scalar() or 0
+    query = db.query(models.Answer, models.Question.content).outerjoin(
+        models.Question, models.Answer.question_id == models.Question.id
+    ).filter(room_answer_filter(codeID))
+    if request.user_id is not None:
+        query = query.filter(models.Answer.user_id == request.user_id)
+    rows = query.order_by(models.Answer.id).all()
+
+    question_ids = {answer.question_id for answer, _ in rows}
+    cases: Dict[int, list] = {}
+    for case in db.query(models.TestCase).filter(models.TestCase.question_id.in_(list(question_ids))).order_by(models.TestCase.id):
+        cases.setdefault(case.question_id, []).append((case.input_data, case.expected_output))
+
+    jobs = []
+    for answer, question_content in rows:
+        db.expunge(answer)
+        problem = request.problems.get(answer.question_id, question_content or "")
+        jobs.append((answer, problem, cases.get(answer.question_id, [])))
+    return StreamingResponse(stream_room_report(jobs, request.max_tokens, (codeID, None, room_size)),
+                             media_type="application/x-ndjson")
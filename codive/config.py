@@ -0,0 +1,136 @@
+import os
+
+# 실행 환경별 설정. 모두 CODIVE_ 접두사 환경변수로 덮어쓸 수 있다.
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(f"CODIVE_{name}")
+    return int(value) if value else default
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(f"CODIVE_{name}")
+    return float(value) if value else default
+
+def env_str(name: str, default: str) -> str:
+    return os.environ.get(f"CODIVE_{name}", default)
+
+
+################# 데이터베이스 ####################
+DATABASE_URL = env_str("DATABASE_URL", "sqlite:///./codive.db")
+# 비워 두면 DATABASE_URL 의 드라이버만 aiosqlite 로 바꿔서 쓴다
+ASYNC_DATABASE_URL = env_str("ASYNC_DATABASE_URL", "")
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT_SECONDS = env_float("DB_POOL_TIMEOUT_SECONDS", 30.0)
+SQLITE_BUSY_TIMEOUT_MS = env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_SYNCHRONOUS = env_str("SQLITE_SYNCHRONOUS", "NORMAL")
+
+################# 채점기 ####################
+JUDGE_WORKERS = env_int("JUDGE_WORKERS", os.cpu_count() or 2)
+JUDGE_CPU_SECONDS = env_int("JUDGE_CPU_SECONDS", 2)
+JUDGE_WALL_SECONDS = env_float("JUDGE_WALL_SECONDS", 5.0)
+JUDGE_MEMORY_MB = env_int("JUDGE_MEMORY_MB", 256)
+JUDGE_OUTPUT_KB = env_int("JUDGE_OUTPUT_KB", 256)
+JUDGE_CACHE_SIZE = env_int("JUDGE_CACHE_SIZE", 4096)
+
+################# 정적 분석 ####################
+ANALYZER_WORKERS = env_int("ANALYZER_WORKERS", max(1, (os.cpu_count() or 2) // 2))
+ANALYZER_CACHE_SIZE = env_int("ANALYZER_CACHE_SIZE", 8192)
+STYLE_MAX_LINE_LENGTH = env_int("STYLE_MAX_LINE_LENGTH", 79)
+# 보고서의 code_style 에 적는 지적 종류 수. 먼저 나오는 줄부터 고른다
+STYLE_MAX_FINDINGS = env_int("STYLE_MAX_FINDINGS", 3)
+
+################# LLM 응답 캐시 ####################
+LLM_CACHE_TTL_SECONDS = env_int("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+LLM_CACHE_MEMORY_ENTRIES = env_int("LLM_CACHE_MEMORY_ENTRIES", 1024)
+LLM_CACHE_MAX_ROWS = env_int("LLM_CACHE_MAX_ROWS", 50000)
+
+################# 문제 조회 캐시 ####################
+# 워커마다 따로 들고 있으므로 다른 워커에서 문제를 바꾸면 최대 이 시간 동안 이전 응답이 나간다
+QUESTION_CACHE_TTL_SECONDS = env_float("QUESTION_CACHE_TTL_SECONDS", 5.0)
+
+################# LLM 호출 ####################
+LLM_MAX_CONCURRENCY = env_int("LLM_MAX_CONCURRENCY", 8)
+LLM_TIMEOUT_SECONDS = env_float("LLM_TIMEOUT_SECONDS", 30.0)
+# 보고서 분석은 이만큼의 자리를 힌트용으로 남겨 두고 쓴다
+LLM_BATCH_RESERVE = env_int("LLM_BATCH_RESERVE", 2)
+# 자리를 기다리는 힌트 요청이 이보다 많으면 바로 429 로 거절한다
+LLM_MAX_QUEUE = env_int("LLM_MAX_QUEUE", 64)
+# 방/유저별 토큰 버킷. 분당 채워지는 양과 한 번에 쓸 수 있는 최대치
+LLM_ROOM_RATE_PER_MINUTE = env_float("LLM_ROOM_RATE_PER_MINUTE", 120.0)
+LLM_ROOM_BURST = env_float("LLM_ROOM_BURST", 40.0)
+# 방 버킷의 최대치는 max(LLM_ROOM_BURST, 방 인원 x 이 값). 인원이 많은 반이 보고서/힌트를 한꺼번에 받아도 거절되지 않게 한다
+LLM_ROOM_BURST_PER_USER = env_float("LLM_ROOM_BURST_PER_USER", 2.0)
+LLM_USER_RATE_PER_MINUTE = env_float("LLM_USER_RATE_PER_MINUTE", 6.0)
+LLM_USER_BURST = env_float("LLM_USER_BURST", 3.0)
+LLM_MAX_BUCKETS = env_int("LLM_MAX_BUCKETS", 10000)
+
+################# 일괄 보고서 ####################
+REPORT_CONCURRENCY = env_int("REPORT_CONCURRENCY", 8)
+# 보고서 안의 LLM 호출이 방 예산에 막히면 retry_after 만큼 기다렸다가 이 횟수까지 다시 시도한다
+REPORT_RATE_LIMIT_RETRIES = env_int("REPORT_RATE_LIMIT_RETRIES", 3)
+
+################# 웹소켓 ####################
+WS_SEND_QUEUE_SIZE = env_int("WS_SEND_QUEUE_SIZE", 64)
+WS_SEND_TIMEOUT_SECONDS = env_float("WS_SEND_TIMEOUT_SECONDS", 5.0)
+WS_COUNT_INTERVAL_SECONDS = env_float("WS_COUNT_INTERVAL_SECONDS", 0.1)
+# 재접속한 클라이언트에게 다시 보내 줄 수 있도록 방마다 최근 이벤트를 이만큼 들고 있는다
+WS_EVENT_BUFFER_SIZE = env_int("WS_EVENT_BUFFER_SIZE", 256)
+# hb=1 로 붙은 소켓에 ping 을 보내는 간격과, 아무것도 받지 못하면 끊는 시간
+WS_PING_INTERVAL_SECONDS = env_float("WS_PING_INTERVAL_SECONDS", 20.0)
+WS_IDLE_TIMEOUT_SECONDS = env_float("WS_IDLE_TIMEOUT_SECONDS", 60.0)
+# 워커 하나가 한 방에 받는 최대 소켓 수. 넘으면 1013 으로 닫는다
+WS_MAX_CONNECTIONS_PER_ROOM = env_int("WS_MAX_CONNECTIONS_PER_ROOM", 500)
+# close 프레임에 답이 없을 때 기다리는 시간
+WS_CLOSE_TIMEOUT_SECONDS = env_float("WS_CLOSE_TIMEOUT_SECONDS", 2.0)
+
+################# 방 상태 공유 ####################
+# memory: 워커 하나, sqlite: 같은 호스트의 여러 워커가 앱 DB 로 방 상태와 메시지를 공유
+ROOM_BROKER = env_str("ROOM_BROKER", "memory")
+BROKER_POLL_INTERVAL_SECONDS = env_float("BROKER_POLL_INTERVAL_SECONDS", 0.05)
+BROKER_EVENT_RETENTION_SECONDS = env_float("BROKER_EVENT_RETENTION_SECONDS", 60.0)
+BROKER_PRESENCE_TTL_SECONDS = env_float("BROKER_PRESENCE_TTL_SECONDS", 30.0)
+
+################# 코드 정규화 ####################
+NORMALIZER_MEMO_SIZE = env_int("NORMALIZER_MEMO_SIZE", 4096)
+
+################# 답안 저장 ####################
+# 제출을 모아 한 트랜잭션으로 커밋한다. 첫 제출 뒤 이 시간만큼 기다리거나 행 수가 차면 바로 쓴다
+ANSWER_FLUSH_INTERVAL_MS = env_float("ANSWER_FLUSH_INTERVAL_MS", 5.0)
+ANSWER_FLUSH_MAX_ROWS = env_int("ANSWER_FLUSH_MAX_ROWS", 200)
+
+################# 방 정리 ####################
+ROOM_REAPER_INTERVAL_SECONDS = env_float("ROOM_REAPER_INTERVAL_SECONDS", 60.0)
+# 이 시간 동안 메시지도 하트비트(pong)도 없으면 이 워커의 소켓을 닫고 메모리에서 내린다
+ROOM_IDLE_SECONDS = env_float("ROOM_IDLE_SECONDS", 30 * 60.0)
+# 모두 종료한 방은 이 시간이 지나면 이벤트 로그와 유사 답안 색인만 내린다. 답안은 지우지 않는다
+ROOM_FINISHED_TTL_SECONDS = env_float("ROOM_FINISHED_TTL_SECONDS", 10 * 60.0)
+# 끝나지 않았더라도 이 시간 동안 아무 활동이 없으면 같은 방식으로 정리한다
+ROOM_ABANDONED_TTL_SECONDS = env_float("ROOM_ABANDONED_TTL_SECONDS", 24 * 3600.0)
+# 마지막 활동 뒤 이 시간이 지난 방은 요약(room_archive/user_archive)만 남기고 user/answer 를 지운다.
+# 지운 방은 내보내기, 유사 답안, 검색에서 사라지므로 기본값 0(끔)이다. 켤 때는 90일처럼 보관 기간에 맞춰 길게 준다
+ROOM_PURGE_TTL_SECONDS = env_float("ROOM_PURGE_TTL_SECONDS", 0.0)
+ROOM_ARCHIVE_BATCH = env_int("ROOM_ARCHIVE_BATCH", 50)
+
+################# 유사 답안 색인 ####################
+# k 토큰짜리 조각의 해시를 window 개씩 묶어 최솟값만 지문으로 남긴다
+SIMILARITY_KGRAM = env_int("SIMILARITY_KGRAM", 5)
+SIMILARITY_WINDOW = env_int("SIMILARITY_WINDOW", 4)
+SIMILARITY_THRESHOLD = env_float("SIMILARITY_THRESHOLD", 0.7)
+# MinHash 서명 길이는 BANDS * ROWS. 한 밴드가 통째로 같은 답안끼리만 Jaccard 를 계산한다
+SIMILARITY_BANDS = env_int("SIMILARITY_BANDS", 8)
+SIMILARITY_ROWS = env_int("SIMILARITY_ROWS", 4)
+# 버킷 하나에 넣는 최대 답안 수. 흔한 뼈대 코드가 모든 답안과 비교되는 것을 막는다
+SIMILARITY_MAX_BUCKET = env_int("SIMILARITY_MAX_BUCKET", 128)
+# 이 점수 아래의 쌍은 기억하지 않는다. 조회 threshold 의 하한이기도 하다
+SIMILARITY_MIN_SCORE = env_float("SIMILARITY_MIN_SCORE", 0.5)
+SIMILARITY_MAX_ROOMS = env_int("SIMILARITY_MAX_ROOMS", 64)
+
+################# 코드 검색 ####################
+SEARCH_PAGE_SIZE = env_int("SEARCH_PAGE_SIZE", 20)
+SEARCH_PAGE_MAX = env_int("SEARCH_PAGE_MAX", 100)
+# 검색어가 들어 있는 답안 중 최근 것부터 이만큼만 읽어 점수를 매긴다. 흔한 조각도 지연이 일정하다
+SEARCH_RANK_WINDOW = env_int("SEARCH_RANK_WINDOW", 2000)
+# 점수 순서는 창 안에서만 의미가 있으므로 offset 도 창 안으로 막는다
+SEARCH_MAX_OFFSET = env_int("SEARCH_MAX_OFFSET", 1000)
+# 결과에 붙이는 발췌의 글자 수
+SEARCH_SNIPPET_CHARS = env_int("SEARCH_SNIPPET_CHARS", 80)
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket
+
+import config
+from metrics import ws_broadcast_latency
+from room_broker import RoomBroker, create_broker
+from room_events import RoomEventLog, encode, legacy_message, make_event
+
+# 방별 웹소켓 연결 관리.
+# 연결마다 크기가 정해진 송신 큐와 그 큐를 비우는 전용 태스크를 두어서,
+# 느린 클라이언트 하나가 같은 방의 다른 사람에게 가는 메시지를 붙잡지 않게 한다.
+# 시작 여부, 전체 접속자 수, 다른 워커로의 메시지 전달은 RoomBroker 가 맡는다.
+# 방 메시지는 모두 room_events 의 v1 JSON 이벤트이고, 예전 문자열 프로토콜 소켓에는 바꿔서 보낸다.
+# 닫힌 노트북처럼 끊긴 줄 모르는 연결은 하트비트로 걸러낸다. hb=1 로 붙은 소켓에는 ping_interval 마다 ping 을 보내고,
+# idle_timeout 동안 pong 이든 무엇이든 받은 것이 없으면 끊는다. 하트비트를 모르는 예전 클라이언트는
+# 보내기가 실패하거나 큐가 차면 정리된다.
+
+SLOW_CONSUMER_CLOSE_CODE = 1008
+IDLE_CLOSE_CODE = 1001
+ROOM_FULL_CLOSE_CODE = 1013
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, queue_size: int, version: int = 0, user: Optional[str] = None,
+                 heartbeat: bool = False):
+        self.websocket = websocket
+        # 0 이면 예전 문자열 프로토콜, 1 이면 JSON 이벤트
+        self.version = version
+        self.user = user
+        # ping 에 pong 으로 답하는 클라이언트인지. 이런 연결만 idle_timeout 으로 끊는다
+        self.heartbeat = heartbeat
+        self.last_seen = time.monotonic()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.closing = False
+
+    def offer(self, message: str) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        broker: Optional[RoomBroker] = None,
+        queue_size: int = config.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = config.WS_SEND_TIMEOUT_SECONDS,
+        count_interval: float = config.WS_COUNT_INTERVAL_SECONDS,
+        ping_interval: float = config.WS_PING_INTERVAL_SECONDS,
+        idle_timeout: float = config.WS_IDLE_TIMEOUT_SECONDS,
+        max_per_room: int = config.WS_MAX_CONNECTIONS_PER_ROOM,
+        close_timeout: float = config.WS_CLOSE_TIMEOUT_SECONDS,
+    ):
+        self.rooms: Dict[str, Dict[WebSocket, Connection]] = {}
+        self.broker = broker or create_broker()
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.count_interval = count_interval
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.max_per_room = max_per_room
+        self.close_timeout = close_timeout
+        self.pinger: Optional[asyncio.Task] = None
+        self.pending_counts: Dict[str, asyncio.Task] = {}
+        # 방별 마지막 입장/메시지/하트비트 시각. RoomReaper 가 오래 조용한 방을 찾는 데 쓴다
+        self.last_active: Dict[str, float] = {}
+        self.log = RoomEventLog()
+        self.evicted = 0
+        self.idle_closed = 0
+        self.rejected = 0
+
+    async def connect(self, room_id: str, websocket: WebSocket, version: int = 0, user: Optional[str] = None,
+                      since: Optional[int] = None, epoch: Optional[str] = None,
+                      heartbeat: bool = False) -> Optional[Connection]:
+        await websocket.accept()
+        # 이 워커에 붙은 수만 센다. 받은 뒤 닫아야 클라이언트가 닫힌 이유(코드)를 볼 수 있다
+        if len(self.rooms.get(room_id, ())) >= self.max_per_room:
+            self.rejected += 1
+            await websocket.close(code=ROOM_FULL_CLOSE_CODE, reason="room full")
+            return None
+        connection = Connection(websocket, self.queue_size, version, user, heartbeat and bool(version))
+        if version:
+            self.resume(room_id, connection, since, epoch)
+        connection.sender = asyncio.create_task(self.drain(room_id, connection))
+        # resume 과 등록 사이에 await 가 없으므로 그 사이에 배달된 이벤트를 놓치지 않는다
+        self.rooms.setdefault(room_id, {})[websocket] = connection
+        self.last_active[room_id] = time.time()
+        self.schedule_count(room_id)
+        await self.broker.set_local_count(room_id, len(self.rooms[room_id]))
+        return connection
+
+    def resume(self, room_id: str, connection: Connection, since: Optional[int], epoch: Optional[str]):
+        # hello 로 지금 seq 를 알려 주고, 이어 받을 수 있으면 놓친 이벤트를 바로 큐에 넣는다
+        missed: Optional[list] = []
+        if since is not None:
+            missed = self.log.since(room_id, since) if epoch == self.broker.epoch else None
+            # 큐에 다 들어가지 않을 만큼 밀렸으면 새로 받는 편이 낫다
+            if missed is not None and len(missed) >= self.queue_size:
+                missed = None
+        hello = {
+            "v": 1,
+            "type": "hello",
+            "room": room_id,
+            "seq": self.log.latest(room_id),
+            "epoch": self.broker.epoch,
+            "resync": missed is None,
+        }
+        if connection.heartbeat:
+            # 클라이언트도 이 간격의 몇 배 동안 아무것도 못 받으면 끊고 다시 붙는다
+            hello["ping"] = self.ping_interval
+        connection.offer(encode(hello))
+        for message in missed or ():
+            connection.offer(message)
+
+    async def start(self):
+        self.log.floor = 0
+        await self.broker.start(self.deliver)
+        self.log.floor = self.broker.floor_seq
+        self.pinger = asyncio.create_task(self.ping_loop())
+
+    async def stop(self):
+        if self.pinger is not None:
+            self.pinger.cancel()
+            self.pinger = None
+        await asyncio.gather(*(self.close_room(room_id, forget=False) for room_id in list(self.rooms)))
+        await self.broker.stop()
+
+    ################# 하트비트 #################
+
+    async def ping_loop(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            try:
+                self.ping()
+            except Exception:
+                continue
+
+    def ping(self, now: Optional[float] = None):
+        # 이벤트는 아니므로 seq 없이 이 워커의 하트비트 소켓에만 보낸다
+        now = now or time.monotonic()
+        message = encode({"v": 1, "type": "ping", "ts": time.time()})
+        for room_id, connections in list(self.rooms.items()):
+            for connection in list(connections.values()):
+                if not connection.heartbeat or connection.closing:
+                    continue
+                if now - connection.last_seen > self.idle_timeout:
+                    self.idle_closed += 1
+                    asyncio.create_task(self.evict(room_id, connection, IDLE_CLOSE_CODE))
+                elif not connection.offer(message):
+                    asyncio.create_task(self.evict(room_id, connection))
+
+    def seen(self, room_id: str, connection: Connection):
+        # pong 도 방이 쓰이고 있다는 뜻이므로 RoomReaper 가 조용한 방으로 보지 않게 한다
+        connection.last_seen = time.monotonic()
+        if room_id in self.rooms:
+            self.last_active[room_id] = time.time()
+
+    async def disconnect(self, room_id: str, websocket: WebSocket):
+        # 퇴출이나 방 삭제로 이미 빠진 연결일 수 있다
+        connection = self.rooms.get(room_id, {}).get(websocket)
+        if connection is not None:
+            await self.remove(room_id, connection)
+            await self.left(room_id, connection)
+
+    async def left(self, room_id: str, connection: Connection):
+        if connection.user is not None:
+            await self.publish(room_id, "leave", {"user": connection.user})
+
+    async def remove(self, room_id: str, connection: Connection):
+        connections = self.rooms.get(room_id)
+        if connections is None or connections.get(connection.websocket) is not connection:
+            return
+        del connections[connection.websocket]
+        if connection.sender is not None and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+        self.schedule_count(room_id)
+        if not connections:
+            del self.rooms[room_id]
+            self.last_active.pop(room_id, None)
+        await self.broker.set_local_count(room_id, len(connections))
+
+    async def drain(self, room_id: str, connection: Connection):
+        while True:
+            message = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(message), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 전송이 실패하거나 너무 오래 걸리면 더 보내지 않고 연결을 정리한다
+                await self.evict(room_id, connection)
+                return
+
+    async def evict(self, room_id: str, connection: Connection, code: int = SLOW_CONSUMER_CLOSE_CODE):
+        if connection.closing:
+            return
+        connection.closing = True
+        self.evicted += 1
+        await self.remove(room_id, connection)
+        await self.close(connection, code)
+        await self.left(room_id, connection)
+
+    async def close(self, connection: Connection, code: int = 1000):
+        # 반쯤 열린 연결은 close 프레임에 답하지 않으므로 오래 기다리지 않는다
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=code), self.close_timeout)
+        except Exception:
+            pass
+
+    async def publish(self, room_id: str, kind: str, data: dict):
+        # 다른 워커에 붙은 같은 방 소켓에도 가도록 브로커로 발행한다. seq 는 브로커가 매긴다
+        started = time.perf_counter()
+        await self.broker.publish(room_id, make_event(room_id, kind, data))
+        ws_broadcast_latency.observe(time.perf_counter() - started)
+
+    async def deliver(self, room_id: str, message: str):
+        # 이 워커의 소켓으로만 보낸다. 큐에 넣기만 하고 바로 돌아오며,
+        # 큐가 가득 찬 연결은 따라오지 못하는 것으로 보고 끊는다
+        event = json.loads(message)
+        self.log.append(room_id, event["seq"], message)
+        legacy = legacy_message(room_id, event)
+        if room_id in self.rooms:
+            self.last_active[room_id] = time.time()
+        for connection in list(self.rooms.get(room_id, {}).values()):
+            payload = message if connection.version else legacy
+            if payload is None or connection.closing:
+                continue
+            if not connection.offer(payload):
+                asyncio.create_task(self.evict(room_id, connection))
+
+    async def broadcast_count(self, room_id: str):
+        await self.publish(room_id, "count", {"connections": await self.broker.total_count(room_id)})
+
+    def schedule_count(self, room_id: str):
+        # 입장/퇴장이 몰려도 count_interval 마다 최신 인원수 한 번만 보낸다
+        if room_id not in self.pending_counts:
+            self.pending_counts[room_id] = asyncio.create_task(self.flush_count(room_id))
+
+    async def flush_count(self, room_id: str):
+        try:
+            await asyncio.sleep(self.count_interval)
+        finally:
+            self.pending_counts.pop(room_id, None)
+        await self.broadcast_count(room_id)
+
+    async def close_room(self, room_id: str, forget: bool = True):
+        # forget=False 면 소켓만 닫고 방의 시작 여부는 남긴다 (오래 조용한 방을 메모리에서 내릴 때)
+        connections = self.rooms.pop(room_id, {})
+        self.last_active.pop(room_id, None)
+        self.log.forget(room_id)
+        for connection in connections.values():
+            connection.closing = True
+            if connection.sender is not None:
+                connection.sender.cancel()
+        if forget:
+            await self.broker.forget(room_id)
+        elif connections:
+            await self.broker.set_local_count(room_id, 0)
+        # 한 소켓씩 닫으면 방 인원만큼 close_timeout 이 쌓이므로 한꺼번에 닫는다
+        await asyncio.gather(*(self.close(connection) for connection in connections.values()))
+
+    async def start_room(self, room_id: str):
+        await self.broker.mark_started(room_id)
+
+    async def is_room_started(self, room_id: str) -> bool:
+        return await self.broker.is_started(room_id)
+
+    def idle_rooms(self, cutoff: float) -> List[str]:
+        return [room_id for room_id, last in self.last_active.items() if last < cutoff]
+
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.rooms.values())
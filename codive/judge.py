@@ -0,0 +1,355 @@
+import asyncio
+import ctypes
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import psutil
+
+import config
+from normalizer import normalize
+
+try:
+    import resource
+except ImportError:  # 윈도우에서는 rlimit 없이 벽시계 제한만 건다
+    resource = None
+
+# 제출 코드를 문제별 테스트케이스로 직접 실행해 통과 여부, 실행 시간, 최대 메모리를 잰다.
+# 테스트 하나마다 격리된 파이썬 프로세스를 띄우고, 그 관리는 워커 프로세스 풀에서 한다.
+# 시간과 메모리는 사용자 코드가 건드릴 수 없도록 부모가 잰다. CPU 시간은 wait4 의 rusage 로, 메모리는 기다리는 동안
+# /proc/<pid>/status 의 VmHWM 으로 읽는다. ru_maxrss 는 fork 한 워커의 RSS 까지 이어받아 서버 메모리가 섞인다.
+# 자식은 새 세션(프로세스 그룹)의 리더이고 RLIMIT_NPROC 로 fork 가 막혀 있다. 끝나면 어떤 경로로든 그룹째 죽이고,
+# 워커를 subreaper 로 두어 setsid 로 빠져나간 손자까지 거둔다. 테스트마다 빈 작업 디렉터리에서 실행하고,
+# 부트스트랩의 감사 훅이 그 밖으로의 쓰기, 프로세스 생성, ctypes, 소켓을 막는다.
+
+# 자식 프로세스에서 실행되는 부트스트랩. 감사 훅은 한 번 걸면 사용자 코드가 뗄 수 없다.
+BOOTSTRAP = """
+import os, sys
+path = sys.argv[1]
+code = compile(open(path, encoding="utf-8").read(), "<answer>", "exec")
+root = os.path.realpath(os.getcwd())
+BLOCKED = {"os.system", "os.exec", "os.posix_spawn", "os.spawn", "os.fork", "os.forkpty", "os.kill", "os.killpg",
+           "subprocess.Popen", "ctypes.dlopen", "ctypes.dlsym", "socket.connect", "socket.bind", "os.chdir"}
+BLOCKED_MODULES = {"ctypes", "_ctypes", "_posixsubprocess", "multiprocessing", "_multiprocessing"}
+PATH_EVENTS = {"os.remove", "os.rename", "os.rmdir", "os.mkdir", "os.chmod", "os.chown", "os.link",
+               "os.symlink", "os.truncate", "os.utime", "shutil.rmtree", "shutil.copyfile", "shutil.move"}
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+def inside(target):
+    if isinstance(target, int):
+        return True
+    target = os.path.realpath(os.fsdecode(target))
+    return target == root or target.startswith(root + os.sep)
+def guard(event, args):
+    if event in BLOCKED or (event == "import" and args[0] in BLOCKED_MODULES):
+        raise PermissionError(event)
+    if event == "open":
+        target, mode, flags = args
+        writing = (mode and any(c in mode for c in "wax+")) or (flags or 0) & WRITE_FLAGS
+        if writing and not inside(target):
+            raise PermissionError(event)
+    elif event in PATH_EVENTS and not all(inside(arg) for arg in args[:2] if isinstance(arg, (str, bytes))):
+        raise PermissionError(event)
+sys.addaudithook(guard)
+del guard
+try:
+    exec(code, {"__name__": "__main__"})
+finally:
+    sys.stdout.flush()
+"""
+
+POLL_INTERVAL = 0.002
+PR_SET_CHILD_SUBREAPER = 36
+
+PASS = "통과"
+FAIL = "통과x"
+
+
+class Limits:
+    def __init__(
+        self,
+        cpu_seconds: int = config.JUDGE_CPU_SECONDS,
+        wall_seconds: float = config.JUDGE_WALL_SECONDS,
+        memory_mb: int = config.JUDGE_MEMORY_MB,
+        output_kb: int = config.JUDGE_OUTPUT_KB,
+    ):
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.memory_mb = memory_mb
+        self.output_kb = output_kb
+
+
+def restore_code(content: str) -> str:
+    # 정규화된 답안은 항상 개행으로 끝난다. 예전 clean_code 로 저장된 답안만 개행/탭이 이스케이프되어 있다
+    if not content or content.endswith("\n"):
+        return content
+    return content.replace("\\n", "\n").replace("\\t", "\t")
+
+
+def code_hash(code: str) -> str:
+    # 주석, 공백 차이는 무시하고 들여쓰기 구조는 남긴 비교용 형태의 해시
+    return normalize(code).digest
+
+
+def output_lines(text: str) -> List[str]:
+    return [line.rstrip() for line in text.rstrip().splitlines()]
+
+
+def same_output(actual: str, expected: str) -> bool:
+    # 줄 끝 공백과 마지막 개행 차이는 무시한다
+    return output_lines(actual) == output_lines(expected)
+
+
+def set_limits(limits: Limits):
+    def apply():
+        os.setsid()
+        memory = limits.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits.output_kb * 1024, limits.output_kb * 1024))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        # 같은 uid 의 프로세스가 이미 있으므로 0 이면 더 만들 수 없다 (root 는 이 제한을 받지 않는다)
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    return apply if resource else None
+
+
+SUBREAPER = False
+
+
+def become_subreaper():
+    # 워커 풀 초기화 때 부른다. 고아가 된 손자가 init 대신 이 워커의 자식이 되어 sweep 으로 찾을 수 있다
+    global SUBREAPER
+    if sys.platform.startswith("linux"):
+        try:
+            SUBREAPER = ctypes.CDLL(None, use_errno=True).prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+        except (OSError, AttributeError):
+            pass
+
+
+def kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def sweep():
+    # 판정 워커 아래에 남은 프로세스는 모두 사용자 코드가 남긴 것이다. 다른 프로세스에서는 건드리지 않는다
+    if not SUBREAPER:
+        return
+    for child in psutil.Process().children(recursive=True):
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+    while True:
+        try:
+            if os.waitpid(-1, os.WNOHANG)[0] == 0:
+                break
+        except ChildProcessError:
+            break
+
+
+def max_rss_bytes(rusage) -> int:
+    # 리눅스는 KB, macOS 는 바이트 단위다
+    return rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+
+
+def peak_rss(pid: int) -> Optional[int]:
+    # exec 뒤 자식 자신의 주소 공간 기준 최대 RSS. /proc 이 없거나 이미 끝나 메모리를 놓았으면 None
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def wait_child(proc: subprocess.Popen, deadline: float):
+    # (timed_out, returncode, cpu 초, 최대 메모리 바이트). 끝난 뒤에는 항상 프로세스 그룹째 죽인다
+    timed_out = False
+    peak: Optional[int] = None
+    try:
+        if not hasattr(os, "wait4"):
+            try:
+                proc.wait(timeout=max(0.0, deadline - time.perf_counter()))
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                proc.kill()
+                proc.wait()
+            return timed_out, proc.returncode, None, 0
+        while True:
+            # VmHWM 은 줄지 않으므로 끝나기 직전에 읽은 값이 최대치다
+            sampled = peak_rss(proc.pid)
+            if sampled is not None:
+                peak = max(peak or 0, sampled)
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                timed_out = True
+                kill_group(proc.pid)
+                pid, status, rusage = os.wait4(proc.pid, 0)
+                break
+            time.sleep(POLL_INTERVAL)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if peak is None:
+            # /proc 이 없는 플랫폼(macOS)에서만 rusage 로 대신한다
+            peak = max_rss_bytes(rusage)
+        return timed_out, proc.returncode, rusage.ru_utime + rusage.ru_stime, peak
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            proc.wait()
+        if hasattr(os, "killpg"):
+            kill_group(proc.pid)
+            sweep()
+
+
+def spawn(workdir: str, source_path: str, stdin, stdout, stderr, limits: Limits) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-I", "-S", "-c", BOOTSTRAP, source_path],
+        stdin=stdin,
+        stdout=stdout,
+        stderr=stderr,
+        cwd=workdir,
+        env={"PYTHONIOENCODING": "utf-8", "HOME": workdir, "TMPDIR": workdir},
+        preexec_fn=set_limits(limits),
+    )
+
+
+STARTUP_CPU: Optional[float] = None
+
+
+def startup_cpu(limits: Limits) -> float:
+    # 인터프리터와 부트스트랩이 뜨는 데 드는 CPU 시간. 워커마다 빈 코드를 한 번 돌려 재고 측정값에서 뺀다
+    global STARTUP_CPU
+    if STARTUP_CPU is None:
+        with tempfile.TemporaryDirectory(prefix="codive-judge-") as workdir:
+            source_path = os.path.join(workdir, "empty.py")
+            open(source_path, "w").close()
+            samples = []
+            for _ in range(3):
+                proc = spawn(workdir, source_path, subprocess.DEVNULL, subprocess.DEVNULL, subprocess.DEVNULL, limits)
+                samples.append(wait_child(proc, time.perf_counter() + limits.wall_seconds)[2] or 0.0)
+            STARTUP_CPU = min(samples)
+    return STARTUP_CPU
+
+
+def run_case(workdir: str, source_path: str, input_data: str, expected_output: str, limits: Limits) -> dict:
+    input_path = os.path.join(workdir, "input.txt")
+    output_path = os.path.join(workdir, "output.txt")
+    error_path = os.path.join(workdir, "error.txt")
+    with open(input_path, "w", encoding="utf-8") as f:
+        f.write(input_data)
+
+    # 사용자 코드가 쓸 수 있는 곳은 테스트마다 새로 만든 빈 디렉터리뿐이다
+    sandbox = tempfile.mkdtemp(prefix="case-", dir=workdir)
+    with open(input_path, "rb") as fin, open(output_path, "wb") as fout, open(error_path, "wb") as ferr:
+        started = time.perf_counter()
+        proc = spawn(sandbox, source_path, fin, fout, ferr, limits)
+        timed_out, returncode, cpu, peak_rss = wait_child(proc, started + limits.wall_seconds)
+        wall = time.perf_counter() - started
+
+    if cpu is None or timed_out:
+        elapsed = wall
+    else:
+        elapsed = max(0.0, cpu - startup_cpu(limits))
+
+    with open(output_path, encoding="utf-8", errors="replace") as f:
+        actual = f.read()
+    with open(error_path, encoding="utf-8", errors="replace") as f:
+        stderr = f.read()
+
+    if timed_out or returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+        status = "timeout"
+    elif "MemoryError" in stderr:
+        status = "memory"
+    elif returncode != 0:
+        status = "error"
+    elif same_output(actual, expected_output):
+        status = "ok"
+    else:
+        status = "wrong"
+
+    return {
+        "status": status,
+        "time_ms": round(elapsed * 1000, 3),
+        "memory_kb": peak_rss // 1024,
+    }
+
+
+def run_cases(code: str, cases: List[Tuple[str, str]], limits: Limits) -> dict:
+    # 워커 프로세스에서 실행된다
+    results = []
+    with tempfile.TemporaryDirectory(prefix="codive-judge-") as workdir:
+        source_path = os.path.join(workdir, "answer.py")
+        with open(source_path, "w", encoding="utf-8") as f:
+            f.write(code)
+        for input_data, expected_output in cases:
+            results.append(run_case(workdir, source_path, input_data, expected_output, limits))
+    return summarize(results)
+
+
+def summarize(results: List[dict]) -> dict:
+    passed = sum(1 for r in results if r["status"] == "ok")
+    # 데이터마다 다른 값 대신 가장 큰 값 하나만 보고한다
+    time_ms = max((r["time_ms"] for r in results), default=0)
+    memory_kb = max((r["memory_kb"] for r in results), default=0)
+    return {
+        "test_pass": PASS if results and passed == len(results) else FAIL,
+        "execution_time": f"{time_ms}ms",
+        "memory_usage": f"{memory_kb}kb",
+        "passed": passed,
+        "total": len(results),
+        "cases": results,
+    }
+
+
+class Judge:
+    def __init__(self, workers: int = config.JUDGE_WORKERS, limits: Optional[Limits] = None,
+                 cache_size: int = config.JUDGE_CACHE_SIZE):
+        self.workers = workers
+        self.limits = limits or Limits()
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[Tuple[int, str], dict]" = OrderedDict()
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=become_subreaper)
+        return self.pool
+
+    async def judge(self, question_id: int, code: str, cases: List[Tuple[str, str]]) -> dict:
+        key = (question_id, code_hash(code))
+        verdict = self.cache.get(key)
+        if verdict is not None:
+            self.cache.move_to_end(key)
+            return verdict
+
+        loop = asyncio.get_running_loop()
+        verdict = await loop.run_in_executor(self.get_pool(), run_cases, code, cases, self.limits)
+        self.cache[key] = verdict
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return verdict
+
+    def invalidate(self, question_id: int):
+        # 테스트케이스가 바뀌면 해당 문제의 판정을 버린다
+        for key in [key for key in self.cache if key[0] == question_id]:
+            del self.cache[key]
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+judge = Judge()
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import openai
+
+import config
+from llm_cache import LLMCache, llm_cache
+from llm_scheduler import INTERACTIVE, LLMScheduler, llm_scheduler
+from metrics import llm_first_token, record_llm
+
+# 이벤트 루프를 막지 않는 OpenAI 호출 계층.
+# 동시에 나가는 요청 수와 순서는 llm_scheduler 가 정하고, 같은 키의 요청이 진행 중이면 그 결과를 함께 기다린다.
+# ticket=(room_id, user_id, room_size) 를 주면 캐시에도 없고 합칠 요청도 없어 실제로 나갈 때만 방/유저 예산을 쓴다.
+# stream() 은 토큰을 받는 대로 넘기고, 받는 쪽이 그만두면 업스트림 요청을 닫고 자리를 바로 돌려준다.
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMClient:
+    def __init__(
+        self,
+        cache: Optional[LLMCache] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        timeout: float = config.LLM_TIMEOUT_SECONDS,
+    ):
+        self.cache = cache
+        self.scheduler = scheduler or LLMScheduler()
+        self.timeout = timeout
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.streams = 0
+        self.cancelled = 0
+
+    async def chat(self, key: str, model: str, messages: List[dict], max_tokens: int,
+                   timeout: Optional[float] = None, priority: int = INTERACTIVE,
+                   ticket: Optional[Tuple[Optional[str], Optional[str], int]] = None) -> dict:
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return cached
+
+        task = self.inflight.get(key)
+        if task is None:
+            if ticket is not None:
+                self.scheduler.admit(*ticket)
+            task = asyncio.ensure_future(self.fetch(key, model, messages, max_tokens, timeout or self.timeout, priority))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # 한 요청자가 취소되어도 같은 결과를 기다리는 다른 요청자에게는 영향이 없도록 shield 한다
+        return await asyncio.shield(task)
+
+    async def fetch(self, key: str, model: str, messages: List[dict], max_tokens: int, timeout: float,
+                    priority: int) -> dict:
+        async with self.scheduler.slot(priority):
+            self.calls += 1
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    openai.ChatCompletion.acreate(model=model, messages=messages, max_tokens=max_tokens),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                record_llm(model, "timeout", time.perf_counter() - started)
+                raise LLMTimeout(f"{model} 응답이 {timeout}초 안에 오지 않았습니다.")
+            except Exception:
+                record_llm(model, "error", time.perf_counter() - started)
+                raise
+            record_llm(model, "ok", time.perf_counter() - started, getattr(response, "usage", None))
+        if not response.choices or not response.choices[0].message:
+            raise ValueError("No valid response from API")
+        message = dict(response.choices[0].message)
+        if self.cache is not None:
+            await self.cache.aput(key, message)
+        return message
+
+    async def admit(self, key: str, ticket: Tuple[Optional[str], Optional[str], int]):
+        # 스트림은 응답을 시작하기 전에 거절해야 하므로 호출하는 쪽에서 먼저 부른다.
+        # 캐시에 있거나 같은 요청이 진행 중이면 예산을 쓰지 않는다
+        if key in self.inflight or (self.cache is not None and await self.cache.aget(key) is not None):
+            return
+        self.scheduler.admit(*ticket)
+
+    async def stream(self, key: str, model: str, messages: List[dict], max_tokens: int,
+                     timeout: Optional[float] = None, priority: int = INTERACTIVE) -> AsyncIterator[str]:
+        # 캐시에 있으면 한 번에 내보낸다. 스트림끼리는 합치지 않는다(각자 받은 만큼만 보여 주므로)
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                yield cached.get("content") or ""
+                return
+
+        timeout = timeout or self.timeout
+        async with self.scheduler.slot(priority):
+            self.calls += 1
+            self.streams += 1
+            started = time.perf_counter()
+            outcome = "cancelled"
+            parts = []
+            response = None
+            try:
+                response = await asyncio.wait_for(
+                    openai.ChatCompletion.acreate(model=model, messages=messages, max_tokens=max_tokens, stream=True),
+                    timeout
+                )
+                chunks = response.__aiter__()
+                while True:
+                    # 토큰 사이가 timeout 보다 길어지면 끊긴 것으로 본다
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if not parts:
+                            llm_first_token.observe(time.perf_counter() - started, model)
+                        parts.append(delta)
+                        yield delta
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                outcome = "timeout"
+                raise LLMTimeout(f"{model} 응답이 {timeout}초 안에 오지 않았습니다.")
+            except (asyncio.CancelledError, GeneratorExit):
+                self.cancelled += 1
+                raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                record_llm(model, outcome, time.perf_counter() - started)
+                if response is not None:
+                    await response.aclose()
+        # 끝까지 받은 응답만 캐시한다. chat() 과 같은 모양이라 같은 키의 일반 호출도 재사용한다
+        if self.cache is not None:
+            await self.cache.aput(key, {"role": "assistant", "content": "".join(parts)})
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "streams": self.streams,
+            "cancelled": self.cancelled,
+            "inflight": len(self.inflight),
+            "scheduler": self.scheduler.stats(),
+        }
+
+
+llm_client = LLMClient(cache=llm_cache, scheduler=llm_scheduler)
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import config
+import models
+from database import SessionLocal
+
+# 같은 모델/입력/max_tokens 조합의 LLM 응답을 재사용한다.
+# 메모리 LRU 를 먼저 보고, 없으면 SQLite 의 llm_cache 테이블을 본다.
+
+PURGE_EVERY = 100
+
+
+def cache_key(model: str, kind: str, inputs: list, max_tokens: int) -> str:
+    # inputs 는 호출하는 쪽에서 compact_code 로 정규화한 값이어야 한다
+    payload = json.dumps([model, kind, inputs, max_tokens], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(
+        self,
+        ttl_seconds: int = config.LLM_CACHE_TTL_SECONDS,
+        memory_entries: int = config.LLM_CACHE_MEMORY_ENTRIES,
+        max_rows: int = config.LLM_CACHE_MAX_ROWS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.puts = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        return self.loaded(key, self.load(key))
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        self.remember(key, now, value)
+        self.evictions += self.store(key, value, now, self.due())
+
+    async def aget(self, key: str) -> Optional[Any]:
+        # 메모리에 있으면 바로 돌려주고, SQLite 조회만 스레드로 넘긴다
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        return self.loaded(key, await asyncio.to_thread(self.load, key))
+
+    async def aput(self, key: str, value: Any):
+        now = time.time()
+        self.remember(key, now, value)
+        # 카운터는 스레드가 아니라 여기(루프 쪽)에서만 올린다
+        self.evictions += await asyncio.to_thread(self.store, key, value, now, self.due())
+
+    def get_memory(self, key: str) -> Optional[Any]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            created_at, value = entry
+            if time.time() - created_at < self.ttl_seconds:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self.memory[key]
+        return None
+
+    def loaded(self, key: str, entry: Optional[tuple]) -> Optional[Any]:
+        if entry is None:
+            self.misses += 1
+            return None
+        created_at, value = entry
+        self.remember(key, created_at, value)
+        self.disk_hits += 1
+        return value
+
+    # load / store 는 스레드에서 불릴 수 있으므로 메모리 LRU 나 카운터를 건드리지 않고 결과만 돌려준다
+    def load(self, key: str) -> Optional[tuple]:
+        now = time.time()
+        db = SessionLocal()
+        try:
+            row = db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.key == key).first()
+            if row is None or now - row.created_at >= self.ttl_seconds:
+                return None
+            row.last_used = now
+            db.commit()
+            return row.created_at, json.loads(row.value)
+        finally:
+            db.close()
+
+    def due(self) -> bool:
+        # 이번 저장이 PURGE_EVERY 번째이면 오래된 행 정리도 같이 한다
+        self.puts += 1
+        return self.puts % PURGE_EVERY == 0
+
+    def store(self, key: str, value: Any, now: float, purge: bool = False) -> int:
+        # 정리로 지운 행 수를 돌려준다
+        db = SessionLocal()
+        try:
+            db.merge(models.LLMCacheEntry(
+                key=key,
+                value=json.dumps(value, ensure_ascii=False),
+                created_at=now,
+                last_used=now
+            ))
+            db.commit()
+            return self.purge(db, now) if purge else 0
+        finally:
+            db.close()
+
+    def remember(self, key: str, created_at: float, value: Any):
+        self.memory[key] = (created_at, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def purge(self, db, now: float) -> int:
+        # 만료된 행을 지우고, 그래도 많으면 가장 오래 안 쓰인 행부터 지운다
+        expired = db.query(models.LLMCacheEntry).filter(
+            models.LLMCacheEntry.created_at < now - self.ttl_seconds
+        ).delete(synchronize_session=False)
+        overflow = db.query(models.LLMCacheEntry).count() - self.max_rows
+        if overflow > 0:
+            oldest = db.query(models.LLMCacheEntry.key).order_by(models.LLMCacheEntry.last_used).limit(overflow)
+            db.query(models.LLMCacheEntry).filter(
+                models.LLMCacheEntry.key.in_(oldest.scalar_subquery())
+            ).delete(synchronize_session=False)
+        db.commit()
+        return expired + max(overflow, 0)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self.memory),
+        }
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,187 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+import config
+
+# LLM 호출 앞단의 입장 제어와 우선순위 스케줄러.
+#   admit():  방/유저별 토큰 버킷. 예산을 넘으면 기다리지 않고 RateLimited(retry_after) 를 던진다.
+#             방 버킷의 최대치는 방 인원에 맞춰 늘어나서 큰 반도 한꺼번에 힌트/보고서를 받을 수 있다.
+#   slot():   전체 동시 호출 수 제한. 자리가 없으면 우선순위 큐에서 기다리고, 힌트(INTERACTIVE)가 보고서(BATCH)보다 먼저 나간다.
+#             BATCH 는 batch_reserve 만큼의 자리를 남겨 두고만 쓸 수 있어서 보고서가 몰려도 힌트 자리가 비어 있다.
+
+INTERACTIVE = 0
+BATCH = 1
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float, detail: str = "LLM 요청이 너무 많습니다. 잠시 후 다시 시도해 주세요."):
+        super().__init__(detail)
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def wait(self, now: float, cost: float = 1.0) -> float:
+        # 지금 cost 만큼 꺼낼 수 있으면 0, 아니면 그만큼 찰 때까지 남은 초
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, cost: float = 1.0):
+        self.tokens -= cost
+
+    def resize(self, burst: float):
+        # 늘어난 만큼은 바로 쓸 수 있게 채워 준다
+        if burst > self.burst:
+            self.tokens += burst - self.burst
+        self.burst = burst
+        self.tokens = min(self.tokens, burst)
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_inflight: int = config.LLM_MAX_CONCURRENCY,
+        batch_reserve: int = config.LLM_BATCH_RESERVE,
+        max_queue: int = config.LLM_MAX_QUEUE,
+        room_rate: float = config.LLM_ROOM_RATE_PER_MINUTE / 60.0,
+        room_burst: float = config.LLM_ROOM_BURST,
+        user_rate: float = config.LLM_USER_RATE_PER_MINUTE / 60.0,
+        user_burst: float = config.LLM_USER_BURST,
+        room_burst_per_user: float = config.LLM_ROOM_BURST_PER_USER,
+        max_buckets: int = config.LLM_MAX_BUCKETS,
+    ):
+        self.max_inflight = max_inflight
+        # 자리를 전부 예약해 버리면 보고서가 영영 못 나가므로 BATCH 에도 최소 한 자리는 준다
+        self.batch_limit = max(1, max_inflight - batch_reserve)
+        self.max_queue = max_queue
+        self.limits = {"room": (room_rate, room_burst), "user": (user_rate, user_burst)}
+        self.room_burst_per_user = room_burst_per_user
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        # admit() 는 동기 엔드포인트(스레드풀)에서도 불린다
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.queue: List[Tuple[int, int, asyncio.Future]] = []
+        # 큐에는 취소된 대기자도 wake() 가 걷어낼 때까지 남아 있으므로 살아 있는 대기자 수는 따로 센다
+        self.queued = 0
+        self.order = itertools.count()
+        self.admitted = 0
+        self.rejected = 0
+        self.waited = 0
+
+    ################# 입장 제어 #################
+
+    def bucket(self, kind: str, key: str, now: float) -> TokenBucket:
+        bucket = self.buckets.get((kind, key))
+        if bucket is None:
+            rate, burst = self.limits[kind]
+            bucket = self.buckets[(kind, key)] = TokenBucket(rate, burst, now)
+            if len(self.buckets) > self.max_buckets:
+                # 가장 오래 안 쓴 버킷은 어차피 가득 차 있을 가능성이 높다
+                self.buckets.popitem(last=False)
+        self.buckets.move_to_end((kind, key))
+        return bucket
+
+    def admit(self, room_id: Optional[str], user_id: Optional[str], room_size: int = 0, cost: float = 1.0):
+        # 두 버킷 모두 여유가 있을 때만 꺼낸다. 하나라도 모자라면 아무것도 쓰지 않고 거절한다
+        with self.lock:
+            now = time.monotonic()
+            buckets = [self.bucket(kind, key, now) for kind, key in (("room", room_id), ("user", user_id)) if key]
+            if room_id and room_size:
+                buckets[0].wait(now)
+                buckets[0].resize(max(self.limits["room"][1], room_size * self.room_burst_per_user))
+            retry_after = max((bucket.wait(now, cost) for bucket in buckets), default=0.0)
+            if retry_after > 0:
+                self.rejected += 1
+                raise RateLimited(retry_after)
+            for bucket in buckets:
+                bucket.take(cost)
+            self.admitted += 1
+
+    ################# 동시 호출 수 #################
+
+    def limit(self, priority: int) -> int:
+        return self.max_inflight if priority == INTERACTIVE else self.batch_limit
+
+    async def acquire(self, priority: int):
+        # 나보다 먼저 나갈 대기자가 없고 자리가 있으면 바로 들어간다
+        if (not self.queue or self.queue[0][0] > priority) and self.inflight < self.limit(priority):
+            self.inflight += 1
+            return
+        # 보고서는 REPORT_CONCURRENCY 로 이미 묶여 있으므로 대기열 상한은 힌트에만 건다
+        if priority == INTERACTIVE and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise RateLimited(1.0)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.order), future))
+        self.queued += 1
+        self.waited += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 자리를 넘겨받은 직후에 취소되었으면 그 자리를 다음 대기자에게 돌려준다
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+                self.queued -= 1
+            raise
+
+    def release(self):
+        self.inflight -= 1
+        self.wake()
+
+    def wake(self):
+        while self.queue:
+            priority, _, future = self.queue[0]
+            if future.done():
+                heapq.heappop(self.queue)
+                continue
+            if self.inflight >= self.limit(priority):
+                break
+            heapq.heappop(self.queue)
+            self.queued -= 1
+            self.inflight += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        waiting = [priority for priority, _, future in self.queue if not future.done()]
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "batch_limit": self.batch_limit,
+            "queued_interactive": waiting.count(INTERACTIVE),
+            "queued_batch": waiting.count(BATCH),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "waited": self.waited,
+            "buckets": len(self.buckets),
+        }
+
+
+llm_scheduler = LLMScheduler()
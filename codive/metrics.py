@@ -0,0 +1,234 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# 프로메테우스 텍스트 형식(0.0.4)으로 내보내는 최소한의 지표 모음.
+# 동기 엔드포인트와 SQLAlchemy 훅은 스레드풀에서도 불리므로 값은 락 안에서만 바꾼다.
+# 워커 프로세스마다 따로 집계되므로 여러 워커로 띄우면 워커별로 긁어 가야 한다.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BROADCAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self.lock:
+            values = list(self.values.items())
+        return self.header() + [
+            f"{self.name}{label_text(self.labels, key)} {number(value)}" for key, value in values
+        ]
+
+
+class Gauge(Metric):
+    # 긁어 갈 때 collect() 를 불러 (라벨 값들, 값) 목록을 받는다
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]],
+                 labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{label_text(self.labels, key)} {number(value)}" for key, value in self.collect()
+        ]
+
+
+class CollectedCounter(Gauge):
+    # 다른 객체가 이미 세고 있는 단조 증가 값을 긁어 갈 때 읽는다. 이름은 _total 로 끝나야 한다
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = REQUEST_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 값별 [버킷별 개수..., +Inf 개수], 합계
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *label_values: str):
+        with self.lock:
+            counts = self.counts.get(label_values)
+            if counts is None:
+                counts = self.counts[label_values] = [0] * (len(self.buckets) + 1)
+                self.sums[label_values] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self.sums[label_values] += value
+
+    def render(self) -> List[str]:
+        with self.lock:
+            series = [(key, list(counts), self.sums[key]) for key, counts in self.counts.items()]
+        lines = self.header()
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + number(bound) + '"'
+                lines.append(f"{self.name}_bucket{label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{label_text(self.labels, key)} {number(total)}")
+            lines.append(f"{self.name}_count{label_text(self.labels, key)} {cumulative}")
+        return lines
+
+
+registry: List[Metric] = []
+
+
+def render() -> bytes:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+################# HTTP ####################
+http_requests = Counter("codive_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("codive_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+
+
+class MetricsMiddleware:
+    # 순수 ASGI 미들웨어. 응답 본문을 다 보낼 때까지의 시간을 라우트 템플릿별로 잰다
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 경로 값을 그대로 라벨로 쓰면 방 코드마다 시계열이 생기므로 매칭된 라우트의 템플릿을 쓴다
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_requests.inc(scope["method"], path, status)
+            http_latency.observe(time.perf_counter() - started, scope["method"], path)
+
+
+################# 데이터베이스 ####################
+db_queries = Counter("codive_db_queries_total", "SQL statements executed by engine and statement kind.", ("engine", "statement"))
+db_latency = Histogram("codive_db_query_duration_seconds", "SQL statement latency.", ("engine", "statement"), QUERY_BUCKETS)
+
+
+def statement_kind(statement: str) -> str:
+    head = statement.lstrip().split(None, 1)
+    return head[0].upper() if head else "UNKNOWN"
+
+
+def instrument_engine(engine, name: str):
+    # AsyncEngine 은 sync_engine 을 넘긴다
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("codive_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["codive_query_started"].pop()
+        kind = statement_kind(statement)
+        db_queries.inc(name, kind)
+        db_latency.observe(time.perf_counter() - started, name, kind)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # 실패한 쿼리는 after_cursor_execute 가 불리지 않으므로 시작 시각만 버린다
+        started = context.connection.info.get("codive_query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+################# 웹소켓 ####################
+ws_broadcast_latency = Histogram(
+    "codive_ws_broadcast_duration_seconds", "Time to hand a room message to the broker; the memory broker also delivers it locally.",
+    buckets=BROADCAST_BUCKETS
+)
+
+
+def watch_connections(manager):
+    Gauge("codive_ws_rooms", "Rooms with at least one socket on this worker.",
+          lambda: [((), len(manager.rooms))])
+    Gauge("codive_ws_connections", "Open WebSocket connections on this worker.",
+          lambda: [((), manager.connection_count())])
+    CollectedCounter("codive_ws_evicted_total", "Connections closed for falling behind, failing a send or going idle.",
+                     lambda: [((), manager.evicted)])
+    CollectedCounter("codive_ws_idle_closed_total", "Heartbeat connections closed for not answering pings.",
+                     lambda: [((), manager.idle_closed)])
+    CollectedCounter("codive_ws_rejected_total", "Connections refused because the room was full.",
+                     lambda: [((), manager.rejected)])
+
+################# LLM ####################
+llm_requests = Counter("codive_llm_requests_total", "Upstream OpenAI calls by model and outcome.", ("model", "outcome"))
+llm_latency = Histogram("codive_llm_request_duration_seconds", "Upstream OpenAI call latency.", ("model",), LLM_BUCKETS)
+llm_tokens = Counter("codive_llm_tokens_total", "Tokens reported by OpenAI usage.", ("model", "kind"))
+llm_first_token = Histogram("codive_llm_first_token_seconds", "Time to the first streamed token.", ("model",), LLM_BUCKETS)
+
+
+def record_llm(model: str, outcome: str, elapsed: float, usage: Optional[dict] = None):
+    llm_requests.inc(model, outcome)
+    llm_latency.observe(elapsed, model)
+    if usage:
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                llm_tokens.inc(model, kind.split("_")[0], amount=usage[kind])
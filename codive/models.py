@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey,Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey,Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+import time
 from database import Base
 
 class Question(Base):
@@ -10,15 +11,25 @@ class Question(Base):
     content = Column(Text, nullable=False)
 
 
+class TestCase(Base):
+    __tablename__ = "test_case"
+
+    id = Column(Integer, primary_key=True)
+    question_id = Column(Integer, ForeignKey("question.id"), index=True, nullable=False)
+    question = relationship("Question", backref="test_cases")
+    input_data = Column(Text, nullable=False, default="")
+    expected_output = Column(Text, nullable=False)
+
+
 class Answer(Base):
     __tablename__ = "answer"
 
     id = Column(Integer, primary_key=True)
     content = Column(Text, nullable=False)
-    question_id = Column(Integer, ForeignKey("question.id"))
+    question_id = Column(Integer, ForeignKey("question.id"), index=True)
     question = relationship("Question", backref="answers")
 
-    user_id = Column(String, ForeignKey("user.id"))
+    user_id = Column(String, ForeignKey("user.id"), index=True)
     user = relationship("User", back_populates="answers")
 
 
@@ -27,6 +38,15 @@ class Room(Base):
     
     codeID = Column(Text, primary_key=True)
     pw = Column(Text, nullable=False)
+    # 마지막으로 발급한 유저 번호. 방장이 1번이므로 게스트는 2번부터 받는다
+    next_guest = Column(Integer, nullable=False, default=1, server_default="1")
+    started = Column(Boolean, nullable=False, default=False, server_default="0")
+    # 방 정리 작업이 보는 시각(epoch 초). 입장, 시작, 종료 때 last_active 를 갱신한다
+    created_at = Column(Float, nullable=False, default=time.time)
+    # 입장/종료 때 같은 트랜잭션에서 올리는 인원 카운터. 통계와 등수는 이 값만 읽는다
+    user_count = Column(Integer, nullable=False, default=0, server_default="0")
+    finished_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_active = Column(Float, nullable=False, default=time.time, index=True)
 
 class User(Base):
     __tablename__ = "user"
@@ -35,4 +55,67 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_guest = Column(Boolean, default=True)
     answers = relationship("Answer", back_populates="user") 
-    finish  = Column(Boolean,default = False)
\ No newline at end of file
+    finish  = Column(Boolean,default = False)
+    room_code = Column(Text, ForeignKey("room.codeID"), index=True)
+    # 방에서 몇 번째로 끝냈는지. 끝내지 않았으면 비어 있다
+    finish_rank = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_user_room_code_finish", "room_code", "finish"),
+    )
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)
+    last_used = Column(Float, nullable=False, index=True)
+
+
+class RoomEvent(Base):
+    __tablename__ = "room_event"
+
+    id = Column(Integer, primary_key=True)
+    room_id = Column(Text, nullable=False)
+    worker_id = Column(String(32), nullable=False)
+    message = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False, index=True)
+
+    # id 가 이벤트 seq 라서 오래된 행을 지운 뒤에도 작은 값이 다시 나오면 안 된다
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+class RoomPresence(Base):
+    __tablename__ = "room_presence"
+
+    room_id = Column(Text, primary_key=True)
+    worker_id = Column(String(32), primary_key=True)
+    connections = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False)
+
+
+# 정리된 방의 요약. ROOM_PURGE_TTL_SECONDS 를 켜면 원래 room/user/answer 행은 지우고 이것만 남긴다
+class ArchivedRoom(Base):
+    __tablename__ = "room_archive"
+
+    room_code = Column(Text, primary_key=True)
+    created_at = Column(Float, nullable=False)
+    last_active = Column(Float, nullable=False)
+    archived_at = Column(Float, nullable=False, index=True)
+    started = Column(Boolean, nullable=False, default=False)
+    users = Column(Integer, nullable=False, default=0)
+    finished_users = Column(Integer, nullable=False, default=0)
+    answers = Column(Integer, nullable=False, default=0)
+
+
+class ArchivedUser(Base):
+    __tablename__ = "user_archive"
+
+    user_id = Column(String, primary_key=True)
+    room_code = Column(Text, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True))
+    is_guest = Column(Boolean, nullable=False, default=True)
+    finish = Column(Boolean, nullable=False, default=False)
+    answers = Column(Integer, nullable=False, default=0)
+    questions = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,129 @@
+import hashlib
+import io
+import threading
+import tokenize
+from collections import OrderedDict
+from typing import NamedTuple, Tuple
+
+import config
+
+# 제출 코드와 문제 내용을 tokenize 한 번으로 정규화한다.
+#   canonical: 주석, 줄 끝 공백, 빈 줄만 뺀 실행 가능한 코드. DB 에 저장하고 채점기에서 그대로 돌린다.
+#   compact:   주석과 독스트링을 빼고 토큰을 공백 하나로 이은 비교용 문자열. 들여쓰기는 { } 로 남긴다.
+# 같은 입력은 내용 해시로 기억해 두었다가 다시 계산하지 않는다.
+
+SKIPPED = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+STRUCTURE = {tokenize.NEWLINE: ";", tokenize.INDENT: "{", tokenize.DEDENT: "}"}
+
+
+class Normalized(NamedTuple):
+    canonical: str
+    compact: str
+    tokens: Tuple[str, ...]
+    digest: str
+
+
+class Normalizer:
+    def __init__(self, memo_size: int = config.NORMALIZER_MEMO_SIZE):
+        self.memo_size = memo_size
+        self.memo: "OrderedDict[bytes, Normalized]" = OrderedDict()
+        # 동기 엔드포인트(스레드풀)와 to_thread 에서 동시에 불리므로 memo 는 잠그고 만진다.
+        # 토큰화는 잠금 밖에서 하므로 같은 코드를 두 스레드가 함께 정규화할 수는 있지만 결과는 같다
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, code: str) -> Normalized:
+        key = hashlib.blake2b(code.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self.lock:
+            result = self.memo.get(key)
+            if result is not None:
+                self.memo.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        try:
+            result = tokenized(code)
+        except (tokenize.TokenError, IndentationError, SyntaxError):
+            # 파이썬으로 읽히지 않는 입력(작성 중인 코드, 문제 설명 등)은 공백만 정리한다
+            result = fallback(code)
+        with self.lock:
+            self.memo[key] = result
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return result
+
+
+def tokenized(code: str) -> Normalized:
+    lines = code.splitlines()
+    # 주석이 시작하는 열. 행 번호는 1부터
+    comment_cols = {}
+    # 여러 줄 문자열이 걸친 행에서 그대로 둬야 하는 끝 열. None 이면 행 전체(문자열이 다음 행으로 이어진다)
+    string_ends = {}
+    tokens = []
+    previous = tokenize.NEWLINE
+    pending_string = None
+
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        kind = tok.type
+        if kind == tokenize.COMMENT:
+            comment_cols[tok.start[0]] = tok.start[1]
+        if kind == tokenize.STRING and tok.end[0] > tok.start[0]:
+            # 첫 행과 가운데 행은 줄 끝 공백까지 문자열 내용이다. 마지막 행은 닫는 따옴표 뒤만 정리할 수 있다
+            for row in range(tok.start[0], tok.end[0]):
+                string_ends[row] = None
+            string_ends[tok.end[0]] = tok.end[1]
+
+        if kind in SKIPPED:
+            continue
+        # 문장 하나가 통째로 문자열이면 독스트링으로 보고 비교용 토큰에서 뺀다
+        if pending_string is not None:
+            if kind != tokenize.NEWLINE:
+                tokens.append(pending_string)
+            pending_string = None
+        if kind == tokenize.STRING and previous in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT):
+            pending_string = tok.string
+            previous = kind
+            continue
+        tokens.append(STRUCTURE.get(kind, tok.string))
+        previous = kind
+
+    canonical_lines = []
+    for row, line in enumerate(lines, start=1):
+        kept = string_ends.get(row, 0)
+        if kept is None:
+            canonical_lines.append(line)
+            continue
+        if row in comment_cols:
+            line = line[:comment_cols[row]]
+        line = line[:kept] + line[kept:].rstrip()
+        if line:
+            canonical_lines.append(line)
+
+    canonical = "\n".join(canonical_lines) + "\n" if canonical_lines else ""
+    compact = " ".join(tokens)
+    return Normalized(canonical, compact, tuple(tokens), digest(compact))
+
+
+def fallback(code: str) -> Normalized:
+    lines = [line.rstrip() for line in code.splitlines()]
+    canonical = "\n".join(line for line in lines if line)
+    canonical = canonical + "\n" if canonical else ""
+    tokens = tuple(code.split())
+    compact = " ".join(tokens)
+    return Normalized(canonical, compact, tokens, digest(compact))
+
+
+def digest(compact: str) -> str:
+    return hashlib.sha256(compact.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+normalize = Normalizer()
+
+
+def clean_code(code: str) -> str:
+    return normalize(code).canonical
+
+
+def compact_code(code: str) -> str:
+    return normalize(code).compact
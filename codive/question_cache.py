@@ -0,0 +1,93 @@
+import hashlib
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+import config
+import schemas
+
+# 문제 조회 응답을 직렬화된 바이트와 ETag 로 들고 있다가 그대로 내보낸다.
+# 문제는 create_question / delete_question 에서만 바뀌므로 그때 이 워커의 캐시를 통째로 비운다.
+# 다른 워커에서 바뀐 것은 알 수 없으므로 항목마다 ttl 이 지나면 DB 에서 다시 읽는다.
+
+ALL = "all"
+
+question_adapter = TypeAdapter(schemas.QuestionCreate)
+question_list_adapter = TypeAdapter(List[schemas.QuestionCreate])
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    expires: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # GET 비교는 약한 비교라서 W/ 접두사는 무시한다
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class QuestionCache:
+    def __init__(self, ttl: float = config.QUESTION_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.entries: Dict[object, CachedBody] = {}
+        # invalidate 될 때마다 올린다. 읽는 도중 무효화되면 읽은 값을 저장하지 않는다
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key, load: Callable[[], Optional[bytes]]) -> Optional[CachedBody]:
+        cached = self.entries.get(key)
+        if cached is not None and cached.expires > time.monotonic():
+            self.hits += 1
+            return cached
+        self.misses += 1
+        generation = self.generation
+        body = load()
+        if body is None:
+            return None
+        cached = CachedBody(body, make_etag(body), time.monotonic() + self.ttl)
+        if generation == self.generation:
+            self.entries[key] = cached
+        return cached
+
+    def invalidate(self):
+        self.generation += 1
+        self.entries.clear()
+
+    def respond(self, request: Request, cached: CachedBody) -> Response:
+        headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "entries": len(self.entries),
+        }
+
+
+question_cache = QuestionCache()
@@ -0,0 +1,297 @@
+import asyncio
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, func, select, update
+
+import config
+import models
+from database import SessionLocal
+from room_events import encode
+
+# 방 상태(시작 여부, 접속자 수)와 방 메시지 발행/구독을 담당한다.
+# ConnectionManager 는 자기 워커에 붙은 소켓만 알고, 워커 간에 공유해야 하는 것은 모두 여기를 거친다.
+# 이벤트 루프에서 불리므로 모두 코루틴이고, DB 를 쓰는 구현은 스레드에서 돌린다.
+#   - MemoryRoomBroker: 워커 하나일 때. 프로세스 안의 dict/set 만 쓴다.
+#   - SQLiteRoomBroker: 같은 호스트의 여러 uvicorn 워커. 앱 DB 의 테이블로 상태를 공유하고 이벤트 테이블을 폴링한다.
+#     자기 워커가 발행한 이벤트도 폴링으로 받아서 handler 에는 어느 워커의 것이든 seq 순서대로 간다.
+
+Handler = Callable[[str, str], Awaitable[None]]
+
+
+class RoomBroker(ABC):
+    # seq 가 이어지는 범위를 구분하는 값. 바뀌면 클라이언트가 가진 seq 는 의미가 없다
+    epoch = ""
+    # start 시점의 마지막 seq. 이 워커는 그 이전 이벤트를 모른다
+    floor_seq = 0
+
+    async def start(self, handler: Handler):
+        # handler(room_id, message) 는 어느 워커에서 발행된 메시지든 이 워커의 소켓으로 내보낸다
+        self.handler = handler
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, room_id: str, event: dict):
+        # event 에 seq 를 매기고 JSON 으로 직렬화해서 모든 워커의 handler 로 보낸다
+        ...
+
+    @abstractmethod
+    async def mark_started(self, room_id: str):
+        ...
+
+    @abstractmethod
+    async def is_started(self, room_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def forget(self, room_id: str):
+        ...
+
+    @abstractmethod
+    async def set_local_count(self, room_id: str, count: int):
+        ...
+
+    @abstractmethod
+    async def total_count(self, room_id: str) -> int:
+        ...
+
+
+class MemoryRoomBroker(RoomBroker):
+    def __init__(self):
+        self.handler: Optional[Handler] = None
+        self.started_rooms: set = set()
+        self.counts: Dict[str, int] = {}
+        # 프로세스가 다시 뜨면 seq 가 처음부터 시작하므로 epoch 도 새로 만든다
+        self.epoch = uuid.uuid4().hex
+        self.last_seq = 0
+
+    async def publish(self, room_id: str, event: dict):
+        self.last_seq += 1
+        message = encode({**event, "seq": self.last_seq})
+        if self.handler is not None:
+            await self.handler(room_id, message)
+
+    async def mark_started(self, room_id: str):
+        self.started_rooms.add(room_id)
+
+    async def is_started(self, room_id: str) -> bool:
+        return room_id in self.started_rooms
+
+    async def forget(self, room_id: str):
+        self.started_rooms.discard(room_id)
+        self.counts.pop(room_id, None)
+
+    async def set_local_count(self, room_id: str, count: int):
+        if count:
+            self.counts[room_id] = count
+        else:
+            self.counts.pop(room_id, None)
+
+    async def total_count(self, room_id: str) -> int:
+        return self.counts.get(room_id, 0)
+
+
+class SQLiteRoomBroker(RoomBroker):
+    # seq 는 room_event.id 이다. AUTOINCREMENT 라서 행을 지워도 다시 쓰이지 않는다
+    epoch = "sqlite"
+
+    def __init__(
+        self,
+        poll_interval: float = config.BROKER_POLL_INTERVAL_SECONDS,
+        event_retention: float = config.BROKER_EVENT_RETENTION_SECONDS,
+        presence_ttl: float = config.BROKER_PRESENCE_TTL_SECONDS,
+    ):
+        self.worker_id = uuid.uuid4().hex
+        self.poll_interval = poll_interval
+        self.event_retention = event_retention
+        self.presence_ttl = presence_ttl
+        self.handler: Optional[Handler] = None
+        self.last_event_id = 0
+        self.local_counts: Dict[str, int] = {}
+        # 입장/퇴장이 겹쳐도 presence 행에는 항상 마지막 인원수가 남도록 쓰기를 한 줄로 세운다
+        self.presence_lock = asyncio.Lock()
+        # 발행하면 다음 폴링 주기를 기다리지 않고 바로 읽게 깨운다
+        self.wakeup = asyncio.Event()
+        self.poller: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler):
+        self.handler = handler
+        # 시작 전에 쌓인 이벤트는 다시 보내지 않는다
+        self.last_event_id = await asyncio.to_thread(self.read_last_event_id)
+        self.floor_seq = self.last_event_id
+        self.poller = asyncio.create_task(self.poll())
+
+    def read_last_event_id(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.max(models.RoomEvent.id)).scalar() or 0
+        finally:
+            db.close()
+
+    async def stop(self):
+        if self.poller is not None:
+            self.poller.cancel()
+            self.poller = None
+        async with self.presence_lock:
+            await asyncio.to_thread(self.delete_worker_presence)
+
+    def delete_worker_presence(self):
+        db = SessionLocal()
+        try:
+            db.execute(delete(models.RoomPresence).where(models.RoomPresence.worker_id == self.worker_id))
+            db.commit()
+        finally:
+            db.close()
+
+    async def publish(self, room_id: str, event: dict):
+        await asyncio.to_thread(self.insert_event, room_id, event)
+        # 바로 handler 로 보내면 그보다 작은 seq 인 다른 워커의 이벤트가 나중에 도착해 순서가 뒤집힌다.
+        # 폴러를 깨워 테이블에서 id 순서대로 함께 읽게 한다
+        self.wakeup.set()
+
+    def insert_event(self, room_id: str, event: dict) -> str:
+        # 행 id 를 seq 로 쓰므로 넣고 나서 메시지를 채운다. 커밋은 한 번이라 다른 워커는 완성된 행만 본다
+        db = SessionLocal()
+        try:
+            row = models.RoomEvent(room_id=room_id, worker_id=self.worker_id, message="", created_at=time.time())
+            db.add(row)
+            db.flush()
+            row.message = encode({**event, "seq": row.id})
+            db.commit()
+            return row.message
+        finally:
+            db.close()
+
+    async def poll(self):
+        last_heartbeat = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            # 읽는 도중에 들어온 발행은 다시 깨우도록 읽기 전에 내린다
+            self.wakeup.clear()
+            try:
+                events = await asyncio.to_thread(self.fetch_events)
+                for event_id, room_id, message in events:
+                    self.last_event_id = event_id
+                    await self.handler(room_id, message)
+                now = time.time()
+                if now - last_heartbeat > self.presence_ttl / 3:
+                    last_heartbeat = now
+                    await asyncio.to_thread(self.heartbeat, now)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # DB 가 잠깐 잠겨 있는 등 일시적인 오류는 다음 폴링에서 다시 시도한다
+                continue
+
+    def fetch_events(self):
+        db = SessionLocal()
+        try:
+            return db.execute(
+                select(models.RoomEvent.id, models.RoomEvent.room_id, models.RoomEvent.message)
+                .where(models.RoomEvent.id > self.last_event_id)
+                .order_by(models.RoomEvent.id)
+            ).all()
+        finally:
+            db.close()
+
+    def heartbeat(self, now: float):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(models.RoomPresence)
+                .where(models.RoomPresence.worker_id == self.worker_id)
+                .values(updated_at=now)
+            )
+            db.execute(delete(models.RoomEvent).where(models.RoomEvent.created_at < now - self.event_retention))
+            db.execute(delete(models.RoomPresence).where(models.RoomPresence.updated_at < now - self.presence_ttl))
+            db.commit()
+        finally:
+            db.close()
+
+    async def mark_started(self, room_id: str):
+        await asyncio.to_thread(self.write_started, room_id)
+
+    def write_started(self, room_id: str):
+        db = SessionLocal()
+        try:
+            db.execute(update(models.Room).where(models.Room.codeID == room_id).values(started=True))
+            db.commit()
+        finally:
+            db.close()
+
+    async def is_started(self, room_id: str) -> bool:
+        return await asyncio.to_thread(self.read_started, room_id)
+
+    def read_started(self, room_id: str) -> bool:
+        db = SessionLocal()
+        try:
+            return bool(db.query(models.Room.started).filter(models.Room.codeID == room_id).scalar())
+        finally:
+            db.close()
+
+    async def forget(self, room_id: str):
+        self.local_counts.pop(room_id, None)
+        async with self.presence_lock:
+            await asyncio.to_thread(self.delete_presence, room_id)
+
+    def delete_presence(self, room_id: str):
+        db = SessionLocal()
+        try:
+            db.execute(delete(models.RoomPresence).where(models.RoomPresence.room_id == room_id))
+            db.commit()
+        finally:
+            db.close()
+
+    async def set_local_count(self, room_id: str, count: int):
+        if count:
+            self.local_counts[room_id] = count
+        else:
+            self.local_counts.pop(room_id, None)
+        async with self.presence_lock:
+            await asyncio.to_thread(self.write_presence, room_id)
+
+    def write_presence(self, room_id: str):
+        # 기다리는 동안 인원수가 또 바뀌었을 수 있으므로 부를 때의 값이 아니라 지금 값을 쓴다
+        count = self.local_counts.get(room_id, 0)
+        db = SessionLocal()
+        try:
+            if count:
+                db.merge(models.RoomPresence(
+                    room_id=room_id, worker_id=self.worker_id, connections=count, updated_at=time.time()
+                ))
+            else:
+                db.execute(delete(models.RoomPresence).where(
+                    models.RoomPresence.room_id == room_id,
+                    models.RoomPresence.worker_id == self.worker_id
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+    async def total_count(self, room_id: str) -> int:
+        return await asyncio.to_thread(self.read_total, room_id)
+
+    def read_total(self, room_id: str) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.coalesce(func.sum(models.RoomPresence.connections), 0)).filter(
+                models.RoomPresence.room_id == room_id,
+                models.RoomPresence.updated_at >= time.time() - self.presence_ttl
+            ).scalar()
+        finally:
+            db.close()
+
+
+def create_broker(kind: str = config.ROOM_BROKER) -> RoomBroker:
+    if kind == "memory":
+        return MemoryRoomBroker()
+    if kind == "sqlite":
+        return SQLiteRoomBroker()
+    raise ValueError(f"알 수 없는 ROOM_BROKER 값입니다: {kind}")
@@ -0,0 +1,71 @@
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import config
+
+# 방 이벤트 프로토콜 (v1). 모든 메시지는 JSON 한 줄이다.
+#   {"v": 1, "seq": 42, "type": "finish", "room": "abc", "ts": 1700000000.0, "data": {...}}
+# type 별 data
+#   join    {"user", "is_guest"}                          방에 입장 (enter_room, create_room)
+#   leave   {"user"}                                      user 를 밝힌 소켓이 끊김
+#   start   {}                                            방 시작
+#   finish  {"user", "rank"}                              유저가 끝냄. rank 는 종료 순서
+#   rank    {"total_users", "active_users", "finished_users"}  인원/종료 현황이 바뀜
+#   answer  {"user", "question_id", "answer_id"}          답안 저장 완료
+#   count   {"connections"}                               접속자 수 (모아서 보낸다)
+# seq 는 브로커가 방마다 단조 증가하도록 매긴다. 연속이라는 보장은 없다.
+# 접속하면 먼저 hello {"seq", "epoch", "resync"} 를 받는다. 재접속할 때 마지막 seq 와 epoch 를 주면
+# 그 뒤의 이벤트만 다시 받고, 버퍼가 이미 밀려났거나 서버가 바뀌었으면 resync=true 로 알려 준다.
+# hb=1 로 접속하면 hello 에 ping 간격(초)이 붙고, seq 없는 {"v": 1, "type": "ping", "ts"} 가 주기적으로 온다.
+# 클라이언트는 {"type": "pong"} 으로 답한다. 방이 가득 차 있으면 접속하자마자 1013 으로 닫힌다.
+
+PROTOCOL_VERSION = 1
+
+
+def make_event(room_id: str, kind: str, data: dict) -> dict:
+    return {"v": PROTOCOL_VERSION, "type": kind, "room": room_id, "ts": time.time(), "data": data}
+
+
+def encode(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+def legacy_message(room_id: str, event: dict) -> Optional[str]:
+    # 예전 문자열 프로토콜 소켓에는 시작과 접속자 수만 예전 형태로 보낸다
+    if event["type"] == "start":
+        return f"Room {room_id} has started!"
+    if event["type"] == "count":
+        return f"count:{event['data']['connections']}"
+    return None
+
+
+class RoomEventLog:
+    def __init__(self, size: int = config.WS_EVENT_BUFFER_SIZE):
+        self.size = size
+        self.buffers: Dict[str, Deque[Tuple[int, str]]] = {}
+        # 버퍼에서 밀려난 가장 최근 seq. 이것보다 오래된 seq 로는 이어 받을 수 없다
+        self.dropped: Dict[str, int] = {}
+        # 이 워커가 구독을 시작한 시점의 seq. 그 이전 이벤트는 처음부터 갖고 있지 않다
+        self.floor = 0
+
+    def append(self, room_id: str, seq: int, message: str):
+        buffer = self.buffers.setdefault(room_id, deque())
+        if len(buffer) >= self.size:
+            self.dropped[room_id] = buffer.popleft()[0]
+        buffer.append((seq, message))
+
+    def latest(self, room_id: str) -> int:
+        buffer = self.buffers.get(room_id)
+        return buffer[-1][0] if buffer else self.floor
+
+    def since(self, room_id: str, seq: int) -> Optional[List[str]]:
+        # 이어 받을 수 없으면 None
+        if seq > self.latest(room_id) or seq < self.dropped.get(room_id, self.floor):
+            return None
+        return [message for event_seq, message in self.buffers.get(room_id, ()) if event_seq > seq]
+
+    def forget(self, room_id: str):
+        self.buffers.pop(room_id, None)
+        self.dropped.pop(room_id, None)
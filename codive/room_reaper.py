@@ -0,0 +1,193 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, exists, func, or_, select
+
+import config
+import models
+from database import SessionLocal
+
+# 방 정리 작업. 주기적으로 세 가지를 한다.
+#   - 메모리: 오래 메시지도 하트비트도 없는 방의 소켓을 닫고 ConnectionManager 에서 내린다.
+#   - 런타임 상태: 모두 종료했거나 오래 버려진 방의 이벤트 로그와 유사 답안 색인을 내린다. 시작 여부는 남긴다.
+#     user/answer 는 그대로 두므로 끝난 방도 내보내기, 유사 답안, 검색에서 계속 보인다.
+#   - 내용 삭제: ROOM_PURGE_TTL_SECONDS 를 켰을 때만 그보다 오래된 방의 user/answer 를 요약 행으로 옮기고 지운다.
+# 여러 워커가 동시에 돌아도 방 하나는 한 트랜잭션 안에서 요약하고 지우므로 결과는 같다.
+
+
+class RoomReaper:
+    def __init__(
+        self,
+        manager,
+        index,
+        interval: float = config.ROOM_REAPER_INTERVAL_SECONDS,
+        idle_seconds: float = config.ROOM_IDLE_SECONDS,
+        finished_ttl: float = config.ROOM_FINISHED_TTL_SECONDS,
+        abandoned_ttl: float = config.ROOM_ABANDONED_TTL_SECONDS,
+        purge_ttl: float = config.ROOM_PURGE_TTL_SECONDS,
+        batch: int = config.ROOM_ARCHIVE_BATCH,
+    ):
+        self.manager = manager
+        self.index = index
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.finished_ttl = finished_ttl
+        self.abandoned_ttl = abandoned_ttl
+        self.purge_ttl = purge_ttl
+        self.batch = batch
+        self.task: Optional[asyncio.Task] = None
+        self.evicted_rooms = 0
+        self.released_rooms = 0
+        self.archived_rooms = 0
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reap()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # DB 가 잠겨 있는 등 일시적인 오류는 다음 주기에 다시 시도한다
+                continue
+
+    async def reap(self, now: Optional[float] = None):
+        now = now or time.time()
+        idle = self.manager.idle_rooms(now - self.idle_seconds)
+        await asyncio.gather(*(self.manager.close_room(room_id, forget=False) for room_id in idle))
+        self.evicted_rooms += len(idle)
+        # 이 워커에 소켓이 남아 있는 방은 아직 쓰이는 중이므로 건드리지 않는다
+        busy = set(self.manager.rooms)
+        # 유사 답안 색인은 워커마다 따로 들고 있으므로 이벤트 행을 다른 워커가 먼저 지웠어도 내려야 한다
+        held = set(self.index.rooms) - busy
+        # 카운터는 스레드가 아니라 여기(루프 쪽)에서만 올린다
+        released = await asyncio.to_thread(self.release_rooms, now, busy, held)
+        self.released_rooms += len(released)
+        # 방 행이 남아 있으므로 시작 여부는 그대로 둔다. 잊으면 메모리 브로커에서는 끝난 방에 다시 들어올 수 있다
+        await self.drop(released, forget=False)
+        if self.purge_ttl > 0:
+            archived = await asyncio.to_thread(self.archive_rooms, now, busy)
+            self.archived_rooms += len(archived)
+            await self.drop(archived, forget=True)
+
+    async def drop(self, room_ids: List[str], forget: bool):
+        for room_id in room_ids:
+            self.index.forget(room_id)
+        await asyncio.gather(*(self.manager.close_room(room_id, forget=forget) for room_id in room_ids))
+
+    def release_rooms(self, now: float, busy: set, held: set) -> List[str]:
+        has_events = exists().where(models.RoomEvent.room_id == models.Room.codeID)
+        query = self.expired_rooms(now).where(or_(has_events, models.Room.codeID.in_(held)))
+        db = SessionLocal()
+        try:
+            candidates = db.execute(query.limit(self.batch + len(busy))).scalars().all()
+            released = [room_code for room_code in candidates if room_code not in busy][:self.batch]
+            if released:
+                db.execute(delete(models.RoomEvent).where(models.RoomEvent.room_id.in_(released)))
+                db.commit()
+            return released
+        finally:
+            db.close()
+
+    def archive_rooms(self, now: float, busy: set) -> List[str]:
+        db = SessionLocal()
+        try:
+            candidates = db.execute(self.purgeable_rooms(now).limit(self.batch + len(busy))).scalars().all()
+            archived = []
+            for room_code in candidates:
+                if room_code in busy or len(archived) >= self.batch:
+                    continue
+                self.archive(db, room_code, now)
+                db.commit()
+                archived.append(room_code)
+            return archived
+        finally:
+            db.close()
+
+    def expired_rooms(self, now: float):
+        Room, User = models.Room, models.User
+        has_users = exists().where(User.room_code == Room.codeID)
+        has_active = exists().where(User.room_code == Room.codeID, User.finish == False)
+        # 다른 워커에 소켓이 붙어 있는 방 (sqlite 브로커일 때만 행이 있다)
+        has_presence = exists().where(models.RoomPresence.room_id == Room.codeID)
+        return (
+            select(Room.codeID)
+            .where(or_(
+                and_(has_users, ~has_active, Room.last_active < now - self.finished_ttl),
+                Room.last_active < now - self.abandoned_ttl,
+            ))
+            .where(~has_presence)
+            .order_by(Room.last_active)
+        )
+
+    def purgeable_rooms(self, now: float):
+        Room = models.Room
+        has_presence = exists().where(models.RoomPresence.room_id == Room.codeID)
+        return (
+            select(Room.codeID)
+            .where(Room.last_active < now - self.purge_ttl)
+            .where(~has_presence)
+            .order_by(Room.last_active)
+        )
+
+    def archive(self, db, room_code: str, now: float):
+        room = db.get(models.Room, room_code)
+        if room is None:
+            return
+        users = db.execute(
+            select(models.User.id, models.User.created_at, models.User.is_guest, models.User.finish)
+            .where(models.User.room_code == room_code)
+        ).all()
+        user_ids = select(models.User.id).where(models.User.room_code == room_code)
+        answer_counts = {
+            user_id: (answers, questions)
+            for user_id, answers, questions in db.execute(
+                select(models.Answer.user_id, func.count(), func.count(func.distinct(models.Answer.question_id)))
+                .where(models.Answer.user_id.in_(user_ids))
+                .group_by(models.Answer.user_id)
+            )
+        }
+
+        for user in users:
+            answers, questions = answer_counts.get(user.id, (0, 0))
+            db.merge(models.ArchivedUser(
+                user_id=user.id,
+                room_code=room_code,
+                created_at=user.created_at,
+                is_guest=bool(user.is_guest),
+                finish=bool(user.finish),
+                answers=answers,
+                questions=questions,
+            ))
+        db.merge(models.ArchivedRoom(
+            room_code=room_code,
+            created_at=room.created_at,
+            last_active=room.last_active,
+            archived_at=now,
+            started=bool(room.started),
+            users=len(users),
+            finished_users=sum(1 for user in users if user.finish),
+            answers=sum(answers for answers, _ in answer_counts.values()),
+        ))
+
+        db.execute(delete(models.Answer).where(models.Answer.user_id.in_(user_ids)))
+        db.execute(delete(models.User).where(models.User.room_code == room_code))
+        db.execute(delete(models.RoomEvent).where(models.RoomEvent.room_id == room_code))
+        db.execute(delete(models.RoomPresence).where(models.RoomPresence.room_id == room_code))
+        db.delete(room)
+
+    def stats(self) -> dict:
+        return {
+            "evicted_rooms": self.evicted_rooms,
+            "released_rooms": self.released_rooms,
+            "archived_rooms": self.archived_rooms,
+        }
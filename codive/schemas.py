@@ -37,6 +37,17 @@ class Answer(AnswerBase):
     class Config:
         orm_mode = True
 
+class TestCaseCreate(BaseModel):
+    input_data: str = ""
+    expected_output: str
+
+class TestCase(TestCaseCreate):
+    id: int
+    question_id: int
+
+    class Config:
+        from_attributes = True
+
 class RoomEnter(BaseModel):
     codeID: str
     pw: str
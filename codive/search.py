@@ -0,0 +1,151 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.orm import Session
+
+import config
+import models
+
+# 문제/답안 본문 전문 검색. SQLite FTS5 외부 콘텐츠 테이블(마이그레이션 e7b2c94d1f58)이라 본문은 question/answer 에만 있고 색인만 따로 둔다.
+# 코드는 단어 경계가 애매하므로(sum(, dp[i-1], [::-1], 한글 조사) trigram 토크나이저로 3글자 조각을 색인해
+# 식별자든 연산자든 한글 문구든 부분 문자열로 찾는다. 대소문자는 구분하지 않는다.
+# 답안은 answer_writer 의 Core insert, room_reaper 의 일괄 delete 등 ORM 을 거치지 않는 경로로도 바뀌므로
+# 동기화는 트리거가 같은 트랜잭션 안에서 한다.
+# 흔한 조각이면 일치 항목이 수십만 개라 최근 SEARCH_RANK_WINDOW 개만 읽어 점수를 매기고 그 안에서 페이지를 나눈다.
+# SQLite 가 아니면 FTS 테이블이 없으므로(마이그레이션이 건너뛴다) 같은 조건을 LIKE 로 찾는다. 색인이 없어 느리지만 결과는 같다.
+
+MIN_TERM_LENGTH = 3
+OPEN_MARK = "«"
+CLOSE_MARK = "»"
+
+TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 의 tf 항 상수
+K1 = 1.2
+B = 0.75
+
+
+def parse_terms(query: str) -> List[str]:
+    # 따옴표로 묶은 부분은 공백까지 한 덩어리, 나머지는 공백으로 나눈 조각이다. 모든 조각이 들어 있어야 한다.
+    # trigram 으로 찾을 수 없는 짧은 조각은 버린다
+    terms = []
+    for quoted, bare in TERM.findall(query):
+        term = (quoted or bare).casefold()
+        if len(term) >= MIN_TERM_LENGTH and term not in terms:
+            terms.append(term)
+    if not terms:
+        raise ValueError(f"검색어는 {MIN_TERM_LENGTH}글자 이상이어야 합니다.")
+    return terms
+
+
+def match_expression(terms: List[str]) -> str:
+    # 조각이 FTS5 문법으로 해석되지 않도록 전부 따옴표로 감싼다
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def score(content: str, terms: List[str], average: float) -> float:
+    # FTS5 의 bm25() 는 조각마다 전체 문서 수를 세느라 흔한 조각이면 수십만 행을 읽는다.
+    # 후보는 모두 모든 조각을 담고 있어 idf 가 같으므로 tf 와 길이 보정만 남겨 파이썬에서 계산한다
+    text = content.casefold()
+    norm = K1 * (1 - B + B * len(text) / average)
+    total = 0.0
+    for term in terms:
+        tf = text.count(term)
+        total += tf * (K1 + 1) / (tf + norm)
+    return total
+
+
+def snippet(content: str, terms: List[str], width: int) -> str:
+    text = content.casefold()
+    hits = [position for position in (text.find(term) for term in terms) if position >= 0]
+    first = min(hits, default=0)
+    start = max(0, first - width // 4)
+    end = min(len(content), start + width)
+    excerpt = content[start:end]
+    # casefold 로 길이가 바뀌는 글자가 있으면 위치가 어긋나므로 발췌 안에서 다시 찾는다
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    excerpt = pattern.sub(lambda found: OPEN_MARK + found.group(0) + CLOSE_MARK, excerpt)
+    return ("…" if start > 0 else "") + excerpt + ("…" if end < len(content) else "")
+
+
+def uses_fts(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def like_filter(column, terms: List[str]):
+    # 조각은 모두 casefold 되어 있다. % 와 _ 는 글자 그대로 찾는다
+    return and_(*(func.lower(column).contains(term, autoescape=True) for term in terms))
+
+
+def rank(rows, terms: List[str], limit: int, offset: int) -> List[Tuple[float, object]]:
+    if not rows:
+        return []
+    average = sum(len(row.content) for row in rows) / len(rows) or 1.0
+    scored = [(score(row.content, terms, average), row) for row in rows]
+    # 점수가 같으면 최근 답안이 먼저다
+    scored.sort(key=lambda item: (-item[0], -item[1].id))
+    return scored[offset:offset + limit]
+
+
+def search_answers(db: Session, terms: List[str], limit: int, offset: int, room: Optional[str] = None,
+                   question_id: Optional[int] = None) -> List[dict]:
+    rows = (fts_answers if uses_fts(db) else like_answers)(db, terms, room, question_id)
+    return [
+        {"id": row.id, "user_id": row.user_id, "question_id": row.question_id, "score": round(value, 4),
+         "snippet": snippet(row.content, terms, config.SEARCH_SNIPPET_CHARS)}
+        for value, row in rank(rows, terms, limit, offset)
+    ]
+
+
+def fts_answers(db: Session, terms: List[str], room: Optional[str], question_id: Optional[int]):
+    filters = ""
+    params = {"match": match_expression(terms), "window": config.SEARCH_RANK_WINDOW}
+    if room is not None:
+        # 한 방의 답안은 수업 시간 동안 몰려서 들어오므로 id 가 좁은 구간에 모여 있다.
+        # 그 구간을 rowid 범위로 FTS5 에 넘기면 다른 방의 일치 항목을 거의 읽지 않는다
+        lo, hi = db.execute(text(
+            "SELECT min(id), max(id) FROM answer WHERE user_id IN (SELECT id FROM user WHERE room_code = :room)"
+        ), {"room": room}).one()
+        if lo is None:
+            return []
+        filters += (" AND answer_fts.rowid BETWEEN :lo AND :hi"
+                    " AND a.user_id IN (SELECT id FROM user WHERE room_code = :room)")
+        params.update(lo=lo, hi=hi, room=room)
+    if question_id is not None:
+        filters += " AND a.question_id = :question_id"
+        params["question_id"] = question_id
+    return db.execute(text(
+        "SELECT a.id, a.user_id, a.question_id, a.content "
+        "FROM answer_fts JOIN answer a ON a.id = answer_fts.rowid "
+        f"WHERE answer_fts MATCH :match{filters} "
+        "ORDER BY answer_fts.rowid DESC LIMIT :window"
+    ), params).all()
+
+
+def like_answers(db: Session, terms: List[str], room: Optional[str], question_id: Optional[int]):
+    Answer = models.Answer
+    query = select(Answer.id, Answer.user_id, Answer.question_id, Answer.content).where(like_filter(Answer.content, terms))
+    if room is not None:
+        query = query.where(Answer.user_id.in_(select(models.User.id).where(models.User.room_code == room)))
+    if question_id is not None:
+        query = query.where(Answer.question_id == question_id)
+    return db.execute(query.order_by(Answer.id.desc()).limit(config.SEARCH_RANK_WINDOW)).all()
+
+
+def search_questions(db: Session, terms: List[str], limit: int, offset: int) -> List[dict]:
+    if uses_fts(db):
+        rows = db.execute(text(
+            "SELECT q.id, q.content FROM question_fts JOIN question q ON q.id = question_fts.rowid "
+            "WHERE question_fts MATCH :match ORDER BY question_fts.rowid DESC LIMIT :window"
+        ), {"match": match_expression(terms), "window": config.SEARCH_RANK_WINDOW}).all()
+    else:
+        Question = models.Question
+        rows = db.execute(
+            select(Question.id, Question.content).where(like_filter(Question.content, terms))
+            .order_by(Question.id.desc()).limit(config.SEARCH_RANK_WINDOW)
+        ).all()
+    return [
+        {"id": row.id, "score": round(value, 4), "snippet": snippet(row.content, terms, config.SEARCH_SNIPPET_CHARS)}
+        for value, row in rank(rows, terms, limit, offset)
+    ]
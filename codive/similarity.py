@@ -0,0 +1,203 @@
+import asyncio
+import keyword
+import random
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import config
+from normalizer import Normalizer, digest, normalize
+
+# 방 안에서 거의 같은 답안 쌍을 찾는 지문 색인.
+# 정규화된 토큰에서 식별자/문자열/숫자를 자리표시자로 바꾼 뒤 k-gram 해시를 winnowing 으로 골라 지문을 만든다.
+# 지문 집합의 MinHash 서명을 밴드로 나눠 버킷에 넣고(LSH), 답안이 들어올 때 같은 버킷에 있던 답안하고만
+# 지문 집합 Jaccard 를 계산해 둔다. 같은 문제의 답안끼리만 비교하고, 조회는 계산해 둔 쌍만 본다.
+# 자리표시자까지 같은 답안은 서명 대신 해시 묶음으로 바로 찾는다.
+
+NAME = "v"
+STRING = "s"
+NUMBER = "n"
+
+MASK = (1 << 64) - 1
+MULTIPLIER = 0x9E3779B97F4A7C15
+SALTS = [random.Random(index).getrandbits(64) for index in range(config.SIMILARITY_BANDS * config.SIMILARITY_ROWS)]
+
+
+class Entry(NamedTuple):
+    answer_id: int
+    user_id: str
+    question_id: int
+    fingerprints: frozenset
+    shape: str
+
+
+def shape_tokens(code: str, normalizer: Normalizer = normalize) -> List[str]:
+    # 변수 이름이나 상수만 바꾼 복사본도 같은 토큰열이 되도록 한다. 키워드와 구조 토큰은 남긴다
+    shaped = []
+    for token in normalizer(code).tokens:
+        if token.isidentifier():
+            shaped.append(token if keyword.iskeyword(token) else NAME)
+        elif token[:1].isdigit():
+            shaped.append(NUMBER)
+        elif token[-1:] in ("'", '"'):
+            shaped.append(STRING)
+        else:
+            shaped.append(token)
+    return shaped
+
+
+def winnow(tokens: List[str], k: int, window: int) -> frozenset:
+    if not tokens:
+        return frozenset()
+    if len(tokens) <= k:
+        return frozenset({hash(tuple(tokens))})
+    hashes = [hash(tuple(tokens[i:i + k])) for i in range(len(tokens) - k + 1)]
+    if len(hashes) <= window:
+        return frozenset({min(hashes)})
+    return frozenset(min(hashes[i:i + window]) for i in range(len(hashes) - window + 1))
+
+
+def signature(fingerprints: frozenset) -> Tuple[int, ...]:
+    # 해시마다 다른 소금을 섞은 64비트 순열의 최솟값. 두 집합의 값이 같을 확률이 Jaccard 와 같다
+    if not fingerprints:
+        return ()
+    return tuple(min(((fingerprint ^ salt) * MULTIPLIER) & MASK for fingerprint in fingerprints) for salt in SALTS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def make_entry(answer_id: int, user_id: str, question_id: int, content: str, normalizer: Normalizer = normalize,
+               k: int = config.SIMILARITY_KGRAM, window: int = config.SIMILARITY_WINDOW) -> Entry:
+    tokens = shape_tokens(content, normalizer)
+    return Entry(answer_id, user_id, question_id, winnow(tokens, k, window), digest(" ".join(tokens)))
+
+
+def make_entries(rows: Iterable) -> List[Entry]:
+    # 스레드에서 한꺼번에 만들 때 쓴다. 방 하나를 통째로 읽으면서 공유 normalize 의 메모를 밀어내거나
+    # 그 잠금을 오래 잡지 않도록 메모 없는 정규화기를 따로 쓴다
+    normalizer = Normalizer(memo_size=0)
+    return [make_entry(row.id, row.user_id, row.question_id, row.content, normalizer) for row in rows]
+
+
+class QuestionIndex:
+    def __init__(self, max_bucket: int):
+        self.max_bucket = max_bucket
+        self.entries: Dict[int, Entry] = {}
+        # 밴드별 (서명 조각 -> 대표 답안). max_bucket 이 찬 버킷에는 더 넣지 않아 추가 비용이 일정하다
+        self.bands: List[Dict[int, List[int]]] = [{} for _ in range(config.SIMILARITY_BANDS)]
+        # 자리표시자까지 같은 답안 묶음. 첫 답안만 대표로 버킷에 넣는다
+        self.groups: Dict[str, List[int]] = {}
+        # (먼저 들어온 대표, 나중 대표) -> Jaccard. SIMILARITY_MIN_SCORE 이상만 남긴다
+        self.scores: Dict[Tuple[int, int], float] = {}
+
+    def add(self, entry: Entry):
+        self.entries[entry.answer_id] = entry
+        group = self.groups.setdefault(entry.shape, [])
+        group.append(entry.answer_id)
+        if len(group) > 1:
+            return
+        values = signature(entry.fingerprints)
+        if not values:
+            return
+        candidates = set()
+        rows = config.SIMILARITY_ROWS
+        for band, buckets in enumerate(self.bands):
+            bucket = buckets.setdefault(hash(values[band * rows:(band + 1) * rows]), [])
+            candidates.update(bucket)
+            if len(bucket) < self.max_bucket:
+                bucket.append(entry.answer_id)
+        for other in candidates:
+            score = jaccard(self.entries[other].fingerprints, entry.fingerprints)
+            if score >= config.SIMILARITY_MIN_SCORE:
+                self.scores[(other, entry.answer_id)] = score
+
+    def pairs(self, threshold: float) -> Iterable[Tuple[float, Entry, Entry]]:
+        for members in self.groups.values():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    yield 1.0, self.entries[a], self.entries[b]
+        near = [(score, a, b) for (a, b), score in self.scores.items() if score >= threshold]
+        near.sort(reverse=True)
+        for score, a, b in near:
+            for member_a in self.groups[self.entries[a].shape]:
+                for member_b in self.groups[self.entries[b].shape]:
+                    yield score, self.entries[member_a], self.entries[member_b]
+
+
+class RoomIndex:
+    def __init__(self, max_bucket: int):
+        self.max_bucket = max_bucket
+        self.questions: Dict[int, QuestionIndex] = {}
+        self.answer_ids: set = set()
+        self.lock = asyncio.Lock()
+
+    def reset(self):
+        self.questions = {}
+        self.answer_ids = set()
+
+    def add(self, entries: Iterable[Entry]):
+        for entry in entries:
+            # 저장 직후 훅과 DB 따라잡기가 같은 답안을 두 번 넣을 수 있다
+            if entry.answer_id in self.answer_ids:
+                continue
+            self.answer_ids.add(entry.answer_id)
+            question = self.questions.get(entry.question_id)
+            if question is None:
+                question = self.questions[entry.question_id] = QuestionIndex(self.max_bucket)
+            question.add(entry)
+
+    def pairs(self, threshold: float, limit: int, question_id: Optional[int] = None) -> List[dict]:
+        results = []
+        questions = [self.questions.get(question_id)] if question_id is not None else self.questions.values()
+        for question in questions:
+            if question is None:
+                continue
+            taken = 0
+            for score, a, b in question.pairs(threshold):
+                # 같은 유저가 다시 낸 답안은 베낀 것이 아니다
+                if a.user_id == b.user_id:
+                    continue
+                results.append({
+                    "question_id": a.question_id,
+                    "score": round(score, 4),
+                    "a": {"answer_id": a.answer_id, "user_id": a.user_id},
+                    "b": {"answer_id": b.answer_id, "user_id": b.user_id},
+                })
+                taken += 1
+                # 문제별로 점수 내림차순으로 나오므로 문제마다 limit 개면 충분하다
+                if taken >= limit:
+                    break
+        results.sort(key=lambda pair: -pair["score"])
+        return results[:limit]
+
+
+class SimilarityIndex:
+    def __init__(self, max_rooms: int = config.SIMILARITY_MAX_ROOMS, max_bucket: int = config.SIMILARITY_MAX_BUCKET):
+        self.max_rooms = max_rooms
+        self.max_bucket = max_bucket
+        self.rooms: "OrderedDict[str, RoomIndex]" = OrderedDict()
+
+    def room(self, room_id: str) -> RoomIndex:
+        index = self.rooms.get(room_id)
+        if index is None:
+            index = self.rooms[room_id] = RoomIndex(self.max_bucket)
+            if len(self.rooms) > self.max_rooms:
+                self.rooms.popitem(last=False)
+        self.rooms.move_to_end(room_id)
+        return index
+
+    def add(self, room_id: str, rows: Iterable[dict]):
+        # 색인이 올라와 있는 방만 바로 갱신한다. 아니면 처음 조회할 때 DB 에서 한꺼번에 읽는다
+        index = self.rooms.get(room_id)
+        if index is not None:
+            index.add(make_entry(row["id"], row["user_id"], row["question_id"], row["content"]) for row in rows)
+
+    def forget(self, room_id: str):
+        self.rooms.pop(room_id, None)
+
+
+similarity_index = SimilarityIndex()
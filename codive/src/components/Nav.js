@@ -3,6 +3,7 @@ import { IoIosTimer } from "react-icons/io";
 import '../Nav.css';
 import { SlPeople } from "react-icons/sl";
 import { useLocation } from 'react-router-dom'; 
+import { openRoomEvents } from '../roomEvents';
 
 function Nav() {
   const [remainingUsers, setRemainingUsers] = useState(0);
@@ -50,6 +51,22 @@ function Nav() {
     return () => clearInterval(timer);
   }, [roomCode, location.pathname]);
 
+  // 인원/종료 현황은 방 이벤트로 받는다. 이어 받을 수 없을 때만 REST 로 다시 읽는다
+  useEffect(() => {
+    if (!roomCode) return;
+    const events = openRoomEvents(roomCode, whouser, {
+      onEvent: (event) => {
+        if (event.type === 'rank') {
+          setRemainingUsers(event.data.active_users);
+          setTotalUsers(event.data.total_users);
+        }
+      },
+      onResync: fetchUserStats,
+    });
+    return () => events.close();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [roomCode, whouser]);
+
   useEffect(() => {
     document.cookie = `remainingUsers=${remainingUsers}; path=/`;
   }, [remainingUsers]);
@@ -0,0 +1,57 @@
+// /generate-hint/ 스트리밍 요청. 서버가 보내는 SSE 를 읽어 token 이벤트마다 onToken 을 부른다.
+// 돌려준 abort() 로 요청을 끊으면 서버도 LLM 요청을 닫는다.
+const HINT_URL = 'http://localhost:8000/generate-hint/';
+
+export function streamHint(payload, { onToken, onDone, onError }) {
+  const controller = new AbortController();
+
+  const dispatch = (block) => {
+    let event = 'message';
+    let data = '';
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event: ')) event = line.slice(7);
+      else if (line.startsWith('data: ')) data += line.slice(6);
+    }
+    if (!data) return;
+    const body = JSON.parse(data);
+    if (event === 'token') onToken(body.content);
+    else if (event === 'done' && onDone) onDone(body.content);
+    else if (event === 'error') throw new Error(body.detail);
+  };
+
+  (async () => {
+    try {
+      const response = await fetch(HINT_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ ...payload, stream: true }),
+        signal: controller.signal,
+      });
+      if (response.status === 429) {
+        // 방/유저 예산을 넘었다. 몇 초 뒤에 다시 보낼 수 있는지 함께 넘긴다
+        const error = new Error('Too many hint requests');
+        error.retryAfter = Number(response.headers.get('Retry-After')) || 1;
+        throw error;
+      }
+      if (!response.ok) throw new Error('Network response was not ok');
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+          dispatch(buffer.slice(0, boundary));
+          buffer = buffer.slice(boundary + 2);
+        }
+      }
+    } catch (error) {
+      if (error.name !== 'AbortError' && onError) onError(error);
+    }
+  })();
+
+  return { abort: () => controller.abort() };
+}
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import '../Home.css';
 import "../waiting.css";
+import { openRoomEvents } from '../roomEvents';
 
 function Home( {allowAICodeRecommendation, setAllowAICodeRecommendation}) {
   const [showPopup, setShowPopup] = useState(false);
@@ -28,16 +29,15 @@ function Home( {allowAICodeRecommendation, setAllowAICodeRecommendation}) {
 
 useEffect(() => {
   if (showWaitingPopup) {
-    socketRef.current = new WebSocket(`ws://localhost:8000/ws/${inviteCode}`);
-
-    socketRef.current.onmessage = (event) => {
-      if (event.data.includes("started")) {
-        navigate('/room');
-      } else if (event.data.startsWith("count:")) {
-        const count = parseInt(event.data.split(":")[1], 10);
-        setNowPerson(count);
-      }
-    };
+    socketRef.current = openRoomEvents(inviteCode, null, {
+      onEvent: (event) => {
+        if (event.type === 'start') {
+          navigate('/room');
+        } else if (event.type === 'count') {
+          setNowPerson(event.data.connections);
+        }
+      },
+    });
 
     return () => {
       if (socketRef.current) {
@@ -110,8 +110,8 @@ useEffect(() => {
   };
 
   const handleStartRoom = () => {
-    if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-      socketRef.current.send("start");
+    if (socketRef.current) {
+      socketRef.current.send(JSON.stringify({ type: 'start' }));
     }
   };
 
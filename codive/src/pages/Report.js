@@ -15,6 +15,77 @@ const deleteSpecificCookie = (name) => {
   document.cookie = `${name}=;expires=Thu, 01 Jan 1970 00:00:00 UTC;path=/`;
 };
 
+// 서버에서 유저 단위로 걸러진 답안을 커서 페이지 단위로 모두 가져온다
+const fetchUserAnswers = async (userId) => {
+  const answers = [];
+  let cursor = 0;
+  while (cursor !== null) {
+    const response = await fetch(`http://127.0.0.1:8000/api/user/${userId}/answers?after=${cursor}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch answers');
+    }
+    const page = await response.json();
+    answers.push(...page.items);
+    cursor = page.next_cursor;
+  }
+  return answers;
+};
+
+const PROBLEMS = [
+  "",
+  "두 정수 A와 B를 입력받은 다음, A+B를 출력하는 프로그램을 작성하시오.",
+  "세 정수 A, B, C를 입력받고, 그 중 가장 큰 값을 출력하는 프로그램을 작성하시오.",
+  "정수 N이 주어질 때, 1부터 N까지의 합을 구하는 프로그램을 작성하시오.",
+  "문자열 S가 주어졌을 때, S의 길이를 출력하는 프로그램을 작성하시오.",
+  "두 정수 A와 B가 주어졌을 때, A와 B를 곱한 값을 출력하는 프로그램을 작성하시오."
+];
+
+const PENDING_ANALYSIS = {
+  test_pass: "분석 중",
+  time_complexity: "분석 중",
+  code_style: "분석 중",
+  execution_time: "분석 중",
+  memory_usage: "분석 중"
+};
+
+const FAILED_ANALYSIS = {
+  test_pass: "분석 실패",
+  time_complexity: "분석 실패",
+  code_style: "분석 실패",
+  execution_time: "분석 실패",
+  memory_usage: "분석 실패"
+};
+
+// 방 보고서 엔드포인트의 NDJSON 응답을 한 줄씩 읽어 onResult 로 넘긴다.
+// LLM 예산에 걸린 답안은 서버가 기다렸다가 이어서 보내므로 여기서 다시 요청하지 않는다
+const streamReport = async (roomCode, userId, onResult) => {
+  const response = await fetch(`http://127.0.0.1:8000/api/room/${roomCode}/report`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      user_id: userId,
+      max_tokens: 150,
+      problems: Object.fromEntries(PROBLEMS.map((content, id) => [id, content]))
+    })
+  });
+  if (!response.ok) {
+    throw new Error('Failed to fetch report');
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter(line => line.trim()).forEach(line => onResult(JSON.parse(line)));
+  }
+};
+
 const Report = React.memo(() => {
   const [userAnswers, setUserAnswers] = useState([]);
 
@@ -25,15 +96,6 @@ const Report = React.memo(() => {
   const [totalUsers, setTotalUsers] = useState(0);
   const [roomCode, setRoomCode] = useState("");
   
-  const problems = [
-    "",
-    "두 정수 A와 B를 입력받은 다음, A+B를 출력하는 프로그램을 작성하시오.",
-    "세 정수 A, B, C를 입력받고, 그 중 가장 큰 값을 출력하는 프로그램을 작성하시오.",
-    "정수 N이 주어질 때, 1부터 N까지의 합을 구하는 프로그램을 작성하시오.",
-    "문자열 S가 주어졌을 때, S의 길이를 출력하는 프로그램을 작성하시오.",
-    "두 정수 A와 B가 주어졌을 때, A와 B를 곱한 값을 출력하는 프로그램을 작성하시오."
-  ];
-
   useEffect(() => {
     if (!sessionStorage.getItem('reloaded')) {
       sessionStorage.setItem('reloaded', 'true');
@@ -66,12 +128,13 @@ const Report = React.memo(() => {
     const fetchRank = async () => {
       if (!roomCode || !currentUser) return;
       try {
-        const response = await fetch(`/api/room/${roomCode}/user_stats`);
+        // 종료할 때 서버가 매긴 등수를 받는다
+        const response = await fetch(`/api/room/${roomCode}/rank/${currentUser}`);
         if (!response.ok) {
           throw new Error('Failed to fetch rank');
         }
         const data = await response.json();
-        setRank(data.total_users - data.active_users);
+        setRank(data.rank);
         setTotalUsers(data.total_users);
       } catch (error) {
         console.error('Error fetching rank:', error);
@@ -85,67 +148,35 @@ const Report = React.memo(() => {
     const fetchData = async () => {
       if (!roomCode) return;
       try {
-        const [answersResponse, guestCountResponse] = await Promise.all([
-          fetch(`http://127.0.0.1:8000/api/answers/`),
+        const [filteredAnswers, guestCountResponse] = await Promise.all([
+          fetchUserAnswers(currentUser),
           fetch(`http://127.0.0.1:8000/api/room/${roomCode}/guestcount`)
         ]);
   
-        if (!answersResponse.ok || !guestCountResponse.ok) {
+        if (!guestCountResponse.ok) {
           throw new Error('Failed to fetch data');
         }
   
         const guestCountData = await guestCountResponse.json();
         setTotalUsers(guestCountData.guest_count);
   
-        const answersData = await answersResponse.json();
-        const filteredAnswers = answersData.filter(answer => answer.user_id === currentUser);
         setUserAnswers(filteredAnswers);
   
-        const questionIds = filteredAnswers.map(answer => answer.question_id);
-        console.log("Question IDs:", questionIds);
-  
-        const relevantQuestions = questionIds.map(id => ({
-          id,
-          content: problems[id]
-        }));
-  
-        console.log("Relevant Questions:", relevantQuestions);
-  
-        const analysisResults = await Promise.all(relevantQuestions.map(async (question) => {
-          const answer = filteredAnswers.find(ans => ans.question_id === question.id);
-          try {
-            const response = await fetch(`http://127.0.0.1:8000/generate-text/`, {
-              method: "POST",
-              headers: {
-                "Content-Type": "application/json",
-              },
-              body: JSON.stringify({ 
-                problem: question.content,
-                answer: answer.content,
-                max_tokens: 150
-              })
-            });
-
-            const gptResponse = await response.json();
-            console.log("GPT Response:", gptResponse);
-
-            const correctedJSON = gptResponse.generated_text.replace(/'/g, '"');
-            return JSON.parse(correctedJSON);
-          } catch (error) {
-            console.error('JSON parse error or fetch error:', error);
-            // 기본값 반환
-            return {
-              test_pass: "통과x",
-              time_complexity: "코드제출 x",
-              code_style: "코드제출 x",
-              execution_time: "코드제출x",
-              memory_usage: "코드제출 x"
-            };
-          }
-        }));
-  
-        setCodeAnalysisResults(analysisResults);
+        // 분석은 서버에서 한 번에 돌리고, 끝나는 답안부터 한 줄씩 받아 바로 그린다
+        const positions = new Map(filteredAnswers.map((answer, index) => [answer.id, index]));
+        setCodeAnalysisResults(filteredAnswers.map(() => ({ ...PENDING_ANALYSIS })));
         setLoading(false);
+
+        await streamReport(roomCode, currentUser, (row) => {
+          const index = positions.get(row.answer_id);
+          if (index === undefined) return;
+          setCodeAnalysisResults((prev) => {
+            const next = [...prev];
+            // 이 답안만 실패한 줄은 error 만 오고 result 가 없다
+            next[index] = row.error ? { ...FAILED_ANALYSIS } : row.result;
+            return next;
+          });
+        });
   
       } catch (error) {
         console.error('Error fetching data:', error);
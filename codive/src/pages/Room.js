@@ -1,8 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import '../Room.css';
 import { useNavigate } from 'react-router-dom';
 import { FaRobot, FaRegCheckCircle } from 'react-icons/fa';
 import { Editor } from '@monaco-editor/react';
+import { streamHint } from '../hintStream';
 
 const getCookieValue = (name) => {
   const value = `; ${document.cookie}`;
@@ -18,6 +19,7 @@ function Room({ allowAICodeRecommendation }) {
   const navigate = useNavigate();
   const [aiResponse, setAIResponse] = useState(""); 
   const [whouser, setWhoUser] = useState("");
+  const hintRef = useRef(null);
   const problems = [
     "두 정수 A와 B를 입력받은 다음, A+B를 출력하는 프로그램을 작성하시오.",
     "세 정수 A, B, C를 입력받고, 그 중 가장 큰 값을 출력하는 프로그램을 작성하시오.",
@@ -32,6 +34,9 @@ function Room({ allowAICodeRecommendation }) {
     setWhoUser(guestId);
   }, []);
 
+  // 화면을 떠나면 받던 힌트 스트림을 끊는다
+  useEffect(() => () => hintRef.current && hintRef.current.abort(), []);
+
   const sendCodeToBackend = async () => {
      {
       const payload = {
@@ -104,6 +109,12 @@ function Room({ allowAICodeRecommendation }) {
     if (!allowAICodeRecommendation) return;
 
     setShowAIBox((prevState) => !prevState); 
+
+    // 닫거나 다시 열 때 이전 힌트 스트림은 끊는다
+    if (hintRef.current) {
+      hintRef.current.abort();
+      hintRef.current = null;
+    }
   
     if (!showAIBox) { 
       const formattedCode = formatCode(code); 
@@ -113,28 +124,25 @@ function Room({ allowAICodeRecommendation }) {
         user_code: formattedCode,
         problem_statement: currentProblemStatement, 
         max_tokens: 100,
+        user_id: whouser,
       };
   
-      try {
-        const response = await fetch("http://localhost:8000/generate-hint/", {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify(payload),
-        });
-  
-        if (!response.ok) {
-          throw new Error("Network response was not ok");
-        }
-  
-        const data = await response.json();
-        console.log(data);
-        setAIResponse(data.content || "AI로부터 응답을 받을 수 없습니다. 다시 시도해");
-      } catch (error) {
-        console.error("AI 요청 중 오류 발생:", error);
-        setAIResponse("AI로부터 응답을 받을 수 없습니다. 다시 시도해주세요.");
-      }
+      // 토큰이 오는 대로 이어 붙여 보여 준다
+      setAIResponse("");
+      hintRef.current = streamHint(payload, {
+        onToken: (token) => setAIResponse((previous) => previous + token),
+        onDone: (content) => {
+          if (!content) setAIResponse("AI로부터 응답을 받을 수 없습니다. 다시 시도해");
+        },
+        onError: (error) => {
+          console.error("AI 요청 중 오류 발생:", error);
+          if (error.retryAfter) {
+            setAIResponse(`힌트 요청이 많습니다. ${error.retryAfter}초 후에 다시 시도해주세요.`);
+            return;
+          }
+          setAIResponse("AI로부터 응답을 받을 수 없습니다. 다시 시도해주세요.");
+        },
+      });
     }
   };
 
@@ -0,0 +1,77 @@
+// 방 이벤트 소켓(v1). 끊기면 마지막으로 받은 seq 부터 이어 받도록 다시 연결한다.
+// onEvent 는 hello 를 뺀 이벤트를 받는다. 서버가 resync 를 알려 주면 onResync 에서 REST 로 상태를 새로 읽는다.
+// hb=1 로 붙어서 서버 ping 에 pong 으로 답하고, ping 간격의 몇 배 동안 아무것도 못 받으면 끊고 다시 붙는다.
+const RECONNECT_DELAY_MS = 1000;
+// 방이 가득 차서(1013) 닫혔으면 조금 더 기다렸다가 다시 시도한다
+const ROOM_FULL_DELAY_MS = 10000;
+const ROOM_FULL_CLOSE_CODE = 1013;
+const MISSED_PINGS = 3;
+
+export function openRoomEvents(roomCode, userId, { onEvent, onResync }) {
+  let socket = null;
+  let lastSeq = null;
+  let epoch = null;
+  let closed = false;
+  let timer = null;
+  let watchdog = null;
+
+  const watch = (current, seconds) => {
+    clearTimeout(watchdog);
+    if (seconds) watchdog = setTimeout(() => current.close(), seconds * MISSED_PINGS * 1000);
+  };
+
+  const connect = () => {
+    const params = new URLSearchParams({ v: '1', hb: '1' });
+    if (userId) params.set('user', userId);
+    if (lastSeq !== null && epoch !== null) {
+      params.set('since', lastSeq);
+      params.set('epoch', epoch);
+    }
+    const current = new WebSocket(`ws://localhost:8000/ws/${roomCode}?${params}`);
+    let pingInterval = 0;
+    socket = current;
+
+    current.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      watch(current, pingInterval);
+      if (event.type === 'ping') {
+        current.send(JSON.stringify({ type: 'pong' }));
+        return;
+      }
+      if (event.type === 'hello') {
+        pingInterval = event.ping || 0;
+        watch(current, pingInterval);
+        epoch = event.epoch;
+        // 이어 받는 중이면 lastSeq 를 그대로 두고, 뒤따라오는 이벤트로 올린다
+        if (event.resync || lastSeq === null) {
+          lastSeq = event.seq;
+          if (event.resync && onResync) onResync();
+        }
+        return;
+      }
+      lastSeq = event.seq;
+      onEvent(event);
+    };
+
+    current.onclose = (closeEvent) => {
+      clearTimeout(watchdog);
+      if (closed) return;
+      const delay = closeEvent.code === ROOM_FULL_CLOSE_CODE ? ROOM_FULL_DELAY_MS : RECONNECT_DELAY_MS;
+      timer = setTimeout(connect, delay);
+    };
+  };
+
+  connect();
+
+  return {
+    send: (data) => {
+      if (socket && socket.readyState === WebSocket.OPEN) socket.send(data);
+    },
+    close: () => {
+      closed = true;
+      clearTimeout(timer);
+      clearTimeout(watchdog);
+      if (socket) socket.close();
+    },
+  };
+}
@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# config 는 처음 import 될 때 환경 변수를 읽으므로 어떤 테스트 모듈보다 먼저 임시 DB 로 바꿔 둔다.
+# 스키마는 codive 를 import 할 때 마이그레이션으로 만들어진다
+os.environ["CODIVE_DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="codive-test-"), "test.db")
@@ -0,0 +1,29 @@
+"""정적 분석의 복잡도 추정과 스타일 검사, 결과 캐시를 본다. codive/ 에서 실행:
+
+    python -m pytest -q tests
+"""
+from analyzer import analysis_key, analyze_code
+
+
+def codes(code: str):
+    return [finding["code"] for finding in analyze_code(code)["findings"]]
+
+
+def test_comment_only_difference_gets_its_own_cache_entry():
+    # 주석 때문에 줄이 길어지면 E501 이 달라지므로 같은 결과를 쓰면 안 된다
+    short = "x = 1\nprint(x)\n"
+    commented = "x = 1  # " + "설명" * 60 + "\nprint(x)\n"
+    assert analysis_key(short) != analysis_key(commented)
+    assert "E501" not in codes(short)
+    assert "E501" in codes(commented)
+
+
+def test_sum_of_a_literal_list_is_constant_time():
+    assert analyze_code("print(sum([1, 2, 3]))\n")["time_complexity"] == "O(1)"
+    assert analyze_code("print(len({'a': [1, 2], 'b': (3,)}))\n")["time_complexity"] == "O(1)"
+
+
+def test_lambda_default_is_not_a_missing_space():
+    assert "E225" not in codes("f = lambda x=1: x\nprint(f())\n")
+    # lambda 를 닫은 뒤의 대입은 다시 검사한다
+    assert "E225" in codes("g = (lambda x=1: x)\nh=2\nprint(g(), h)\n")
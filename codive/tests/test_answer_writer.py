@@ -0,0 +1,61 @@
+"""종료할 때 쓰던 배치와 남은 제출이 어떻게 끝나는지 본다. codive/ 에서 실행:
+
+    python -m pytest -q tests
+"""
+import asyncio
+from typing import List
+
+from answer_writer import AnswerWriter
+
+
+class SlowWriter(AnswerWriter):
+    # DB 대신 천천히 id 를 매겨서 stop() 이 쓰는 도중에 불리게 한다
+    def __init__(self):
+        super().__init__(flush_interval_ms=1, max_rows=10)
+        self.next_id = 0
+        self.writing = asyncio.Event()
+
+    async def insert(self, rows: List[dict]) -> List[int]:
+        self.writing.set()
+        await asyncio.sleep(0.05)
+        ids = list(range(self.next_id, self.next_id + len(rows)))
+        self.next_id += len(rows)
+        return ids
+
+
+async def stop_while_writing():
+    writer = SlowWriter()
+    first = asyncio.ensure_future(writer.submit([{"n": n} for n in range(15)]))
+    await writer.writing.wait()
+    second = asyncio.ensure_future(writer.submit([{"n": 15}]))
+    await asyncio.sleep(0)
+    await writer.stop()
+    return await first, await second, writer
+
+
+def test_stop_finishes_the_batch_being_written():
+    first, second, writer = asyncio.run(stop_while_writing())
+    assert [row["id"] for row in first] == list(range(15))
+    assert second == [{"n": 15, "id": 15}]
+    assert writer.task is None and writer.pending == []
+
+
+async def submit_after_final_flush():
+    writer = SlowWriter()
+    first = asyncio.ensure_future(writer.submit([{"n": 0}]))
+    await writer.writing.wait()
+    stopping = asyncio.ensure_future(writer.stop())
+    second = asyncio.ensure_future(writer.submit([{"n": 1}]))
+    # 두 번째 제출은 run() 의 마지막 flush 로 저장된다. 그 flush 가 시작된 뒤의 제출은 저장되지 못한다
+    writer.writing.clear()
+    await writer.writing.wait()
+    late = asyncio.ensure_future(writer.submit([{"n": 2}]))
+    await stopping
+    return await first, await second, await asyncio.gather(late, return_exceptions=True)
+
+
+def test_stop_fails_submissions_that_missed_the_last_flush():
+    first, second, (late,) = asyncio.run(submit_after_final_flush())
+    assert first == [{"n": 0, "id": 0}]
+    assert second == [{"n": 1, "id": 1}]
+    assert isinstance(late, RuntimeError)
@@ -0,0 +1,28 @@
+"""채점기가 제출 코드의 메모리를 재고, 띄운 쪽(서버) 프로세스의 메모리를 섞지 않는지 본다. codive/ 에서 실행:
+
+    python -m pytest -q tests
+"""
+import sys
+
+import psutil
+import pytest
+
+import judge
+
+BALLAST_MB = 300
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="/proc 으로 재는 것은 리눅스뿐이다")
+def test_memory_is_the_submissions_not_the_parents():
+    # 부모가 큰 메모리를 쥐고 있어도 print(1) 의 메모리는 인터프리터 하나 정도여야 한다
+    ballast = bytearray(BALLAST_MB * 1024 * 1024)
+    ballast[::4096] = b"x" * len(ballast[::4096])
+    parent_rss = psutil.Process().memory_info().rss
+    assert parent_rss > BALLAST_MB * 1024 * 1024
+
+    verdict = judge.run_cases("print(1)\n", [("", "1\n")], judge.Limits())
+    assert verdict["test_pass"] == judge.PASS
+    memory = verdict["cases"][0]["memory_kb"] * 1024
+    assert 0 < memory < 64 * 1024 * 1024
+    assert memory < parent_rss / 4
+    del ballast
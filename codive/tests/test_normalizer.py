@@ -0,0 +1,20 @@
+"""정규화가 코드의 실행 결과를 바꾸지 않는지 본다. codive/ 에서 실행:
+
+    python -m pytest -q tests
+"""
+
+from normalizer import clean_code
+
+
+def test_trailing_spaces_inside_multiline_string_are_kept():
+    code = 's = """abc   \n  def"""\nprint(s)\n'
+    assert clean_code(code) == code
+
+
+def test_whitespace_and_comment_after_multiline_string_are_removed():
+    code = 's = """abc   \n\n  def"""   # 설명   \nprint(s)   \n\n'
+    assert clean_code(code) == 's = """abc   \n\n  def"""\nprint(s)\n'
+
+
+def test_comments_and_blank_lines_are_removed():
+    assert clean_code("x = 1  # 하나\n\n\nprint(x)\t\n") == "x = 1\nprint(x)\n"
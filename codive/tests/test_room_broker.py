@@ -0,0 +1,43 @@
+"""여러 워커가 한 방에 동시에 발행해도 워커마다 seq 순서대로 받는지 본다. codive/ 에서 실행:
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+
+from database import upgrade_schema
+from room_broker import SQLiteRoomBroker
+
+PUBLISHES = 50
+
+
+async def publish_from_two_workers():
+    received = {}
+    brokers = []
+    for name in ("a", "b"):
+        received[name] = []
+        broker = SQLiteRoomBroker(poll_interval=0.05)
+
+        async def handler(room_id, message, seqs=received[name]):
+            seqs.append(json.loads(message)["seq"])
+
+        await broker.start(handler)
+        brokers.append(broker)
+
+    async def publish(broker):
+        for _ in range(PUBLISHES):
+            await broker.publish("ordered", {"v": 1, "type": "count", "room": "ordered", "data": {}})
+
+    await asyncio.gather(*(publish(broker) for broker in brokers))
+    await asyncio.sleep(0.5)
+    for broker in brokers:
+        await broker.stop()
+    return received
+
+
+def test_sqlite_broker_delivers_in_seq_order():
+    upgrade_schema()
+    received = asyncio.run(publish_from_two_workers())
+    for seqs in received.values():
+        assert len(seqs) == 2 * PUBLISHES
+        assert seqs == sorted(seqs)
@@ -0,0 +1,34 @@
+"""동시에 몰린 방 입장이 모두 성공하고 게스트 번호가 겹치지 않는지 본다. codive/ 에서 실행:
+
+    python -m pytest -q tests
+"""
+import asyncio
+
+import httpx
+
+# 임시 DB 는 conftest.py 가 codive 를 불러오기 전에 정해 둔다
+import codive
+
+ENTERS = 300
+
+
+async def enter_all(code: str):
+    transport = httpx.ASGITransport(app=codive.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        created = await client.post("/api/room_create", json={"codeID": code, "pw": "pw"})
+        assert created.status_code == 200
+        responses = await asyncio.gather(*(
+            client.post("/api/room/enter", json={"codeID": code, "pw": "pw"}) for _ in range(ENTERS)
+        ))
+        count = await client.get(f"/api/room/{code}/guestcount")
+    return responses, count.json()["guest_count"]
+
+
+def test_concurrent_enter_allocates_unique_guest_ids():
+    responses, guest_count = asyncio.run(enter_all("concurrent"))
+    assert [response.status_code for response in responses] == [200] * ENTERS
+    guest_ids = [response.json()["guest_id"] for response in responses]
+    assert len(set(guest_ids)) == ENTERS
+    # 방장이 1번이므로 게스트는 2번부터 빈틈없이 받는다
+    assert sorted(int(guest_id.rsplit("-", 1)[1]) for guest_id in guest_ids) == list(range(2, ENTERS + 2))
+    assert guest_count == ENTERS + 1